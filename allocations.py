@@ -0,0 +1,195 @@
+"""Steady-state memory allocation per game turn and per localizer trial (tracemalloc).
+
+Off by default. With TASK_ALLOC=1 the task traces every allocation with
+tracemalloc (slower, for checks only) and measures each unit of work: every
+turn of the practice game and every localizer trial, from mark() to the
+next mark() or end(). For each unit it stores
+- net: bytes still allocated at its end (growth the unit leaves behind)
+- peak: the highest traced memory during the unit, above its start (the
+  transient churn the garbage collector and allocator have to absorb)
+into preallocated arrays. The first `skip` units of each scope (caches
+filling: text, boxes, card images) are not part of the steady state. At
+session end report() prints the median and maximum of both per scope,
+checks the medians against BUDGETS, and writes allocations_<session>.csv.
+
+Usage (runs the task with the scripted bot and the accelerated clock in a
+temporary folder; exit status 1 if a budget is exceeded):
+    python allocations.py
+    python allocations.py --net-budget 2048 --peak-budget 4096
+The localizer is checked too when it is enabled in the task script. Without
+PsychoPy or a display, test_allocations.py checks HEADLESS_BUDGETS.
+"""
+import argparse
+import csv
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+# scope -> (median net bytes, median peak bytes) allowed per unit in the steady state, a small margin
+# over the measured medians (CPython 3.11, scripted bot, 8 games): the task's turns also pay for the
+# event loop, input polling and the frame monitor, which test_allocations.py leaves out
+BUDGETS = {
+    'turn': (1024, 3 * 1024),        # measured 409-719 B net, 2.0-2.6 KiB peak
+    'localizer_trial': (128, 768),   # measured 0 B net, 624 B peak
+}
+HEADLESS_BUDGETS = {
+    'turn': (384, 1088),             # measured 275-334 B net, 948-978 B peak
+    'localizer_trial': (128, 768),   # measured 0 B net, 624 B peak
+}
+
+
+class NullAllocations:
+    """Allocation tracking off"""
+    enabled = False
+
+    def mark(self, scope):
+        pass
+
+    def end(self):
+        pass
+
+    def report(self, session_stamp, io_worker):
+        pass
+
+
+class AllocationTracker:
+    enabled = True
+
+    def __init__(self, capacity=4096, skip=3, budgets=BUDGETS):
+        self.capacity = capacity
+        self.skip = skip
+        self.budgets = budgets
+        self.net = {}    # scope -> int64 array of net bytes per unit
+        self.peak = {}   # scope -> int64 array of peak bytes per unit
+        self.count = {}  # scope -> units measured
+        self.scope = None
+        self.start = 0
+        tracemalloc.start()
+
+    def mark(self, scope):
+        """A new unit of scope starts now (ends the current one)"""
+        self.end()
+        if scope not in self.count:
+            self.net[scope] = np.zeros(self.capacity, dtype=np.int64)
+            self.peak[scope] = np.zeros(self.capacity, dtype=np.int64)
+            self.count[scope] = 0
+        self.scope = scope
+        tracemalloc.reset_peak()
+        self.start = tracemalloc.get_traced_memory()[0]
+
+    def end(self):
+        """The current unit ends now"""
+        scope = self.scope
+        if scope is None:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        i = self.count[scope]
+        if i < self.capacity:
+            self.net[scope][i] = current - self.start
+            self.peak[scope][i] = peak - self.start
+            self.count[scope] = i + 1
+        self.scope = None
+
+    def results(self):
+        """{scope: stats} over the steady-state units of each scope"""
+        out = {}
+        for scope, n in self.count.items():
+            net = self.net[scope][self.skip:n]
+            peak = self.peak[scope][self.skip:n]
+            if not len(net):
+                continue
+            net_budget, peak_budget = self.budgets.get(scope, (None, None))
+            net_median, peak_median = int(np.median(net)), int(np.median(peak))
+            out[scope] = {'units': len(net), 'net_median': net_median, 'net_max': int(net.max()),
+                          'peak_median': peak_median, 'peak_max': int(peak.max()),
+                          'net_budget': net_budget, 'peak_budget': peak_budget,
+                          'ok': ((net_budget is None or net_median <= net_budget)
+                                 and (peak_budget is None or peak_median <= peak_budget))}
+        return out
+
+    def report(self, session_stamp, io_worker):
+        self.end()
+        tracemalloc.stop()
+        results = self.results()
+        io_worker.print("\n=== Allocations (steady state, tracemalloc) ===")
+        rows = [['Scope', 'Units', 'Net_Median_B', 'Net_Max_B', 'Peak_Median_B', 'Peak_Max_B',
+                 'Net_Budget_B', 'Peak_Budget_B', 'Within_Budget']]
+        for scope, r in results.items():
+            budget = (f" (budget {r['net_budget']} B net, {r['peak_budget']} B peak)"
+                      if r['net_budget'] is not None else "")
+            io_worker.print(f"{'✅' if r['ok'] else '⚠️'} {scope}: {r['units']} units, "
+                            f"net median {r['net_median']} B (max {r['net_max']}), "
+                            f"peak median {r['peak_median'] / 1024:.1f} KiB (max {r['peak_max'] / 1024:.1f})" + budget)
+            rows.append([scope, r['units'], r['net_median'], r['net_max'], r['peak_median'], r['peak_max'],
+                         r['net_budget'], r['peak_budget'], int(r['ok'])])
+        filename = f"allocations_{session_stamp}.csv"
+
+        def opener():
+            f = open(filename, 'w', newline='')
+            return f, csv.writer(f)
+        io_worker.open_stream(filename, opener)
+        io_worker.write_rows(filename, rows)
+        io_worker.close_stream(filename)
+
+
+def allocations_from_env():
+    """AllocationTracker if TASK_ALLOC is set, else a NullAllocations"""
+    if os.environ.get("TASK_ALLOC", "").strip() in ("", "0"):
+        return NullAllocations()
+    return AllocationTracker()
+
+# =========================
+#  CHECK
+# =========================
+TASK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def run_check(net_budget=None, peak_budget=None, timeout=600):
+    """Run the task with the bot and tracking on; returns the rows of its allocations CSV"""
+    workdir = tempfile.mkdtemp(prefix="hanabi_alloc_")
+    for name in ("deal_bank.npz", "counterbalance_schedule.json"):
+        if os.path.exists(os.path.join(TASK_DIR, name)):
+            shutil.copy(os.path.join(TASK_DIR, name), workdir)
+    env = dict(os.environ, TASK_ALLOC="1", TASK_BOT=os.environ.get("TASK_BOT", "random"),
+               TASK_CLOCK=os.environ.get("TASK_CLOCK", "100"))
+    done = subprocess.run([sys.executable, os.path.join(TASK_DIR, "task_v0.1.py")], cwd=workdir, env=env,
+                          capture_output=True, text=True, timeout=timeout)
+    reports = glob.glob(os.path.join(workdir, "allocations_*.csv"))
+    if not reports:
+        raise RuntimeError(f"task wrote no allocation report (exit {done.returncode}): {done.stderr.strip()[-500:]}")
+    with open(reports[0], newline='') as f:
+        rows = list(csv.DictReader(f))
+    shutil.rmtree(workdir, ignore_errors=True)
+    for row in rows:
+        net_limit = net_budget if net_budget is not None else row['Net_Budget_B']
+        peak_limit = peak_budget if peak_budget is not None else row['Peak_Budget_B']
+        row['Within_Budget'] = ((net_limit in ("", None) or int(row['Net_Median_B']) <= int(net_limit))
+                                and (peak_limit in ("", None) or int(row['Peak_Median_B']) <= int(peak_limit)))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Steady-state allocation per turn and per localizer trial")
+    parser.add_argument('--net-budget', type=int, default=None, help="bytes per unit, overrides BUDGETS")
+    parser.add_argument('--peak-budget', type=int, default=None, help="bytes per unit, overrides BUDGETS")
+    args = parser.parse_args()
+
+    rows = run_check(args.net_budget, args.peak_budget)
+    print(f"{'scope':18s} {'units':>6s} {'net median':>11s} {'net max':>9s} {'peak median':>12s} {'peak max':>10s}")
+    for row in rows:
+        print(f"{row['Scope']:18s} {row['Units']:>6s} {row['Net_Median_B']:>9s} B {row['Net_Max_B']:>7s} B "
+              f"{int(row['Peak_Median_B']) / 1024:>8.1f} KiB {int(row['Peak_Max_B']) / 1024:>6.1f} KiB "
+              f"{'✅' if row['Within_Budget'] else '❌'}")
+    failed = [row['Scope'] for row in rows if not row['Within_Budget']]
+    if failed:
+        print(f"⚠️ Over budget: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"✅ {len(rows)} scope(s) within budget")
+
+
+if __name__ == "__main__":
+    main()
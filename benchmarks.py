@@ -0,0 +1,405 @@
+"""Micro-benchmarks of the task's hot paths, with stored baselines.
+
+Covered:
+- render_board for every board configuration (cards played × participant
+  hints × buttons), drawn and flipped in an offscreen-sized window with the
+  task's flip wrappers (timeline, markers, photodiode, frame monitor), and
+  the same configurations in layered mode (static layer as one texture)
+- draw_card face up (full size and thumbnail) and face down with each hint
+  state, load_shape_image
+- localizer trial-list generation (build_trial_list)
+- draw_new_card / check_missing_sequence_cards (card_pool.py, as the task
+  uses them)
+- every OptimalAI decision method
+- TurnLogger.log (the streaming replacement of save_turn_log) and log_turn
+  (the same without the entry dict, as the task calls it)
+- task startup in a fresh interpreter: `task_v0.1.py --check` (imports,
+  configuration and stimulus validation, no display) and
+  `task_v0.1.py --first-frame` (launch to the first frame on screen)
+
+Repeat control: each benchmark is calibrated so one repeat (a batch of calls)
+takes at least --min-time, then repeats run until the bootstrap 95%
+confidence interval of the median per-call time is within --precision of
+the median (at least --min-repeats, at most --max-repeats). Results are
+compared with benchmark_baseline.json: a benchmark regresses when its median
+is more than --threshold slower than the baseline and the two confidence
+intervals don't overlap. The exit status is 1 if anything regressed; a
+benchmark that raises stops the suite with exit status 1.
+
+Usage:
+    python benchmarks.py --save-baseline     # record the current numbers
+    python benchmarks.py                     # compare against them
+    python benchmarks.py --filter render_board --threshold 0.05
+    python benchmarks.py --no-gui            # skip benchmarks that need a window
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+BASELINE_FILE = "benchmark_baseline.json"
+
+BENCHMARKS = []  # (name, setup(number) -> fn, needs_gui)
+STEPS = [m * 10 ** k for k in range(7) for m in (1, 2, 5)]  # calls per repeat tried during calibration
+
+def benchmark(name, gui=False):
+    """Register setup(number), which prepares state and returns the function to time number times"""
+    def register(setup):
+        BENCHMARKS.append((name, setup, gui))
+        return setup
+    return register
+
+# =========================
+#  MEASUREMENT
+# =========================
+def time_batch(fn, number):
+    t0 = time.perf_counter_ns()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter_ns() - t0) / number
+
+def bootstrap_ci(samples, rng, n_boot=500):
+    """95% confidence interval of the median"""
+    idx = rng.integers(0, len(samples), size=(n_boot, len(samples)))
+    medians = np.median(samples[idx], axis=1)
+    return np.percentile(medians, [2.5, 97.5])
+
+def measure(setup, min_time=0.02, min_repeats=7, max_repeats=30, precision=0.02, rng=None):
+    """Per-call time in µs: median and 95% CI over repeats of a calibrated batch"""
+    rng = rng or np.random.default_rng(0)
+    number = 1
+    while True:  # calibrate: 1, 2, 5, 10, 20, 50, ... calls per repeat
+        per_call = time_batch(setup(number), number)
+        if per_call * number >= min_time * 1e9 or number >= 1_000_000:
+            break
+        number = next(n for n in STEPS if n > number)
+    samples = []
+    while len(samples) < max_repeats:
+        samples.append(time_batch(setup(number), number) / 1e3)
+        if len(samples) >= min_repeats:
+            arr = np.array(samples)
+            median = np.median(arr)
+            low, high = bootstrap_ci(arr, rng)
+            if (high - low) / 2 <= precision * median:
+                break
+    arr = np.array(samples)
+    low, high = bootstrap_ci(arr, rng)
+    return {'median_us': float(np.median(arr)), 'ci_low_us': float(low), 'ci_high_us': float(high),
+            'repeats': len(arr), 'number': number}
+
+def compare(result, base, threshold):
+    """'regression', 'faster' or '' against a baseline entry"""
+    if base is None:
+        return 'new'
+    if result['median_us'] > base['median_us'] * (1 + threshold) and result['ci_low_us'] > base['ci_high_us']:
+        return 'REGRESSION'
+    if result['median_us'] < base['median_us'] * (1 - threshold) and result['ci_high_us'] < base['ci_low_us']:
+        return 'faster'
+    return ''
+
+# =========================
+#  GAME LOGIC
+# =========================
+from game_sim import ALL_CARDS, deal_game
+from card_pool import CardPool
+from optimal_ai import OptimalAI
+from markers import COLORS, POSITIONS
+
+def game_states(n, seed=0):
+    """n mid-game states: (true_sequence, computer_cards, participant_cards, played_sequence)"""
+    rng = random.Random(seed)
+    random.seed(seed)
+    states = []
+    for _ in range(n):
+        true_sequence, computer_cards, participant_cards = deal_game()
+        played = [None, None, None]
+        for slot in rng.sample(range(3), rng.randrange(3)):
+            played[slot] = true_sequence[slot]
+        states.append((true_sequence, computer_cards, participant_cards, played))
+    return states
+
+STATES = game_states(64)
+CARD_POOL = CardPool(ALL_CARDS)  # the same 16 cards as the task's deck
+
+@benchmark("draw_new_card")
+def bench_draw_new_card(number):
+    states = [STATES[i % len(STATES)] for i in range(number)]
+    it = iter(states)
+
+    def fn():
+        true_sequence, computer_cards, participant_cards, played = next(it)
+        missing = CARD_POOL.check_missing_sequence_cards(true_sequence, computer_cards, participant_cards, played)
+        CARD_POOL.draw_new_card(CARD_POOL.cards_in_use(computer_cards, participant_cards, played), missing)
+    return fn
+
+@benchmark("check_missing_sequence_cards")
+def bench_check_missing(number):
+    it = itertools.cycle(STATES)
+    return lambda: CARD_POOL.check_missing_sequence_cards(*next(it))
+
+def fresh_ais(number, hinted=False):
+    """number independent AIs (the decision methods mutate their state)"""
+    ais = []
+    for i in range(number):
+        true_sequence, computer_cards, participant_cards, _ = STATES[i % len(STATES)]
+        ai = OptimalAI(true_sequence, participant_cards)
+        if hinted:
+            card = computer_cards[0]
+            ai.receive_hint_from_participant('color', card[0], 0, card)
+        ais.append((ai, computer_cards, participant_cards))
+    return iter(ais)
+
+@benchmark("OptimalAI.__init__")
+def bench_ai_init(number):
+    it = itertools.cycle(STATES)
+
+    def fn():
+        true_sequence, _, participant_cards, _ = next(it)
+        OptimalAI(true_sequence, participant_cards)
+    return fn
+
+@benchmark("OptimalAI.receive_hint_from_participant")
+def bench_ai_receive_hint(number):
+    it = fresh_ais(number)
+
+    def fn():
+        ai, computer_cards, _ = next(it)
+        card = computer_cards[1]
+        ai.receive_hint_from_participant('position', card[1], 1, card)
+    return fn
+
+@benchmark("OptimalAI.give_hint_to_participant")
+def bench_ai_give_hint(number):
+    it = fresh_ais(number, hinted=True)
+    return lambda: next(it)[0].give_hint_to_participant()
+
+@benchmark("OptimalAI.choose_card_to_replace")
+def bench_ai_replace(number):
+    it = fresh_ais(number, hinted=True)
+
+    def fn():
+        ai, computer_cards, _ = next(it)
+        ai.choose_card_to_replace(computer_cards)
+    return fn
+
+@benchmark("OptimalAI.play_card")
+def bench_ai_play(number):
+    it = fresh_ais(number, hinted=True)
+    return lambda: next(it)[0].play_card(0, 0)
+
+@benchmark("OptimalAI.update_after_participant_action")
+def bench_ai_update_action(number):
+    it = fresh_ais(number, hinted=True)
+
+    def fn():
+        ai, _, participant_cards = next(it)
+        ai.update_after_participant_action('play', card_played=participant_cards[0])
+    return fn
+
+@benchmark("OptimalAI.update_progress")
+def bench_ai_progress(number):
+    it = fresh_ais(number, hinted=True)
+    return lambda: next(it)[0].update_progress()
+
+# =========================
+#  LOCALIZER AND LOGGING
+# =========================
+def stimulus_files(directory):
+    """The 16 stimulus images (same names and size as generate_stimuli.py), created once"""
+    from PIL import Image
+    paths = []
+    for color in COLORS:
+        for pos in POSITIONS:
+            path = os.path.join(directory, f"{color}_{pos}_square.png")
+            if not os.path.exists(path):
+                Image.new('RGB', (400, 400), 'white').save(path)
+            paths.append(path)
+    return paths
+
+TMP_DIR = tempfile.mkdtemp(prefix="hanabi_bench_")
+
+@benchmark("build_trial_list")
+def bench_trial_list(number):
+    from localizer_engine import build_trial_list
+    paths = stimulus_files(TMP_DIR)
+    rng = random.Random(0)
+    return lambda: build_trial_list(paths, rng=rng)
+
+@benchmark("TurnLogger.log")
+def bench_turn_log(number):
+    from io_worker import IOWorker
+    from turn_logger import TurnLogger
+    worker = getattr(bench_turn_log, 'worker', None)
+    if worker is None:
+        worker = bench_turn_log.worker = IOWorker().start()
+        bench_turn_log.logger = TurnLogger(worker, filename=os.path.join(TMP_DIR, "turn_log_bench.csv"))
+        bench_turn_log.logger.start_trial("bench", 1)
+    logger = bench_turn_log.logger
+    worker.flush(timeout=10)  # don't time a backlog from the previous repeat
+    entry = {'turn': 3, 'player': 'Participant', 'action': 'Play', 'details': "Card 3 to Slot 3", 'rt': 2.277}
+    return lambda: logger.log(entry)
+
+@benchmark("TurnLogger.log_turn")
+def bench_turn_log_fields(number):
+    bench_turn_log(number)  # shared worker and logger
+    logger = bench_turn_log.logger
+    return lambda: logger.log_turn(3, 'Participant', 'Play', "Card 3 to Slot 3", 2.277)
+
+# =========================
+#  GUI
+# =========================
+GUI = {}
+
+def gui_context():
+    """Window and board view built once, with the task's flip wrappers"""
+    if not GUI:
+        from psychopy import visual
+        from event_timeline import EventTimeline
+        from markers import MarkerOutput, make_backend
+        from photodiode import PhotodiodePatch
+        from frame_monitor import FrameMonitor
+        from board_view import BoardView, load_shape_image
+        win = visual.Window(size=[1280, 720], color='white', units='height', fullscr=False, waitBlanking=False)
+        timeline = EventTimeline().attach(win)
+        markers = MarkerOutput(make_backend("loopback"), timeline=timeline).attach(win)
+        photodiode = PhotodiodePatch(win, timeline=timeline, enabled=False).attach()
+        frame_monitor = FrameMonitor(timeline).attach(win)
+        stimuli = stimulus_files(TMP_DIR)
+        GUI.update(win=win, timeline=timeline, stimuli=stimuli, load=load_shape_image,
+                   board=BoardView(win, stimuli, load_shape_image, timeline, markers, photodiode, frame_monitor),
+                   layered=BoardView(win, stimuli, load_shape_image, timeline, markers, photodiode, frame_monitor,
+                                     layered=True))
+    if GUI['timeline'].n > 100_000:
+        GUI['timeline'].reset()
+    return GUI
+
+HINT_STATES = {
+    'none': {'color': None, 'position': None},
+    'color': {'color': 'blue', 'position': None},
+    'position': {'color': None, 'position': 'left'},
+    'both': {'color': 'orange', 'position': 'up'},
+}
+
+BUTTONS = ['none', 'action', 'hint']  # no buttons or a set of board_view.BUTTON_SETS
+
+def register_render_board(played, hints, buttons, layered=False):
+    name = f"played={played},hints={hints},buttons={buttons}" + (",layered" if layered else "")
+
+    @benchmark(f"render_board[{name}]", gui=True)
+    def bench(number):
+        from board_view import BUTTON_SETS, get_button_regions  # the task's button layout
+        board = gui_context()['layered' if layered else 'board']
+        true_sequence, computer_cards, participant_cards, _ = STATES[0]
+        played_sequence = [card if i < played else None for i, card in enumerate(true_sequence)]
+        participant_hints = {i: dict(HINT_STATES[hints]) for i in range(3)}
+        regions = get_button_regions(BUTTON_SETS[buttons]) if buttons != 'none' else None
+        return lambda: board.render_board(computer_cards, participant_cards, played_sequence,
+                                          "Your turn! Click an action:", participant_hints, buttons=regions)
+
+for _layered, _played, _hints, _buttons in itertools.product((False, True), range(4), HINT_STATES, BUTTONS):
+    register_render_board(_played, _hints, _buttons, _layered)
+
+def register_draw_card(label, kwargs):
+    @benchmark(f"draw_card[{label}]", gui=True)
+    def bench(number):
+        board = gui_context()['board']
+        return lambda: board.draw_card((0.0, 0.05), 'blue', 'up', **kwargs)
+
+register_draw_card("faceup", {})
+register_draw_card("faceup,thumb", {'thumb': True})
+for _hints, _info in HINT_STATES.items():
+    register_draw_card(f"facedown,hints={_hints}", {'faceup': False, 'hint_info': _info})
+
+@benchmark("load_shape_image", gui=True)
+def bench_load_image(number):
+    ctx = gui_context()
+    path = ctx['stimuli'][0]
+    return lambda: ctx['load'](ctx['win'], path)
+
+# =========================
+#  STARTUP
+# =========================
+TASK_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "task_v0.1.py")
+
+def run_task(*args, cwd=None):
+    """Run the task script in a fresh interpreter, raising if it fails"""
+    proc = subprocess.run([sys.executable, TASK_SCRIPT, *args], cwd=cwd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"task_v0.1.py {' '.join(args)} failed:\n{proc.stdout}{proc.stderr}")
+
+@benchmark("startup[check]")
+def bench_startup_check(number):
+    # run from the task folder, where the deal bank and schedule live
+    return lambda: run_task("--check", cwd=os.path.dirname(TASK_SCRIPT))
+
+@benchmark("startup[first_frame]", gui=True)
+def bench_startup_first_frame(number):
+    # session files (timeline, frame report) go to the temporary folder
+    return lambda: run_task("--first-frame", cwd=TMP_DIR)
+
+# =========================
+#  MAIN
+# =========================
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the task's hot paths")
+    parser.add_argument('--filter', default=None, help="only benchmarks whose name contains this")
+    parser.add_argument('--no-gui', action='store_true', help="skip benchmarks that need a window")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.10, help="relative slowdown that counts as a regression")
+    parser.add_argument('--min-time', type=float, default=0.02, help="seconds per repeat")
+    parser.add_argument('--min-repeats', type=int, default=7)
+    parser.add_argument('--max-repeats', type=int, default=30)
+    parser.add_argument('--precision', type=float, default=0.02, help="target 95%% CI half-width / median")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get('results', {})
+
+    selected = [(name, setup) for name, setup, gui in BENCHMARKS
+                if (args.filter is None or args.filter in name) and not (gui and args.no_gui)]
+    results = {}
+    regressions = []
+    rng = np.random.default_rng(0)
+    print(f"{'benchmark':62s} {'median':>11s} {'95% CI':>23s} {'reps':>5s} {'vs base':>9s}")
+    for name, setup in selected:
+        try:
+            r = measure(setup, args.min_time, args.min_repeats, args.max_repeats, args.precision, rng)
+        except Exception as e:
+            print(f"❌ {name} failed, stopping: {e}")
+            sys.exit(1)
+        results[name] = r
+        base = baseline.get(name)
+        flag = compare(r, base, args.threshold)
+        change = f"{r['median_us'] / base['median_us'] - 1:+.1%}" if base else ""
+        print(f"{name:62s} {r['median_us']:9.2f}µs [{r['ci_low_us']:9.2f}, {r['ci_high_us']:9.2f}] "
+              f"{r['repeats']:5d} {change:>9s} {flag}")
+        if flag == 'REGRESSION':
+            regressions.append(name)
+
+    if args.save_baseline:
+        merged = dict(baseline, **results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'meta': {'python': sys.version.split()[0], 'platform': platform.platform(),
+                                'machine': platform.machine(), 'processor': platform.processor(),
+                                'saved': datetime.now().isoformat(timespec='seconds')},
+                       'results': merged}, f, indent=1, sort_keys=True)
+        print(f"✅ Baseline saved to {args.baseline} ({len(results)} benchmarks)")
+    if regressions:
+        print(f"⚠️ {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
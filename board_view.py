@@ -0,0 +1,299 @@
+"""Practice-game board drawing, shared by the task and benchmarks.py.
+
+BoardView holds the window and the session objects a board flip reports to
+(event timeline, markers, photodiode patch, frame monitor) and draws cards,
+boxes and the full board exactly as run_practice always has. Each card image
+is loaded once and its ImageStim reused, so warm_up() can upload every card
+texture before the game starts (see warmup.py). Text (hint arrows, '?'
+placeholders, button labels, the board message) comes from a TextCache
+(text_cache.py); the message can be a string or a tuple of fragments.
+
+Layered mode (layered=True): the static layer of the board (the nine card
+frames, slot boxes and empty-slot placeholders) is drawn once into the back
+buffer and captured as a BufferImageStim; each render_board then draws that
+one texture and only the dynamic layer on top (highlights, cards, hints,
+'?' placeholders, buttons, message). The layer is keyed on its inputs (the
+window size and the board layout), so it is recaptured automatically when
+they change. Buttons stay in the dynamic layer because they are drawn over
+the bottom edge of the participant row. Boxes are prebuilt Rects reused
+across frames in both modes.
+"""
+import os
+
+from PIL import Image
+from psychopy import visual
+
+from text_cache import TextCache, message_text
+
+HINT_COLORS = {'yellow': '#FFD700', 'blue': '#4169E1', 'cyan': '#00CED1', 'orange': '#FF8C00'}
+HINT_ARROWS = {'up': '^', 'down': 'v', 'left': '<', 'right': '>'}
+
+# =========================
+#  LAYOUT
+# =========================
+# Where the cards and buttons are: render_board draws them here, the task's
+# click regions are built from it and the bot (bot_participant.py) aims at
+# the same regions.
+XS = [-0.30, 0.0, 0.30]
+TOP_Y, MID_Y, BOTTOM_Y = 0.25, 0.05, -0.15
+ROWS = {'ai': TOP_Y, 'slot': MID_Y, 'participant': BOTTOM_Y}
+CARD_SIZE = (0.20, 0.20)
+BUTTON_Y = -0.25
+BUTTON_SPACING = 0.20
+BUTTON_SIZE = (0.15, 0.06)
+BUTTON_SETS = {
+    'action': ['HINT', 'PLAY', 'REPLACE'],
+    'hint': ['COLOR', 'POSITION'],
+}
+
+def bounds(center, size):
+    (x, y), (w, h) = center, size
+    return {'left': x - w/2, 'right': x + w/2, 'bottom': y - h/2, 'top': y + h/2}
+
+def get_card_regions():
+    """Clickable regions of the nine card places, keyed (row, index)"""
+    return {(row, i): bounds((x, y), CARD_SIZE) for row, y in ROWS.items() for i, x in enumerate(XS)}
+
+def get_row_regions():
+    """Card regions of each row, {'ai' | 'slot' | 'participant': {(row, index): bounds}}"""
+    card_regions = get_card_regions()
+    return {row: {k: v for k, v in card_regions.items() if k[0] == row} for row in ROWS}
+
+_button_regions = {}  # button names -> regions, built once per set
+
+def get_button_regions(button_names):
+    """Clickable regions of a row of buttons, keyed by name (shared, not to be modified)"""
+    key = tuple(button_names)
+    if key not in _button_regions:
+        start_x = -(len(key) - 1) * BUTTON_SPACING / 2
+        _button_regions[key] = {name: bounds((start_x + i * BUTTON_SPACING, BUTTON_Y), BUTTON_SIZE)
+                                for i, name in enumerate(key)}
+    return _button_regions[key]
+
+def region_at(regions, pos):
+    """Name of the region containing pos (a click), or None"""
+    for region_name, bounds in regions.items():
+        if (bounds['left'] <= pos[0] <= bounds['right'] and
+            bounds['bottom'] <= pos[1] <= bounds['top']):
+            return region_name
+    return None
+
+
+# --- safe image loader (fixes NSCFString issue) ---
+def load_shape_image(win, img_path, log=print):
+    try:
+        img = Image.open(img_path).convert('RGB')
+        temp_path = "_temp_rgb.png"
+        img.save(temp_path)
+        stim = visual.ImageStim(win, image=temp_path, size=(0.35, 0.35))
+        return stim
+    except Exception as e:
+        log(f"⚠️ Failed to load {img_path}: {e}")
+        return None
+
+
+class BoardView:
+    def __init__(self, win, stimuli, load_image, timeline, markers, photodiode, frame_monitor, text_cache=None,
+                 layered=False):
+        self.win = win
+        self.stimuli = stimuli
+        self.load_image = load_image
+        self.timeline = timeline
+        self.markers = markers
+        self.photodiode = photodiode
+        self.frame_monitor = frame_monitor
+        self.images = {}  # stimulus path -> ImageStim, loaded on first use
+        self.text = text_cache if text_cache is not None else TextCache(win)
+        self.boxes = {}  # draw_box arguments -> Rect
+        self.layered = layered
+        self.layer = None
+        self.layer_key = None
+        self.layer_captures = 0
+
+    def find_stim_file(self, color, pos):
+        matches = [s for s in self.stimuli if f"{color}_" in os.path.basename(s) and f"_{pos}_" in os.path.basename(s)]
+        if not matches:
+            raise ValueError(f"No file for ({color}, {pos})")
+        return matches[0]
+
+    def draw_box(self, center, w=0.20, h=0.20, line="black", fill=None, linewidth=2):
+        key = (center, w, h, line, fill, linewidth)
+        box = self.boxes.get(key)
+        if box is None:
+            box = self.boxes[key] = visual.Rect(self.win, width=w, height=h, pos=center, lineColor=line,
+                                                fillColor=fill, lineWidth=linewidth)
+        box.draw()
+
+    def draw_card(self, center, color, pos, faceup=True, thumb=False, hint_info=None):
+        """Draw a card with optional hint visualization"""
+        if not faceup:
+            # If we have hint info, show it on the black card
+            if hint_info and (hint_info['color'] or hint_info['position']):
+                # Draw colored box if color is known
+                if hint_info['color']:
+                    fill_color = HINT_COLORS.get(hint_info['color'], 'gray')
+                    self.draw_box(center, w=0.20, h=0.20, fill=fill_color)
+                else:
+                    self.draw_box(center, w=0.20, h=0.20, fill="black")
+                
+                # Draw arrow if position is known
+                if hint_info['position']:
+                    arrow = HINT_ARROWS.get(hint_info['position'], '?')
+                    # Black outline for visibility (draw first, thicker)
+                    for dx, dy in [(-0.003, 0), (0.003, 0), (0, -0.003), (0, 0.003),
+                                   (-0.002, -0.002), (0.002, 0.002), (-0.002, 0.002), (0.002, -0.002)]:
+                        self.text.draw(arrow, pos=(center[0]+dx, center[1]+dy), 
+                                      color='black', height=0.12, bold=True)
+                    # White arrow on top
+                    self.text.draw(arrow, pos=center, color='white', 
+                                  height=0.12, bold=True)
+            else:
+                self.draw_box(center, w=0.20, h=0.20, fill="black")
+            return
+        try:
+            stim = self.image(self.find_stim_file(color, pos))
+            stim.size = (0.15, 0.15) if not thumb else (0.10, 0.10)
+            stim.pos = center
+            stim.draw()
+        except:
+            # Fallback if image not found
+            self.draw_box(center, w=0.20, h=0.20, fill="gray")
+
+    def image(self, stim_path):
+        """ImageStim of a stimulus file, loaded once"""
+        stim = self.images.get(stim_path)
+        if stim is None:
+            stim = self.images[stim_path] = self.load_image(self.win, stim_path)
+        return stim
+
+    def draw_button(self, button_name, rect):
+        center_x = (rect['left'] + rect['right']) / 2
+        center_y = (rect['bottom'] + rect['top']) / 2
+        width = rect['right'] - rect['left']
+        height = rect['top'] - rect['bottom']
+        
+        # Button background
+        self.draw_box((center_x, center_y), w=width, h=height, line='black', fill='lightgray', linewidth=2)
+        # Button text
+        self.text.draw(button_name, pos=(center_x, center_y),
+                      color='black', height=0.03, bold=True)
+
+    def warm_up(self, buttons=()):
+        """Draw every card (full size and thumbnail), hint state, box and button into the back buffer
+
+        Uploads the card textures, builds the boxes at their board positions and
+        the arrow and button glyphs, and captures the static layer in layered
+        mode, before the first board is shown. Nothing is flipped;
+        warmup.finish() clears it.
+        """
+        if self.layered:
+            self.static_layer()
+        for path in self.stimuli:
+            color, pos = os.path.basename(path).split("_")[:2]
+            self.draw_card((XS[1], MID_Y), color, pos)
+            self.draw_card((XS[1], TOP_Y), color, pos, thumb=True)
+        for x in XS:
+            for hint_color in [None, *HINT_COLORS]:
+                for hint_pos in [None, *HINT_ARROWS]:
+                    self.draw_card((x, BOTTOM_Y), None, None, faceup=False,
+                                   hint_info={'color': hint_color, 'position': hint_pos})
+            for y in (TOP_Y, MID_Y, BOTTOM_Y):
+                self.draw_box((x, y), w=0.24, h=0.24, line="red", linewidth=4, fill=None)
+        self.draw_static()
+        for regions in buttons:
+            for button_name, rect in regions.items():
+                self.draw_button(button_name, rect)
+
+    # =========================
+    #  STATIC LAYER
+    # =========================
+    def draw_static(self):
+        """Card frames, slot boxes and empty-slot placeholders (everything under the dynamic layer)"""
+        for x in XS:
+            self.draw_box((x, TOP_Y), fill="#f0f0f0")
+            self.draw_box((x, MID_Y))
+            self.draw_box((x, BOTTOM_Y), fill="#333333")
+
+    def static_layer(self):
+        """BufferImageStim of the static layer, captured again whenever its inputs change"""
+        key = (tuple(self.win.size), tuple(XS), TOP_Y, MID_Y, BOTTOM_Y)
+        if key != self.layer_key:
+            self.win.clearBuffer()
+            self.draw_static()
+            self.layer = visual.BufferImageStim(self.win)
+            self.win.clearBuffer()
+            self.layer_key = key
+            self.layer_captures += 1
+        return self.layer
+
+    def invalidate(self):
+        """Drop the captured static layer (next render_board captures it again)"""
+        self.layer_key = None
+
+    def render_board(self, computer_cards, participant_cards, played_sequence, hint_text=None, 
+                    participant_hints=None, highlight_cards=None, buttons=None):
+        """Render the complete game board with persistent display"""
+        static = not self.layered  # draw the static layer element by element
+        if self.layered:
+            self.static_layer().draw()
+        else:
+            self.win.clearBuffer()
+        top_y, mid_y, bottom_y = TOP_Y, MID_Y, BOTTOM_Y
+        xs = XS
+
+        # Computer cards (visible to participant) - TOP
+        for i, card in enumerate(computer_cards):
+            center = (xs[i], top_y)
+            is_highlighted = highlight_cards and ('ai', i) in highlight_cards
+            if is_highlighted:
+                self.draw_box(center, w=0.24, h=0.24, line="red", linewidth=4, fill=None)
+            if static:
+                self.draw_box(center, fill="#f0f0f0")
+            if card:
+                color, pos = card
+                self.draw_card(center, color, pos, thumb=True)
+
+        # Sequence slots (middle) - CENTER
+        for i, card in enumerate(played_sequence):
+            center = (xs[i], mid_y)
+            is_highlighted = highlight_cards and ('slot', i) in highlight_cards
+            if is_highlighted:
+                self.draw_box(center, w=0.24, h=0.24, line="red", linewidth=4, fill=None)
+            if static:
+                self.draw_box(center)
+            if card:
+                color, pos = card
+                self.draw_card(center, color, pos)
+            else:
+                self.text.draw("?", pos=center, color="black", height=0.07)
+
+        # Participant cards (with hints) - BOTTOM
+        for i in range(3):
+            center = (xs[i], bottom_y)
+            is_highlighted = highlight_cards and ('participant', i) in highlight_cards
+            if is_highlighted:
+                self.draw_box(center, w=0.24, h=0.24, line="red", linewidth=4, fill=None)
+            
+            if participant_cards[i]:
+                hint_info = participant_hints.get(i, {'color': None, 'position': None}) if participant_hints else None
+                self.draw_card(center, None, None, faceup=False, hint_info=hint_info)
+            elif static:
+                self.draw_box(center, fill="#333333")  # Empty slot (darker gray)
+
+        # Draw buttons if provided
+        if buttons:
+            for button_name, rect in buttons.items():
+                self.draw_button(button_name, rect)
+
+        # Hint text at bottom (parameterized messages as cached fragments)
+        if hint_text and isinstance(hint_text, str):
+            self.text.draw(hint_text, color="black", height=0.03, pos=(0, -0.35), wrap_width=1.0)
+        elif hint_text:
+            self.text.draw_parts(hint_text, color="black", height=0.03, pos=(0, -0.35))
+            hint_text = message_text(hint_text)
+        
+        self.timeline.on_flip('board_onset', label=hint_text)
+        self.markers.on_flip('board_onset')
+        self.photodiode.toggle()
+        self.frame_monitor.tag_next_flip('render_board')
+        self.win.flip()
@@ -0,0 +1,402 @@
+"""Scripted participant that plays the practice game through the real GUI.
+
+The bot replaces the psychopy input calls the task reads (event.getKeys,
+event.waitKeys, Mouse.getPressed and Mouse.getPos), so every click goes
+through wait_for_click_on_region and every key through the instruction
+screens and get_player_name, exactly like a human's. It reads the screen the
+way a participant does: the prompt of the latest board (the 'board_onset'
+label on the event timeline) says what to click, and the card and button
+layout is the one drawn by the task. After a think time (task clock seconds,
+so it scales with TASK_CLOCK) it moves the pointer into the target and
+presses.
+
+Policies:
+- RandomPolicy: random actions and targets (PLAY weighted up so games end)
+- ReplayPolicy: the participant actions of a recorded turn log
+  (turn_by_turn_log.csv or a _v2 log), with the recorded RTs as think times
+
+Measured per session and saved as bot_report_<session>.npz:
+- input-to-flip latency: from each injected click or key to the first flip
+  after it (the task's response on screen)
+- render cost of every frame with a known start (frame monitor)
+
+The task installs the bot when TASK_BOT is set ("random" or
+"replay:<turn log>", optional TASK_BOT_NAME). Run many games with:
+    python bot_participant.py --games 200 --policy random --speed 100
+which runs sessions of the task one after another (2 games each), under
+xvfb-run when there is no display, and prints the latency and render-cost
+distributions over all of them.
+"""
+import argparse
+import csv
+import glob
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from board_view import BUTTON_SETS, get_card_regions, get_button_regions
+from event_timeline import KIND_ID, now_ns
+
+# =========================
+#  SCREEN LAYOUT (board_view.py, as drawn by the task)
+# =========================
+CARD_REGIONS = get_card_regions()
+
+# Prompt text -> what it asks to click
+PROMPTS = [
+    ("Click an action", 'action'),
+    ("AI card (top row)", 'ai'),
+    ("COLOR or POSITION", 'hint'),
+    ("(bottom row) to play", 'participant'),
+    ("(bottom row) to replace", 'participant'),
+    ("Click a SLOT", 'slot'),
+]
+
+INPUT_KINDS = ['click', 'key', 'name_key']
+
+
+def target_kind(target):
+    if isinstance(target, tuple):
+        return target[0]
+    return 'action' if target in BUTTON_SETS['action'] else 'hint'
+
+def target_region(target):
+    """(center, half size) of a click target, from the regions the task tests clicks against"""
+    if isinstance(target, tuple):
+        b = CARD_REGIONS[target]
+    else:
+        b = get_button_regions(BUTTON_SETS[target_kind(target)])[target]
+    return (((b['left'] + b['right']) / 2, (b['bottom'] + b['top']) / 2),
+            ((b['right'] - b['left']) / 2, (b['top'] - b['bottom']) / 2))
+
+def prompt_kind(prompt):
+    if prompt:
+        for text, kind in PROMPTS:
+            if text in prompt:
+                return kind
+    return None
+
+# =========================
+#  POLICIES
+# =========================
+class RandomPolicy:
+    """Random actions; think times uniform in think_range (nominal seconds)"""
+
+    def __init__(self, rng=None, think_range=(0.4, 1.2), weights=(0.3, 0.4, 0.3)):
+        self.rng = rng or random.Random()
+        self.think_range = think_range
+        self.weights = weights
+
+    def think(self):
+        return self.rng.uniform(*self.think_range)
+
+    def target(self, kind):
+        if kind in BUTTON_SETS:
+            return self.rng.choice(BUTTON_SETS[kind])
+        return (kind, self.rng.randrange(3))
+
+    def next_action(self):
+        """[(target, think_s), ...] for one participant turn"""
+        action = self.rng.choices(BUTTON_SETS['action'], weights=self.weights)[0]
+        if action == 'HINT':
+            targets = [action, self.target('ai'), self.target('hint')]
+        elif action == 'PLAY':
+            targets = [action, self.target('participant'), self.target('slot')]
+        else:
+            targets = [action, self.target('participant')]
+        return [(t, self.think()) for t in targets]
+
+
+class ReplayPolicy(RandomPolicy):
+    """Participant actions of a recorded turn log, in order (wrapping around)"""
+
+    def __init__(self, actions, rng=None):
+        super().__init__(rng)
+        if not actions:
+            raise ValueError("No participant actions to replay")
+        self.actions = actions
+        self.i = 0
+
+    @classmethod
+    def from_turn_log(cls, filename, rng=None):
+        """Read Participant rows of a turn log (the pilot log has no header, _v2 logs do)"""
+        actions = []
+        with open(filename, newline='') as f:
+            for row in csv.reader(f):
+                if len(row) < 7 or row[3] != 'Participant':
+                    continue
+                action = parse_action(row[4], row[5])
+                if action is None:
+                    continue
+                try:
+                    rt = float(row[6])
+                except ValueError:
+                    rt = None
+                actions.append((action, rt))
+        return cls(actions, rng)
+
+    def next_action(self):
+        targets, rt = self.actions[self.i % len(self.actions)]
+        self.i += 1
+        if rt is None:
+            return [(t, self.think()) for t in targets]
+        return [(t, rt / len(targets)) for t in targets]
+
+def parse_action(action, details):
+    """Click targets of a logged participant action, e.g. ('Play', 'Card 3 to Slot 3')"""
+    words = details.replace(':', '').split()
+    try:
+        if action == 'Hint':    # Card 1 color: orange
+            return ['HINT', ('ai', int(words[1]) - 1), words[2].upper()]
+        if action == 'Play':    # Card 3 to Slot 3
+            return ['PLAY', ('participant', int(words[1]) - 1), ('slot', int(words[4]) - 1)]
+        if action == 'Replace':  # Card 2
+            return ['REPLACE', ('participant', int(words[1]) - 1)]
+    except (IndexError, ValueError):
+        pass
+    return None
+
+# =========================
+#  BOT
+# =========================
+class BotParticipant:
+    def __init__(self, policy, timeline, clock, name="bot", key_s=0.15, message_s=0.8, rng=None):
+        self.policy = policy
+        self.timeline = timeline
+        self.clock = clock
+        self.name = name
+        self.key_s = key_s          # nominal seconds per typed name key
+        self.message_s = message_s  # nominal seconds to read an instruction screen
+        self.rng = rng or random.Random()
+        self.typed = 0
+        self.key_due_ns = None  # when the next name key is typed (get_keys polling)
+        self.answered_message = None
+        self.answered_board = None
+        self.plan = []
+        self.due_ns = None
+        self.due_onset = None
+        self.pos = (0.0, 0.0)
+        self.pressed = False
+        self.inject_ns = []
+        self.inject_kind = []
+
+    def install(self):
+        """Route psychopy keyboard and mouse input to the bot"""
+        from psychopy import event
+        event.getKeys = self.get_keys
+        event.waitKeys = self.wait_keys
+        event.Mouse.getPressed = lambda mouse, getTime=False: self.mouse_pressed()
+        event.Mouse.getPos = lambda mouse: np.array(self.pos)
+        return self
+
+    def _inject(self, kind):
+        self.inject_ns.append(now_ns())
+        self.inject_kind.append(INPUT_KINDS.index(kind))
+
+    def _elapsed(self, t_ns):
+        """Nominal seconds since a timeline timestamp"""
+        return self.clock.nominal((now_ns() - t_ns) / 1e9)
+
+    def latest_label(self, kind):
+        tl = self.timeline
+        kind_id = KIND_ID[kind]
+        for i in range(tl.n - 1, max(-1, tl.n - 512), -1):
+            if tl.kind_col[i] == kind_id:
+                label = tl.label_col[i]
+                return tl.labels[label] if label >= 0 else None
+        return None
+
+    # --- keyboard ---
+    def _space_due(self, keyList):
+        if keyList is None or 'space' not in keyList:
+            return False
+        onset = self.timeline.last('message_onset')
+        if onset is None or onset == self.answered_message or self._elapsed(onset) < self.message_s:
+            return False
+        self.answered_message = onset
+        self._inject('key')
+        return True
+
+    def get_keys(self, keyList=None, modifiers=False, timeStamped=False):
+        if keyList is None:  # name entry: one key every key_s
+            if self.key_due_ns is None:
+                self.key_due_ns = now_ns() + int(self.key_s / self.clock.speed * 1e9)
+            if now_ns() < self.key_due_ns:
+                return []
+            self.key_due_ns = None
+            return [self._next_name_key()]
+        return ['space'] if self._space_due(keyList) else []
+
+    def _next_name_key(self):
+        text = self.name + "\n"
+        char = text[self.typed % len(text)]
+        self.typed += 1
+        self._inject('name_key')
+        return 'return' if char == "\n" else 'space' if char == " " else char
+
+    def wait_keys(self, maxWait=float('inf'), keyList=None, modifiers=False, timeStamped=False, clearEvents=True):
+        if keyList is None:  # name entry: one key per call, then return
+            self.clock.sleep(self.key_s)
+            return [self._next_name_key()]
+        while not self._space_due(keyList):
+            self.clock.sleep(0.002)
+        return ['space']
+
+    # --- mouse ---
+    def mouse_pressed(self):
+        if self.pressed:  # release on the poll after the press
+            self.pressed = False
+            return [0, 0, 0]
+        onset = self.timeline.last('board_onset')
+        if onset is None or onset == self.answered_board:
+            return [0, 0, 0]
+        if self.due_ns is None or self.due_onset != onset:
+            kind = prompt_kind(self.latest_label('board_onset'))
+            if kind is None:
+                self.answered_board = onset
+                return [0, 0, 0]
+            target, think_s = self.next_target(kind)
+            (x, y), (hw, hh) = target_region(target)
+            self.pos = (x + self.rng.uniform(-0.6, 0.6) * hw, y + self.rng.uniform(-0.6, 0.6) * hh)
+            self.due_onset = onset
+            self.due_ns = onset + int(think_s / self.clock.speed * 1e9)
+        if now_ns() < self.due_ns:
+            return [0, 0, 0]
+        self.due_ns = None
+        self.answered_board = onset
+        self.pressed = True
+        self._inject('click')
+        return [1, 0, 0]
+
+    def next_target(self, kind):
+        if kind == 'action':
+            self.plan = self.policy.next_action()
+        elif self.plan and target_kind(self.plan[0][0]) == kind:
+            pass
+        else:  # off plan (e.g. after "Try again"): any target of the requested kind
+            self.plan = [(self.policy.target(kind), self.policy.think())]
+        return self.plan.pop(0)
+
+    # =========================
+    #  MEASUREMENT
+    # =========================
+    def input_to_flip(self, events):
+        """(latency_ns, input kind ids) from each injected input to the first flip after it (-1 if none)"""
+        flips = np.sort(events['t_ns'][events['kind'] == KIND_ID['flip']])
+        inject = np.array(self.inject_ns, dtype=np.int64)
+        idx = np.searchsorted(flips, inject, side='right')
+        latency = np.full(len(inject), -1, dtype=np.int64)
+        ok = idx < len(flips)
+        latency[ok] = flips[idx[ok]] - inject[ok]
+        return latency, np.array(self.inject_kind, dtype=np.int16)
+
+    def report(self, filename, io_worker, frame_monitor):
+        """Print and save this session's latency and render-cost samples"""
+        events = self.timeline.events()
+        latency, kinds = self.input_to_flip(events)
+        render_ns, render_phase = frame_monitor.render_costs()
+        games = int(np.count_nonzero(events['kind'] == KIND_ID['trial_end']))
+        io_worker.print("\n=== Bot Participant ===")
+        io_worker.print(f"{games} game(s), {len(latency)} inputs")
+        io_worker.print(summarize_samples(latency, kinds, INPUT_KINDS, "input-to-flip"))
+        io_worker.print(summarize_samples(render_ns, render_phase, frame_monitor.phases, "render"))
+        io_worker.call(save_report, filename, {
+            'latency_ns': latency, 'input_kind': kinds, 'render_ns': render_ns.copy(),
+            'render_phase': render_phase.copy(), 'phases': np.array(frame_monitor.phases), 'games': games,
+        })
+
+
+def bot_from_env(timeline, clock):
+    """Installed BotParticipant for TASK_BOT ("random" or "replay:<turn log>"), None if unset"""
+    mode = os.environ.get("TASK_BOT", "").strip()
+    if not mode:
+        return None
+    seed = os.environ.get("TASK_BOT_SEED")
+    rng = random.Random(int(seed) if seed else None)
+    if mode == "random":
+        policy = RandomPolicy(rng)
+    elif mode.startswith("replay:"):
+        policy = ReplayPolicy.from_turn_log(mode[len("replay:"):], rng)
+    else:
+        raise ValueError(f"TASK_BOT must be 'random' or 'replay:<turn log>', got {mode!r}")
+    return BotParticipant(policy, timeline, clock, name=os.environ.get("TASK_BOT_NAME", "bot"), rng=rng).install()
+
+def save_report(filename, arrays):
+    np.savez(filename, **arrays)
+
+def summarize_samples(values_ns, groups, names, what):
+    """One line per group: n, median, p95, p99 and max in ms"""
+    lines = []
+    for g, name in enumerate(names):
+        v = values_ns[(groups == g) & (values_ns >= 0)] / 1e6
+        if len(v):
+            p50, p95, p99 = np.percentile(v, [50, 95, 99])
+            lines.append(f"{what} {name}: n={len(v)}  median {p50:.2f} ms  p95 {p95:.2f} ms  "
+                         f"p99 {p99:.2f} ms  max {v.max():.2f} ms")
+    return "\n".join(lines) if lines else f"{what}: no samples"
+
+# =========================
+#  MAIN
+# =========================
+def main():
+    parser = argparse.ArgumentParser(description="Play the practice game with a scripted participant")
+    parser.add_argument('--games', type=int, default=20, help="games to play (2 per session)")
+    parser.add_argument('--policy', default='random', help="'random' or 'replay:<turn log>'")
+    parser.add_argument('--speed', default='100', help="TASK_CLOCK speed factor ('real' for real time)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--task', default='task_v0.1.py')
+    parser.add_argument('--xvfb', choices=['auto', 'yes', 'no'], default='auto',
+                        help="run under xvfb-run (auto: when there is no display on Linux)")
+    args = parser.parse_args()
+
+    cmd = [sys.executable, args.task]
+    use_xvfb = args.xvfb == 'yes' or (args.xvfb == 'auto' and sys.platform.startswith('linux')
+                                      and not os.environ.get('DISPLAY'))
+    if use_xvfb:
+        if shutil.which('xvfb-run') is None:
+            raise SystemExit("xvfb-run not found (install xvfb or run with a display)")
+        cmd = ['xvfb-run', '-a', '-s', '-screen 0 1280x720x24'] + cmd
+
+    before = set(glob.glob("bot_report_*.npz"))
+    n_sessions = (args.games + 1) // 2
+    t0 = time.time()
+    last_start = 0.0
+    for s in range(n_sessions):
+        # session files are stamped to the second: never start two sessions in the same second
+        time.sleep(max(0.0, 1.0 - (time.time() - last_start)))
+        last_start = time.time()
+        env = dict(os.environ, TASK_BOT=args.policy, TASK_CLOCK=args.speed, TASK_BOT_NAME=f"bot{s + 1:03d}")
+        if args.seed is not None:
+            env['TASK_BOT_SEED'] = str(args.seed + s)
+        result = subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL)
+        print(f"session {s + 1}/{n_sessions}: exit {result.returncode} ({time.time() - last_start:.1f} s)")
+    elapsed = time.time() - t0
+
+    files = sorted(set(glob.glob("bot_report_*.npz")) - before)
+    if not files:
+        raise SystemExit("No bot reports were written")
+    latency, kinds, render, phases = [], [], [], []
+    games = 0
+    for f in files:
+        with np.load(f) as data:
+            latency.append(data['latency_ns'])
+            kinds.append(data['input_kind'])
+            names = list(data['phases'])
+            render.append(data['render_ns'])
+            phases.append(np.array([names[p] for p in data['render_phase']], dtype=object))
+            games += int(data['games'])
+    render = np.concatenate(render)
+    phases = np.concatenate(phases)
+    phase_names = sorted(set(phases))
+    print(f"\n=== {games} games in {len(files)} sessions, {elapsed:.1f} s ===")
+    print(summarize_samples(np.concatenate(latency), np.concatenate(kinds), INPUT_KINDS, "input-to-flip"))
+    print(summarize_samples(render, np.array([phase_names.index(p) for p in phases]), phase_names, "render"))
+
+
+if __name__ == "__main__":
+    main()
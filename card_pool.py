@@ -0,0 +1,59 @@
+"""Card bookkeeping of the practice game: cards on the board and replacement draws.
+
+run_single_trial (task_v0.1.py) binds these methods under the names of its
+former nested helpers, and benchmarks.py times the same code. One CardPool
+per session allocates nothing per turn: the cards on the board and the
+candidates of a draw go into two preallocated lists that every turn reuses.
+"""
+import random
+
+
+class CardPool:
+    def __init__(self, deck):
+        self.deck = deck  # every (color, position) card, parsed from the stimulus names once
+        self.in_use = [None] * 9  # computer, participant and played cards (see cards_in_use)
+        self.available = [None] * len(deck)  # replacement candidates of one draw
+
+    def cards_in_use(self, computer_cards, participant_cards, played_sequence):
+        """Every card on the board (None for empty places), in one list reused across turns"""
+        in_use = self.in_use
+        for i in range(3):
+            in_use[i] = computer_cards[i]
+            in_use[3 + i] = participant_cards[i]
+            in_use[6 + i] = played_sequence[i]
+        return in_use
+
+    def get_available_cards_for_replacement(self, all_cards_in_use, missing_sequence_cards):
+        """Get cards that aren't in use, prioritizing sequence cards if missing"""
+        # If there are missing sequence cards, return one of those first
+        if missing_sequence_cards:
+            for card in missing_sequence_cards:
+                if card in self.deck and card not in all_cards_in_use:
+                    return card
+
+        # Candidates go into a preallocated list; randrange(n) draws like random.choice(available)
+        available = self.available
+        n = 0
+        for card in self.deck:
+            if card not in all_cards_in_use:
+                available[n] = card
+                n += 1
+        return available[random.randrange(n)] if n else None
+
+    def draw_new_card(self, all_cards_in_use, missing_sequence_cards=()):
+        """Draw a new card, prioritizing missing sequence cards"""
+        card = self.get_available_cards_for_replacement(all_cards_in_use, missing_sequence_cards)
+        if card is None:
+            raise ValueError("No more cards available!")
+        return card
+
+    def check_missing_sequence_cards(self, true_sequence, computer_cards, participant_cards, played_sequence):
+        """Check which sequence cards are missing from circulation"""
+        all_available_cards = self.cards_in_use(computer_cards, participant_cards, played_sequence)
+        missing_cards = []
+
+        for card in true_sequence:
+            if card not in all_available_cards:
+                missing_cards.append(card)
+
+        return missing_cards
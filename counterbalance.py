@@ -0,0 +1,188 @@
+"""Counterbalancing schedule for deals, turn order and localizer block order.
+
+The schedule is built once for a roster size and number of practice trials and
+saved as JSON. Each participant slot gets:
+- a deal stratum per trial, from a Williams balanced Latin square over the
+  deal-bank strata (every stratum appears once per trial position in each
+  complete block of slots, and every stratum follows every other equally often)
+- a first mover per trial, alternating across trials and balanced against
+  stratum across blocks
+- a localizer block order (color first / position first)
+
+The task claims the next free slot the first time a player name is seen (at
+session start, before the localizer) and reuses it on later sessions.
+
+Usage:
+    python counterbalance.py --participants 240 --trials 2
+"""
+import argparse
+import json
+import os
+import random
+from collections import Counter
+
+from deal_bank import N_STRATA
+
+SCHEDULE_FILE = "counterbalance_schedule.json"
+LOCALIZER_ORDERS = [["color", "position"], ["position", "color"]]
+
+# =========================
+#  LATIN SQUARE DESIGN
+# =========================
+def williams_square(n):
+    """Rows of a Williams (first-order carryover balanced) Latin square of order n.
+
+    Returns n rows for even n and 2n rows (square plus its mirror) for odd n.
+    """
+    first = [0]
+    low, high = 1, n - 1
+    while len(first) < n:
+        first.append(low)
+        low += 1
+        if len(first) < n:
+            first.append(high)
+            high -= 1
+    rows = [[(x + i) % n for x in first] for i in range(n)]
+    if n % 2:
+        rows += [list(reversed(row)) for row in rows]
+    return rows
+
+def build_schedule(n_participants, n_trials, n_strata=N_STRATA, seed=0):
+    """Build the full schedule dict for n_participants slots"""
+    rng = random.Random(seed)
+    square = williams_square(n_strata)
+    block = len(square)
+
+    slots = []
+    for start in range(0, n_participants, block):
+        # Each block of slots uses every square row once, in a random order
+        rows = list(range(block))
+        rng.shuffle(rows)
+        for offset, row_idx in enumerate(rows):
+            slot = start + offset
+            if slot >= n_participants:
+                break
+            replicate = slot // block
+            trials = []
+            for t in range(n_trials):
+                participant_first = (t + row_idx + replicate) % 2 == 0
+                trials.append({
+                    'trial': t + 1,
+                    'stratum': square[row_idx][t % n_strata],
+                    'first_mover': 'participant' if participant_first else 'ai',
+                })
+            slots.append({
+                'slot': slot,
+                'player': None,
+                'localizer_order': LOCALIZER_ORDERS[(row_idx // 2 + replicate) % 2],
+                'trials': trials,
+            })
+
+    return {
+        'n_participants': n_participants,
+        'n_trials': n_trials,
+        'n_strata': n_strata,
+        'seed': seed,
+        'slots': slots,
+    }
+
+def balance_report(schedule):
+    """Counts used to check the design: stratum per trial position and first mover per stratum"""
+    by_position = Counter()
+    first_by_stratum = Counter()
+    localizer = Counter()
+    for slot in schedule['slots']:
+        localizer[tuple(slot['localizer_order'])] += 1
+        for trial in slot['trials']:
+            by_position[(trial['trial'], trial['stratum'])] += 1
+            first_by_stratum[(trial['stratum'], trial['first_mover'])] += 1
+    return by_position, first_by_stratum, localizer
+
+# =========================
+#  PERSISTENCE AND LOOKUP
+# =========================
+class Schedule:
+    """Persisted schedule with lookup of a player's assignment by name"""
+
+    def __init__(self, data, filename=SCHEDULE_FILE, log=print):
+        self.data = data
+        self.filename = filename
+        self.log = log
+        self.by_player = {s['player']: s for s in data['slots'] if s['player'] is not None}
+
+    def save(self):
+        tmp = self.filename + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.data, f, indent=1)
+        os.replace(tmp, self.filename)
+
+    def assignment_for(self, player_name):
+        """Return the player's slot, claiming (and saving) the next free slot for a new name"""
+        if player_name in self.by_player:
+            return self.by_player[player_name]
+        for slot in self.data['slots']:
+            if slot['player'] is None:
+                slot['player'] = player_name
+                self.by_player[player_name] = slot
+                self.save()
+                self.log(f"✅ Assigned {player_name} to counterbalancing slot {slot['slot']}")
+                return slot
+        self.log(f"⚠️ Counterbalancing schedule is full ({len(self.data['slots'])} slots), using random assignment")
+        return None
+
+def trial_plan(assignment, trial_number):
+    """Scheduled stratum and first mover for a trial, or None if not scheduled"""
+    if assignment is None:
+        return None
+    for trial in assignment['trials']:
+        if trial['trial'] == trial_number:
+            return trial
+    return None
+
+def localizer_order(assignment):
+    """Scheduled localizer block order, or color first if not scheduled"""
+    if assignment is None:
+        return tuple(LOCALIZER_ORDERS[0])
+    return tuple(assignment['localizer_order'])
+
+def load_schedule(filename=SCHEDULE_FILE, log=print):
+    """Load the persisted schedule, or None if none has been built"""
+    if not os.path.exists(filename):
+        log(f"⚠️ No counterbalancing schedule at {filename}, deals and turn order will be random")
+        return None
+    with open(filename) as f:
+        return Schedule(json.load(f), filename, log=log)
+
+# =========================
+#  MAIN
+# =========================
+def main():
+    parser = argparse.ArgumentParser(description="Build the participant counterbalancing schedule")
+    parser.add_argument('--participants', type=int, required=True, help="roster size")
+    parser.add_argument('--trials', type=int, default=2, help="practice trials per participant")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=SCHEDULE_FILE)
+    parser.add_argument('--force', action='store_true', help="overwrite an existing schedule")
+    args = parser.parse_args()
+
+    if os.path.exists(args.out) and not args.force:
+        raise SystemExit(f"{args.out} already exists (it may hold player assignments); use --force to overwrite")
+
+    data = build_schedule(args.participants, args.trials, seed=args.seed)
+    Schedule(data, args.out).save()
+    print(f"✅ Schedule for {args.participants} participants × {args.trials} trials saved to {args.out}")
+
+    by_position, first_by_stratum, localizer = balance_report(data)
+    print("\n=== Stratum counts per trial ===")
+    for t in range(1, args.trials + 1):
+        print(f"Trial {t}: " + " ".join(f"{by_position[(t, s)]:3d}" for s in range(data['n_strata'])))
+    print("\n=== First mover per stratum (participant/ai) ===")
+    print(" ".join(f"{first_by_stratum[(s, 'participant')]}/{first_by_stratum[(s, 'ai')]}"
+                   for s in range(data['n_strata'])))
+    print("\n=== Localizer block order ===")
+    for order, n in localizer.items():
+        print(f"{' → '.join(order)}: {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Precomputed bank of balanced deals for the practice game.
+
+Every valid deal (target sequence + both starting hands) is generated offline,
+tagged with difficulty features and grouped into strata, then saved as a
+compact .npz file. At run time a deal is drawn in O(1): pick a stratum, pick a
+random row inside its contiguous block.
+
+A deal follows the same rules as the original per-trial setup: 3 distinct
+target cards, the participant holds 1 or 2 of them and the AI the rest, the
+remaining hand slots are filled with non-sequence cards, and hands are shuffled.
+
+Usage:
+    python deal_bank.py                         # writes deal_bank.npz
+    python deal_bank.py --fillers-per-split 8 --seed 1 --out deal_bank.npz
+"""
+import argparse
+import itertools
+import os
+import random
+
+import numpy as np
+
+from game_sim import ALL_CARDS
+
+DEAL_BANK_FILE = "deal_bank.npz"
+CARD_INDEX = {card: i for i, card in enumerate(ALL_CARDS)}
+
+# Column layout of the `deals` array (card indices into ALL_CARDS)
+SEQ_COLS = slice(0, 3)
+AI_COLS = slice(3, 6)
+PARTICIPANT_COLS = slice(6, 9)
+
+# Column layout of the `features` array
+FEATURE_NAMES = ['split', 'shared_colors', 'shared_positions', 'distractor_similarity', 'stratum']
+
+# =========================
+#  DIFFICULTY FEATURES
+# =========================
+def deal_features(true_sequence, computer_cards, participant_cards):
+    """Difficulty features of a deal.
+
+    split: sequence cards held by the participant (1 or 2)
+    shared_colors / shared_positions: repeated colors / positions within the target
+    distractor_similarity: color or position matches between the non-sequence
+        cards in play and the target cards (0-6)
+    """
+    split = sum(card in true_sequence for card in participant_cards)
+    seq_colors = [c for c, _ in true_sequence]
+    seq_positions = [p for _, p in true_sequence]
+    shared_colors = 3 - len(set(seq_colors))
+    shared_positions = 3 - len(set(seq_positions))
+    fillers = [card for card in computer_cards + participant_cards if card not in true_sequence]
+    distractor_similarity = sum((c in seq_colors) + (p in seq_positions) for c, p in fillers)
+    return split, shared_colors, shared_positions, distractor_similarity
+
+def stratum_of(split, shared_colors, shared_positions, distractor_similarity):
+    """Collapse the features into one of 12 strata:
+    split (1/2) × target overlap (none / one / more) × distractors (low / high)"""
+    overlap = min(shared_colors + shared_positions, 2)
+    distractor_level = 1 if distractor_similarity >= 4 else 0
+    return (split - 1) * 6 + overlap * 2 + distractor_level
+
+N_STRATA = 12
+
+def describe_stratum(stratum):
+    """Human-readable label for a stratum id"""
+    split, rest = divmod(stratum, 6)
+    overlap, distractor_level = divmod(rest, 2)
+    return (f"participant holds {split + 1} | "
+            f"{['no', 'one', 'multiple'][overlap]} shared feature(s) in target | "
+            f"{['low', 'high'][distractor_level]} distractor similarity")
+
+# =========================
+#  GENERATION
+# =========================
+def build_deal_bank(fillers_per_split=4, seed=0):
+    """Enumerate every (target sequence, sequence split) and sample filler hands for each.
+
+    Returns (deals, features, offsets): deals and features sorted by stratum,
+    offsets[s]:offsets[s+1] is the block of rows in stratum s.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for true_sequence in itertools.permutations(ALL_CARDS, 3):
+        true_sequence = list(true_sequence)
+        remaining = [card for card in ALL_CARDS if card not in true_sequence]
+        for n_participant in (1, 2):
+            for participant_seq in itertools.combinations(true_sequence, n_participant):
+                ai_seq = [card for card in true_sequence if card not in participant_seq]
+                for _ in range(fillers_per_split):
+                    fillers = rng.sample(remaining, 3)  # three non-sequence slots across both hands
+                    computer_cards = ai_seq + fillers[:3 - len(ai_seq)]
+                    participant_cards = list(participant_seq) + fillers[3 - len(ai_seq):]
+                    rng.shuffle(computer_cards)
+                    rng.shuffle(participant_cards)
+                    feats = deal_features(true_sequence, computer_cards, participant_cards)
+                    rows.append((
+                        [CARD_INDEX[c] for c in true_sequence + computer_cards + participant_cards],
+                        list(feats) + [stratum_of(*feats)],
+                    ))
+
+    deals = np.array([r[0] for r in rows], dtype=np.uint8)
+    features = np.array([r[1] for r in rows], dtype=np.uint8)
+    order = np.argsort(features[:, -1], kind='stable')
+    deals, features = deals[order], features[order]
+    offsets = np.searchsorted(features[:, -1], np.arange(N_STRATA + 1)).astype(np.int64)
+    return deals, features, offsets
+
+def save_deal_bank(filename, deals, features, offsets):
+    np.savez_compressed(filename, deals=deals, features=features, offsets=offsets)
+
+# =========================
+#  RUN-TIME ACCESS
+# =========================
+class DealBank:
+    """Loaded deal bank with O(1) draws.
+
+    draw(stratum) returns a specific stratum; draw() cycles through a shuffled
+    order of the non-empty strata so difficulty stays balanced within a session.
+    """
+
+    def __init__(self, deals, features, offsets, rng=None):
+        self.deals = deals
+        self.features = features
+        self.offsets = offsets
+        self.rng = rng or random.Random()
+        self.strata = [s for s in range(N_STRATA) if offsets[s + 1] > offsets[s]]
+        self._rotation = []
+
+    def stratum_size(self, stratum):
+        return int(self.offsets[stratum + 1] - self.offsets[stratum])
+
+    def next_stratum(self):
+        """Next stratum of a shuffled round-robin over all strata"""
+        if not self._rotation:
+            self._rotation = list(self.strata)
+            self.rng.shuffle(self._rotation)
+        return self._rotation.pop()
+
+    def draw(self, stratum=None):
+        """Return a deal dict: true_sequence, computer_cards, participant_cards, stratum, features"""
+        if stratum is None:
+            stratum = self.next_stratum()
+        if stratum not in self.strata:
+            raise ValueError(f"Deal bank has no deals in stratum {stratum}")
+        row = self.rng.randrange(int(self.offsets[stratum]), int(self.offsets[stratum + 1]))
+        return self.deal_at(row)
+
+    def deal_at(self, row):
+        cards = [ALL_CARDS[i] for i in self.deals[row]]
+        feats = dict(zip(FEATURE_NAMES, (int(x) for x in self.features[row])))
+        return {
+            'row': row,
+            'true_sequence': cards[SEQ_COLS],
+            'computer_cards': cards[AI_COLS],
+            'participant_cards': cards[PARTICIPANT_COLS],
+            'stratum': feats['stratum'],
+            'features': feats,
+        }
+
+def load_deal_bank(filename=DEAL_BANK_FILE, rng=None, log=print):
+    """Load the deal bank, generating and saving it first if the file is missing"""
+    if not os.path.exists(filename):
+        log(f"⚠️ Deal bank not found at {filename}, generating it now...")
+        deals, features, offsets = build_deal_bank()
+        save_deal_bank(filename, deals, features, offsets)
+    with np.load(filename) as data:
+        return DealBank(data['deals'], data['features'], data['offsets'], rng=rng)
+
+# =========================
+#  MAIN
+# =========================
+def main():
+    parser = argparse.ArgumentParser(description="Generate the stratified deal bank")
+    parser.add_argument('--fillers-per-split', type=int, default=4,
+                        help="filler hands sampled per (target sequence, split)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=DEAL_BANK_FILE)
+    args = parser.parse_args()
+
+    deals, features, offsets = build_deal_bank(args.fillers_per_split, args.seed)
+    save_deal_bank(args.out, deals, features, offsets)
+
+    print(f"✅ {len(deals)} deals saved to {args.out} ({os.path.getsize(args.out) / 1024:.0f} KB)")
+    print("\n=== Deals per stratum ===")
+    for s in range(N_STRATA):
+        print(f"{s:2d}: {offsets[s + 1] - offsets[s]:6d}  {describe_stratum(s)}")
+
+
+if __name__ == "__main__":
+    main()
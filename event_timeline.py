@@ -0,0 +1,212 @@
+"""Session-wide event timeline on one monotonic nanosecond clock.
+
+Every flip, stimulus onset, input event and game action is recorded as
+(t_ns, kind, trial, value, label) into preallocated NumPy column buffers, so
+recording an event costs one clock read and a few array stores. All times
+come from time.perf_counter_ns(), the clock PsychoPy itself uses, so they can
+be aligned with the acquisition system through the marker and photodiode logs.
+
+Flips are timestamped inside win.callOnFlip callbacks, i.e. right after the
+buffer swap returns, not after win.flip() returns to the caller. The flip stamp
+is always the first callback of its frame, so onsets and markers scheduled for
+the same flip are recorded after it.
+"""
+import atexit
+import json
+import time
+
+import numpy as np
+
+now_ns = time.perf_counter_ns
+
+EVENT_KINDS = [
+    'flip',            # every win.flip()
+    'fixation_onset',
+    'stim_onset',
+    'feedback_onset',
+    'board_onset',     # render_board content on screen
+    'message_onset',   # instruction / summary screens
+    'key',
+    'click',
+    'turn',            # one turn_by_turn_log row (label = "Player Action")
+    'trial_start',
+    'trial_end',
+    'block_start',
+    'block_end',
+    'session_start',
+    'session_end',
+    'marker',          # event code sent to the acquisition system (value = code)
+    'photodiode',      # photodiode patch toggle (value = new state, 1 = white)
+    'frame_drop',      # flip that missed its vsync (value = frames dropped, label = source)
+    'wait',            # timed pause started (value = nominal ms, see task_clock.py)
+    'gc',              # garbage collection (value = pause in µs, label = kind and generation, see realtime.py)
+]
+KIND_ID = {k: i for i, k in enumerate(EVENT_KINDS)}
+
+EVENT_DTYPE = np.dtype([
+    ('t_ns', np.int64),
+    ('kind', np.uint16),
+    ('trial', np.int32),
+    ('value', np.int32),
+    ('label', np.int32),  # index into EventTimeline.labels, -1 for none
+])
+
+
+class EventTimeline:
+    def __init__(self, capacity=200_000):
+        self.columns = {name: np.zeros(capacity, dtype=EVENT_DTYPE[name]) for name in EVENT_DTYPE.names}
+        self.t_col, self.kind_col, self.trial_col, self.value_col, self.label_col = (
+            self.columns[name] for name in EVENT_DTYPE.names)
+        self.capacity = capacity
+        self.n = 0
+        self.labels = []
+        self.label_ids = {}
+        self.grow_count = 0
+        self.win = None
+        self.flip_pending = False
+        self.trial = -1  # default trial index for new events (see set_trial)
+        self.saved_to = None
+        self.last_t = [None] * len(EVENT_KINDS)  # latest timestamp per kind
+        self.record_overhead_ns = self.measure_overhead()
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.last_t = [None] * len(EVENT_KINDS)
+        self.origin_ns = now_ns()
+        self.origin_wall = time.time()
+
+    def measure_overhead(self, n=2000):
+        """Median cost of one record() call in ns (stored with the timeline as its known latency)"""
+        samples = np.empty(n, dtype=np.int64)
+        for i in range(n):
+            self.n = 0  # overwrite the first slot; reset() clears it afterwards
+            t0 = now_ns()
+            self.record('flip')
+            samples[i] = now_ns() - t0
+        return int(np.median(samples))
+
+    # =========================
+    #  RECORDING
+    # =========================
+    def set_trial(self, trial):
+        """Trial index attached to subsequent events that don't pass one"""
+        self.trial = trial
+
+    def record(self, kind, trial=None, value=-1, label=None, t_ns=None):
+        """Record an event now (or at t_ns) and return its timestamp"""
+        if t_ns is None:
+            t_ns = now_ns()
+        kind_id = KIND_ID[kind]
+        i = self.n
+        if i == self.capacity:
+            self._grow()
+        self.t_col[i] = t_ns
+        self.kind_col[i] = kind_id
+        self.trial_col[i] = self.trial if trial is None else trial
+        self.value_col[i] = value
+        self.label_col[i] = -1 if label is None else self.label_id(label)
+        self.n = i + 1
+        self.last_t[kind_id] = t_ns
+        return t_ns
+
+    def _grow(self):
+        """Out of preallocated space: double it (counted, should not happen in a normal session)"""
+        for name, col in self.columns.items():
+            self.columns[name] = np.concatenate([col, np.zeros_like(col)])
+        self.t_col, self.kind_col, self.trial_col, self.value_col, self.label_col = (
+            self.columns[name] for name in EVENT_DTYPE.names)
+        self.capacity *= 2
+        self.grow_count += 1
+
+    def label_id(self, label):
+        idx = self.label_ids.get(label)
+        if idx is None:
+            idx = self.label_ids[label] = len(self.labels)
+            self.labels.append(label)
+        return idx
+
+    def on_flip(self, kind, trial=None, value=-1, label=None):
+        """Record an onset event at the next flip, in the same callback as the flip itself"""
+        self.stamp_next_flip()
+        self.win.callOnFlip(self.record, kind, trial, value, label)
+
+    def stamp_next_flip(self):
+        """Make sure the next flip's stamp is queued before any other flip callback"""
+        if not self.flip_pending:
+            self.flip_pending = True
+            self.win.callOnFlip(self._flip_callback)
+
+    def _flip_callback(self):
+        self.flip_pending = False
+        self.record('flip')
+
+    def attach(self, win):
+        """Timestamp every flip of win via callOnFlip"""
+        self.win = win
+        original_flip = win.flip
+
+        def flip(*args, **kwargs):
+            self.stamp_next_flip()
+            return original_flip(*args, **kwargs)
+        win.flip = flip
+        return self
+
+    # =========================
+    #  QUERIES AND EXPORT
+    # =========================
+    def events(self):
+        """Structured array (EVENT_DTYPE) of everything recorded so far"""
+        out = np.empty(self.n, dtype=EVENT_DTYPE)
+        for name, col in self.columns.items():
+            out[name] = col[:self.n]
+        return out
+
+    def last(self, kind):
+        """Timestamp of the most recent event of this kind (None if none yet)"""
+        return self.last_t[KIND_ID[kind]]
+
+    def seconds_since(self, t_ns, end_ns=None):
+        """Elapsed seconds between two timeline timestamps (end defaults to now)"""
+        return ((end_ns if end_ns is not None else now_ns()) - t_ns) / 1e9
+
+    def snapshot(self):
+        """Copy of everything needed to save the timeline (safe to hand to another thread)"""
+        return {
+            'events': self.events(),
+            'kinds': list(EVENT_KINDS),
+            'labels': list(self.labels),
+            'origin_ns': self.origin_ns,
+            'origin_wall': self.origin_wall,
+            'record_overhead_ns': self.record_overhead_ns,
+            'clock': 'time.perf_counter_ns',
+            'grow_count': self.grow_count,
+        }
+
+    def save(self, filename, io_worker=None):
+        """Save as .npz (events array + JSON metadata), on the I/O worker if one is given"""
+        snap = self.snapshot()
+        self.saved_to = filename
+        if io_worker is not None:
+            io_worker.call(save_snapshot, filename, snap)
+        else:
+            save_snapshot(filename, snap)
+
+    def autosave(self, filename, io_worker=None):
+        """Save at interpreter exit (e.g. core.quit()) unless saved explicitly before"""
+        def save_at_exit():
+            if self.saved_to is None:
+                self.save(filename, io_worker)
+                if io_worker is not None:
+                    io_worker.flush(timeout=5)
+        atexit.register(save_at_exit)
+
+
+def save_snapshot(filename, snap):
+    meta = {k: v for k, v in snap.items() if k != 'events'}
+    np.savez(filename, events=snap['events'], meta=np.array(json.dumps(meta)))
+
+def load_timeline(filename):
+    """Return (events structured array, metadata dict)"""
+    with np.load(filename) as data:
+        return data['events'], json.loads(str(data['meta']))
@@ -0,0 +1,222 @@
+"""Frame-timing monitor: flip intervals, dropped frames and per-phase report.
+
+Every flip is checked against the refresh grid measured at start-up. The
+task calls frame_start() when it starts preparing a new frame after a wait or
+an input (end of safe_wait, a click, a key press); that frame should then be
+on screen at the first vsync at least a quarter frame later, and every frame
+later than that is counted as dropped, so slow drawing before win.flip() is
+caught. Without frame_start(), a flip called within a frame of the previous
+one (frame-locked loops) is due one frame after it, and any other flip is
+due at the first vsync after the call. Flips more than `max_gap_s` after the
+previous one are not checked (the vsync grid can no longer be trusted).
+
+Drops are attributed to the current phase (set_phase) and trial (the event
+timeline's trial index), and to the source of the flip (tag_next_flip, e.g.
+'render_board'). Each drop is also a 'frame_drop' event on the timeline. The
+most recent `capacity` flips are kept in a ring buffer for inspection, with
+the render cost of each (time from the frame start to the flip call, when
+known); totals
+per phase and per trial are kept for the whole session and written by
+report() at session end, with the trials over the rejection threshold flagged.
+The first `first_frames` checked flips of every phase are also counted on
+their own: after the warm-up (warmup.py) they should be as punctual as the
+rest, and the report lists the phases where they were not.
+"""
+import csv
+import math
+
+import numpy as np
+
+from event_timeline import now_ns
+
+DEFAULT_REFRESH_HZ = 60.0
+
+
+class FrameMonitor:
+    def __init__(self, timeline, capacity=4096, max_gap_s=2.0, reject_drops=1, first_frames=5):
+        self.timeline = timeline
+        self.capacity = capacity
+        self.intervals = np.zeros(capacity, dtype=np.int64)  # ns between consecutive flips
+        self.late = np.zeros(capacity, dtype=np.int16)       # dropped frames at each flip
+        self.phase_ids = np.zeros(capacity, dtype=np.int16)
+        self.render = np.full(capacity, -1, dtype=np.int64)  # ns from frame start to flip call, -1 if unknown
+        self.n_flips = 0
+        self.max_gap_ns = int(max_gap_s * 1e9)
+        self.reject_drops = reject_drops  # trials with at least this many drops are flagged
+        self.first_frames = first_frames  # checked flips per phase counted as its first frames
+        self.prep_fraction = 0.25  # minimum time (in frames) allowed to draw a frame after frame_start()
+        self.period_ns = int(1e9 / DEFAULT_REFRESH_HZ)
+        self.refresh_source = 'default'
+        self.phases = []
+        self.phase_index = {}
+        self.phase = None
+        self.set_phase('setup')
+        self.source = None
+        self.last_flip = None
+        self.start_ns = None
+        self.by_phase = {}   # phase -> {'flips', 'checked', 'dropped', 'worst_ns', 'first_dropped'}
+        self.by_source = {}  # source -> dropped frames
+        self.by_trial = {}   # (phase, trial) -> dropped frames
+
+    def measure_refresh(self, win):
+        """Use the window's measured refresh rate as the reference period"""
+        rate = None
+        try:
+            rate = win.getActualFrameRate(nIdentical=20, nMaxFrames=120, nWarmUpFrames=10)
+        except Exception:
+            pass
+        if rate:
+            self.period_ns = int(1e9 / rate)
+            self.refresh_source = 'measured'
+        self.last_flip = None  # the measurement flips are not part of the session
+        return 1e9 / self.period_ns
+
+    def attach(self, win):
+        """Check every flip of win (install after the timeline so its flip stamp is available)"""
+        original_flip = win.flip
+
+        def flip(*args, **kwargs):
+            t_call = now_ns()
+            result = original_flip(*args, **kwargs)
+            self._check(t_call, self.timeline.last('flip'))
+            return result
+        win.flip = flip
+        return self
+
+    # =========================
+    #  ATTRIBUTION
+    # =========================
+    def set_phase(self, phase):
+        """Name of what the task is doing now, e.g. 'localizer_trial', 'ai_turn'"""
+        if phase not in self.phase_index:
+            self.phase_index[phase] = len(self.phases)
+            self.phases.append(phase)
+        self.phase = phase
+
+    def frame_start(self):
+        """The task starts preparing the next frame now (after a wait or an input)"""
+        self.start_ns = now_ns()
+
+    def tag_next_flip(self, source):
+        """Attribute the next flip to a drawing routine, e.g. 'render_board'"""
+        self.source = source
+
+    def dropped_in_trial(self, phase, trial):
+        return self.by_trial.get((phase, trial), 0)
+
+    # =========================
+    #  CHECKING
+    # =========================
+    def _check(self, t_call, t_flip):
+        source, self.source = self.source, None
+        stats = self.by_phase.get(self.phase)
+        if stats is None:
+            stats = self.by_phase[self.phase] = {'flips': 0, 'checked': 0, 'dropped': 0, 'worst_ns': 0,
+                                                 'first_dropped': 0}
+        stats['flips'] += 1
+        last, self.last_flip = self.last_flip, t_flip
+        if last is None or t_flip is None:
+            return
+
+        interval = t_flip - last
+        dropped = 0
+        start, self.start_ns = self.start_ns, None
+        render = -1
+        if start is None or start < last:
+            start = last if t_call - last < self.period_ns else t_call
+            if start == last:
+                render = t_call - last
+        else:
+            render = t_call - start
+        elapsed = start - last
+        if elapsed < self.max_gap_ns:
+            stats['checked'] += 1
+            due = max(1, math.ceil(elapsed / self.period_ns + self.prep_fraction))
+            expected = last + due * self.period_ns
+            dropped = int((t_flip - expected) / self.period_ns + 0.5)
+            if dropped > 0:
+                stats['dropped'] += dropped
+                if stats['checked'] <= self.first_frames:
+                    stats['first_dropped'] += dropped
+                stats['worst_ns'] = max(stats['worst_ns'], interval)
+                trial = (self.phase, self.timeline.trial)
+                self.by_trial[trial] = self.by_trial.get(trial, 0) + dropped
+                source = source or 'other'
+                self.by_source[source] = self.by_source.get(source, 0) + dropped
+                self.timeline.record('frame_drop', value=dropped, label=source, t_ns=t_flip)
+            else:
+                dropped = 0
+
+        i = self.n_flips % self.capacity
+        self.intervals[i] = interval
+        self.late[i] = dropped
+        self.phase_ids[i] = self.phase_index[self.phase]
+        self.render[i] = render
+        self.n_flips += 1
+
+    def recent(self):
+        """(intervals_ns, dropped, phase names) of the flips still in the ring buffer, oldest first"""
+        n = min(self.n_flips, self.capacity)
+        order = (np.arange(n) + self.n_flips - n) % self.capacity
+        return self.intervals[order], self.late[order], [self.phases[p] for p in self.phase_ids[order]]
+
+    def render_costs(self):
+        """(render_ns, phase ids) of the flips in the ring buffer whose frame start is known; names in self.phases"""
+        n = min(self.n_flips, self.capacity)
+        known = self.render[:n] >= 0
+        return self.render[:n][known], self.phase_ids[:n][known]
+
+    # =========================
+    #  REPORT
+    # =========================
+    def flagged_trials(self):
+        return sorted(key for key, n in self.by_trial.items() if n >= self.reject_drops)
+
+    def late_first_frames(self):
+        """{phase: dropped frames} over the first frames of each phase that had any"""
+        return {phase: stats['first_dropped'] for phase, stats in self.by_phase.items() if stats['first_dropped']}
+
+    def summary(self):
+        """Session summary as printable text"""
+        intervals, _, _ = self.recent()
+        single = intervals[(intervals > 0.5 * self.period_ns) & (intervals < 1.5 * self.period_ns)]
+        lines = [f"Refresh: {1e9 / self.period_ns:.2f} Hz ({self.refresh_source})"
+                 + (f", median back-to-back interval {np.median(single) / 1e6:.3f} ms" if len(single) else "")]
+        for phase in self.phases:
+            stats = self.by_phase.get(phase)
+            if stats:
+                lines.append(f"{phase}: {stats['flips']} flips, {stats['checked']} checked, "
+                             f"{stats['dropped']} dropped"
+                             + (f" (worst interval {stats['worst_ns'] / 1e6:.1f} ms)" if stats['dropped'] else ""))
+        first_checked = sum(min(stats['checked'], self.first_frames) for stats in self.by_phase.values())
+        late = self.late_first_frames()
+        lines.append(f"First {self.first_frames} frames of each phase: {first_checked} checked, "
+                     f"{sum(late.values())} dropped"
+                     + (" (" + ", ".join(f"{p} {n}" for p, n in late.items()) + ")" if late else ""))
+        if self.by_source:
+            lines.append("Dropped by source: " + ", ".join(f"{k} {v}" for k, v in sorted(self.by_source.items())))
+        flagged = self.flagged_trials()
+        lines.append(f"Trials with timing glitches: {len(flagged)}"
+                     + (" (" + ", ".join(f"{p} {t}" for p, t in flagged) + ")" if flagged else ""))
+        return "\n".join(lines)
+
+    def report(self, filename, io_worker):
+        """Print the summary and write one row per phase and per glitched trial"""
+        io_worker.print("\n=== Frame Timing ===")
+        io_worker.print(self.summary())
+        rows = [['Scope', 'Phase', 'Trial', 'Flips', 'Checked', 'Dropped', 'Worst_Interval_MS', 'Reject',
+                 'First_Frames_Dropped']]
+        for phase in self.phases:
+            stats = self.by_phase.get(phase)
+            if stats:
+                rows.append(['phase', phase, '', stats['flips'], stats['checked'], stats['dropped'],
+                             round(stats['worst_ns'] / 1e6, 3), '', stats['first_dropped']])
+        for (phase, trial), dropped in sorted(self.by_trial.items()):
+            rows.append(['trial', phase, trial, '', '', dropped, '', int(dropped >= self.reject_drops), ''])
+
+        def opener():
+            f = open(filename, 'w', newline='')
+            return f, csv.writer(f)
+        io_worker.open_stream(filename, opener)
+        io_worker.write_rows(filename, rows)
+        io_worker.close_stream(filename)
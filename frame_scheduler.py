@@ -0,0 +1,89 @@
+"""Frame-count presentation of timed displays.
+
+A requested duration is converted to a whole number of frames at the
+refresh period measured by the frame monitor, and present() flips the
+window itself for exactly that many frames, redrawing the static content on
+every frame. The display ends at the next flip, whoever makes it; the
+achieved on-screen time (first flip of the display to that next flip) is
+logged per event to `presentation_log_<session>.csv` through the I/O worker,
+next to the nominal duration and frame count. With an accelerated task clock
+(task_clock.py) displays get 1/speed of their frames and the achieved time is
+logged in the clock's nominal seconds.
+"""
+import csv
+
+PRESENTATION_LOG_HEADER = ['Event', 'Trial', 'Nominal_S', 'Frames', 'Frame_Period_MS',
+                           'Achieved_S', 'Achieved_Frames']
+
+
+class FrameScheduler:
+    def __init__(self, win, timeline, frame_monitor, io_worker, filename, clock=None):
+        self.win = win
+        self.clock = clock
+        self.frame_scale = clock.frame_scale if clock is not None else 1.0
+        self.timeline = timeline
+        self.frame_monitor = frame_monitor
+        self.io_worker = io_worker
+        self.key = filename
+        self.pending = None
+        self.n_logged = 0
+
+        def opener():
+            f = open(filename, 'w', newline='')
+            writer = csv.writer(f)
+            writer.writerow(PRESENTATION_LOG_HEADER)
+            return f, writer
+        io_worker.open_stream(self.key, opener)
+
+    @property
+    def period_s(self):
+        return self.frame_monitor.period_ns / 1e9
+
+    def frames_for(self, secs):
+        """Whole number of frames closest to secs (at least 1)"""
+        return max(1, round(secs * self.frame_scale / self.period_s))
+
+    def present(self, draw, secs, event, onset=None):
+        """Show draw() for the frames closest to secs, flipping every frame.
+
+        onset() runs right before the first flip, for flip-locked onset
+        events (timeline, markers, photodiode). Returns the frame count.
+        """
+        n_frames = self.frames_for(secs)
+        for frame in range(n_frames):
+            self.frame_monitor.frame_start()
+            draw()
+            if frame == 0 and onset is not None:
+                onset()
+            self.win.flip()
+            if frame == 0:
+                onset_ns = self.timeline.last('flip')
+        self.end_on_next_flip(event, self.timeline.trial, secs, n_frames, onset_ns)
+        self.frame_monitor.frame_start()  # the next display is due on the following frame
+        return n_frames
+
+    def end_on_next_flip(self, event, trial, nominal, n_frames, onset_ns):
+        """Log a display that started at onset_ns and ends with the next flip, from that flip's callbacks"""
+        self.pending = (event, trial, nominal, n_frames, onset_ns)
+        self.timeline.stamp_next_flip()
+        self.win.callOnFlip(self._finish)
+
+    def _finish(self):
+        if self.pending is None:
+            return
+        event, trial, nominal, n_frames, onset_ns = self.pending
+        self.pending = None
+        self.log(event, trial, nominal, n_frames, (self.timeline.last('flip') - onset_ns) / 1e9)
+
+    def log(self, event, trial, nominal, n_frames, achieved):
+        """One presentation log row (durations in seconds; achieved is real time, logged as nominal)"""
+        if self.clock is not None:
+            achieved = self.clock.nominal(achieved)
+        self.io_worker.write_row(self.key, [
+            event, trial, f"{nominal:.4f}", n_frames, f"{self.period_s * 1e3:.4f}",
+            f"{achieved:.6f}", round(achieved * self.frame_scale / self.period_s, 2),
+        ])
+        self.n_logged += 1
+
+    def close(self):
+        self.io_worker.close_stream(self.key)
@@ -0,0 +1,296 @@
+import random
+
+from card_pool import CardPool
+from optimal_ai import OptimalAI
+
+# =========================
+#  CARD UNIVERSE
+# =========================
+# Same 16 cards as the non-rotated stimuli ({color}_{position}_square.png)
+COLORS = ["yellow", "blue", "cyan", "orange"]
+POSITIONS = ["up", "down", "left", "right"]
+ALL_CARDS = [(c, p) for c in COLORS for p in POSITIONS]
+
+# =========================
+#  DEALING
+# =========================
+def draw_new_card(all_cards_in_use, missing_sequence_cards=()):
+    """Draw a new card, prioritizing missing sequence cards"""
+    used_pairs = set(all_cards_in_use)
+    available = [card for card in ALL_CARDS if card not in used_pairs]
+    for card in missing_sequence_cards:
+        if card in available:
+            return card
+    if not available:
+        raise ValueError("No more cards available!")
+    return random.choice(available)
+
+def deal_game():
+    """Deal a balanced game: returns (true_sequence, computer_cards, participant_cards)"""
+    true_sequence = random.sample(ALL_CARDS, 3)
+    num_participant_sequence_cards = random.randint(1, 2)
+    participant_sequence_cards = random.sample(true_sequence, num_participant_sequence_cards)
+    ai_sequence_cards = [card for card in true_sequence if card not in participant_sequence_cards]
+
+    all_used = set(true_sequence)
+    hands = []
+    for hand in (list(ai_sequence_cards), list(participant_sequence_cards)):
+        while len(hand) < 3:
+            new_card = draw_new_card(all_used)
+            hand.append(new_card)
+            all_used.add(new_card)
+        random.shuffle(hand)
+        hands.append(hand)
+
+    return true_sequence, hands[0], hands[1]
+
+
+# =========================
+#  SIMULATED PARTICIPANT
+# =========================
+class SimulatedParticipant:
+    """Scripted participant that remembers the target sequence and follows hints.
+
+    Priority: play a fully hinted card that fits an open slot, otherwise hint the
+    AI about one of its sequence cards, otherwise replace a card that cannot help.
+    With probability `noise` a random legal action is taken instead.
+    """
+
+    def __init__(self, true_sequence, noise=0.0):
+        self.true_sequence = true_sequence
+        self.noise = noise
+        self.hints_given = {0: set(), 1: set(), 2: set()}  # hint types given per AI card
+
+    def forget_ai_card(self, idx):
+        """A new card was dealt into AI slot idx"""
+        self.hints_given[idx] = set()
+
+    def choose_action(self, computer_cards, participant_hints, played_sequence):
+        """Return ('play', card_idx, slot_idx), ('hint', ai_idx, hint_type) or ('replace', card_idx)"""
+        if self.noise and random.random() < self.noise:
+            return self.random_action(computer_cards, played_sequence)
+
+        open_slots = [i for i, card in enumerate(played_sequence) if card is None]
+
+        # 1. Play a card whose color and position are both known and needed
+        for idx, info in participant_hints.items():
+            if info['color'] and info['position']:
+                card = (info['color'], info['position'])
+                if card in self.true_sequence:
+                    slot_idx = self.true_sequence.index(card)
+                    if slot_idx in open_slots:
+                        return ('play', idx, slot_idx)
+
+        # 2. Hint the AI about a sequence card it holds
+        for idx, card in enumerate(computer_cards):
+            if card and card in self.true_sequence and self.true_sequence.index(card) in open_slots:
+                for hint_type in ('color', 'position'):
+                    if hint_type not in self.hints_given[idx]:
+                        return ('hint', idx, hint_type)
+
+        # 3. Replace a card the hints rule out, else the least-hinted card
+        needed = [self.true_sequence[i] for i in open_slots]
+        for idx, info in participant_hints.items():
+            if info['color'] and info['color'] not in [c for c, _ in needed]:
+                return ('replace', idx)
+            if info['position'] and info['position'] not in [p for _, p in needed]:
+                return ('replace', idx)
+        unhinted = [idx for idx, info in participant_hints.items()
+                    if not info['color'] and not info['position']]
+        if unhinted:
+            return ('replace', random.choice(unhinted))
+        return self.random_action(computer_cards, played_sequence)
+
+    def random_action(self, computer_cards, played_sequence):
+        kind = random.choice(['hint', 'play', 'replace'])
+        open_slots = [i for i, card in enumerate(played_sequence) if card is None]
+        if kind == 'hint':
+            held = [i for i, card in enumerate(computer_cards) if card]
+            if held:
+                return ('hint', random.choice(held), random.choice(['color', 'position']))
+        if kind == 'play' and open_slots:
+            return ('play', random.randrange(3), random.choice(open_slots))
+        return ('replace', random.randrange(3))
+
+
+# =========================
+#  TURN RULES
+# =========================
+# The state transitions of a turn, shared by run_single_trial (task_v0.1.py),
+# simulate_game below and test_allocations.py. A game is the dict of new_game
+# and replacement cards come from a card_pool.CardPool. The actions leave the
+# place they took a card from empty and refill() deals the new card, so the
+# task can show the empty place first; drawing, waiting and logging stay with
+# the caller.
+
+def new_game(deal, ai):
+    """Game state of a deal (a deal_bank.DealBank deal or a dict with the same card keys)"""
+    return {
+        'true_sequence': list(deal['true_sequence']),
+        'computer_cards': list(deal['computer_cards']),
+        'participant_cards': list(deal['participant_cards']),
+        'played_sequence': [None, None, None],
+        'participant_hints': {i: {'color': None, 'position': None} for i in range(3)},
+        'missing_cards': [],
+        'ai': ai,
+    }
+
+def start_turn(game, pool):
+    """Sequence cards missing from circulation, which the turn's draws deal first"""
+    game['missing_cards'] = pool.check_missing_sequence_cards(
+        game['true_sequence'], game['computer_cards'], game['participant_cards'], game['played_sequence'])
+    return game['missing_cards']
+
+def hint_about(card, hint_type):
+    """The color or position of card, whichever hint_type names"""
+    color, pos = card
+    return color if hint_type == 'color' else pos
+
+def refill(game, pool, hand, idx):
+    """Deal a new card into place idx of hand ('computer_cards' or 'participant_cards')"""
+    all_cards_in_use = pool.cards_in_use(game['computer_cards'], game['participant_cards'], game['played_sequence'])
+    new_card = pool.draw_new_card(all_cards_in_use, game['missing_cards'])
+    game[hand][idx] = new_card
+    if hand == 'participant_cards':
+        # Reset hints for new card
+        game['participant_hints'][idx] = {'color': None, 'position': None}
+    return new_card
+
+def participant_hint(game, target_idx, hint_type):
+    """The AI receives a hint about its card target_idx; returns the slot it played the card to, or None
+
+    A played card leaves its place empty until refill().
+    """
+    ai = game['ai']
+    computer_cards, played_sequence = game['computer_cards'], game['played_sequence']
+    card = computer_cards[target_idx]
+    if card is None:
+        return None
+    can_play_slot = ai.receive_hint_from_participant(hint_type, hint_about(card, hint_type), target_idx, card)
+    if can_play_slot is False or played_sequence[can_play_slot] is not None:
+        return None
+    played_sequence[can_play_slot] = card
+    computer_cards[target_idx] = None
+    ai.play_card(target_idx, can_play_slot)
+    ai.rounds_without_play = 0
+    return can_play_slot
+
+def participant_play(game, card_idx, slot_idx):
+    """The participant plays card_idx to slot_idx; returns the card, or None if the slot is taken or the place empty
+
+    The played card leaves its place empty until refill().
+    """
+    participant_cards, played_sequence = game['participant_cards'], game['played_sequence']
+    played_card = participant_cards[card_idx]
+    if played_card is None or played_sequence[slot_idx] is not None:
+        return None
+    played_sequence[slot_idx] = played_card
+    participant_cards[card_idx] = None
+    # Clear hints for played card
+    game['participant_hints'][card_idx] = {'color': None, 'position': None}
+    game['ai'].update_after_participant_action('play', card_played=played_card)
+    return played_card
+
+def participant_replace(game, pool, replace_idx):
+    """The participant replaces card replace_idx; returns the new card, or None if the place is empty"""
+    participant_cards = game['participant_cards']
+    if not participant_cards[replace_idx]:
+        return None
+    new_card = refill(game, pool, 'participant_cards', replace_idx)
+    game['ai'].participant_cards = participant_cards.copy()
+    return new_card
+
+def ai_turn(game, pool):
+    """The AI's turn: ('hint', hint, rounds_without_play), ('replace', idx, old_card) or ('wait',)
+
+    hint is OptimalAI's hint dict, already stored in participant_hints;
+    rounds_without_play is the stall count before the turn's update_progress.
+    """
+    ai = game['ai']
+    computer_cards = game['computer_cards']
+    hint_strategy = ai.give_hint_to_participant()
+    if hint_strategy:
+        game['participant_hints'][hint_strategy['target_card']][hint_strategy['hint_type']] = hint_strategy['hint_value']
+        action = ('hint', hint_strategy, ai.rounds_without_play)
+    else:
+        # AI replaces a card
+        replace_idx = ai.choose_card_to_replace(computer_cards)
+        if replace_idx is not None:
+            old_card = computer_cards[replace_idx]
+            refill(game, pool, 'computer_cards', replace_idx)
+            action = ('replace', replace_idx, old_card)
+        else:
+            action = ('wait',)
+    ai.update_progress()
+    return action
+
+
+# =========================
+#  GAME LOOP
+# =========================
+def simulated_turn(game, pool, participant, participant_turn):
+    """One turn with the scripted participant, refilling at once
+
+    Returns the turn's action (the participant's or ai_turn's), or None if
+    the participant has to try again.
+    """
+    start_turn(game, pool)
+
+    if not participant_turn:
+        action = ai_turn(game, pool)
+        if action[0] == 'replace':
+            participant.forget_ai_card(action[1])
+        return action
+
+    action = participant.choose_action(game['computer_cards'], game['participant_hints'], game['played_sequence'])
+    if action[0] == 'hint':
+        _, target_idx, hint_type = action
+        participant.hints_given[target_idx].add(hint_type)
+        if participant_hint(game, target_idx, hint_type) is not None:
+            refill(game, pool, 'computer_cards', target_idx)
+            participant.forget_ai_card(target_idx)
+    elif action[0] == 'play':
+        _, card_idx, slot_idx = action
+        if participant_play(game, card_idx, slot_idx) is None:
+            return None  # the task asks the participant to try again
+        refill(game, pool, 'participant_cards', card_idx)
+    else:
+        _, replace_idx = action
+        participant_replace(game, pool, replace_idx)
+    return action
+
+def simulate_game(ai_params=None, seed=None, noise=0.0, max_turns=200, deal=None, pool=None):
+    """Play one headless game and return a result dict.
+
+    `deal` is an optional deal dict from deal_bank.DealBank; otherwise a deal is
+    generated with the same rules.
+
+    `turns` counts turns the same way run_single_trial does (one per participant
+    or AI turn). Games that hit `max_turns` are reported with completed=False.
+    """
+    if seed is not None:
+        random.seed(seed)
+
+    if deal is None:
+        true_sequence, computer_cards, participant_cards = deal_game()
+        deal = {'true_sequence': true_sequence, 'computer_cards': computer_cards,
+                'participant_cards': participant_cards}
+    pool = pool or CardPool(ALL_CARDS)
+    participant_turn = random.choice([True, False])
+
+    game = new_game(deal, OptimalAI(list(deal['true_sequence']), list(deal['participant_cards']), params=ai_params))
+    participant = SimulatedParticipant(game['true_sequence'], noise=noise)
+    played_sequence = game['played_sequence']
+
+    turn_count = 0
+    while any(x is None for x in played_sequence) and turn_count < max_turns:
+        turn_count += 1
+        if simulated_turn(game, pool, participant, participant_turn):
+            participant_turn = not participant_turn
+
+    correct = sum(played_sequence[i] == game['true_sequence'][i] for i in range(3))
+    return {
+        'turns': turn_count,
+        'completed': all(x is not None for x in played_sequence),
+        'score': correct,
+    }
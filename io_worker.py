@@ -0,0 +1,189 @@
+"""Background I/O thread for the task's file writes and console output.
+
+All CSV rows and console messages are handed to a bounded queue and written by
+one dedicated thread that owns every file handle. The thread batches whatever
+is queued, flushes and fsyncs dirty files at most every `flush_interval`
+seconds (or sooner when asked with sync()), so slow or network storage never
+blocks a flip or inflates an RT on the presentation thread.
+
+Queue policy when full: data (rows, text) waits for space and is counted in
+`stalls`; console messages are dropped and counted in `dropped_prints`.
+
+Call close() at session end to drain the queue, flush, close files and join
+the thread. It is also registered with atexit so core.quit() does not lose data.
+"""
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+
+
+class IOWorker:
+    def __init__(self, max_queue=4096, flush_interval=0.5, batch_size=256):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.streams = {}  # key -> {'file', 'writer', 'dirty'}; only touched by the worker thread
+        self.thread = None
+        self.stalls = 0
+        self.dropped_prints = 0
+        self.errors = 0
+
+    # =========================
+    #  PRESENTATION-THREAD API
+    # =========================
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="io-worker", daemon=True)
+            self.thread.start()
+            atexit.register(self.close)
+        return self
+
+    def open_stream(self, key, opener):
+        """Register a stream; opener() runs on the worker and returns (file, csv_writer_or_None)"""
+        self._put(('open', key, opener))
+
+    def write_row(self, key, row):
+        self._put(('row', key, row))
+
+    def write_rows(self, key, rows):
+        self._put(('rows', key, rows))
+
+    def write_text(self, key, text):
+        self._put(('text', key, text))
+
+    def sync(self, key=None):
+        """Ask for buffered data to be flushed and fsync'd now (does not wait)"""
+        self._put(('sync', key))
+
+    def close_stream(self, key):
+        self._put(('close', key))
+
+    def call(self, fn, *args):
+        """Run fn(*args) on the worker thread (e.g. saving an array snapshot)"""
+        self._put(('call', fn, args))
+
+    def print(self, *args, sep=" ", end="\n"):
+        """Non-blocking replacement for print()"""
+        if self.thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait(('print', sep.join(str(a) for a in args) + end))
+        except queue.Full:
+            self.dropped_prints += 1
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is written and synced (not for timing-critical code)"""
+        if self.thread is None or not self.thread.is_alive():
+            return True
+        done = threading.Event()
+        self._put(('barrier', done))
+        return done.wait(timeout)
+
+    def close(self, timeout=10.0):
+        """Drain the queue, flush and close every file, and join the thread"""
+        if self.thread is None:
+            return
+        if self.thread.is_alive():
+            self._put(('stop',))
+            self.thread.join(timeout)
+        self.thread = None
+        atexit.unregister(self.close)
+        if self.stalls or self.dropped_prints or self.errors:
+            sys.stdout.write(f"⚠️ I/O worker: {self.stalls} queue stalls, "
+                             f"{self.dropped_prints} dropped messages, {self.errors} write errors\n")
+
+    def _put(self, item):
+        if self.thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.stalls += 1
+            self.queue.put(item)
+
+    # =========================
+    #  WORKER THREAD
+    # =========================
+    def _run(self):
+        last_sync = time.monotonic()
+        running = True
+        while running:
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            out = []
+            sync_now = False
+            barriers = []
+            for item in batch:
+                kind = item[0]
+                try:
+                    if kind == 'print':
+                        out.append(item[1])
+                    elif kind == 'row':
+                        stream = self.streams[item[1]]
+                        stream['writer'].writerow(item[2])
+                        stream['dirty'] = True
+                    elif kind == 'rows':
+                        stream = self.streams[item[1]]
+                        stream['writer'].writerows(item[2])
+                        stream['dirty'] = True
+                    elif kind == 'text':
+                        stream = self.streams[item[1]]
+                        stream['file'].write(item[2])
+                        stream['dirty'] = True
+                    elif kind == 'open':
+                        f, writer = item[2]()
+                        self.streams[item[1]] = {'file': f, 'writer': writer, 'dirty': False}
+                    elif kind == 'call':
+                        item[1](*item[2])
+                    elif kind == 'sync':
+                        sync_now = True
+                    elif kind == 'close':
+                        stream = self.streams.pop(item[1], None)
+                        if stream:
+                            self._sync(stream)
+                            stream['file'].close()
+                    elif kind == 'barrier':
+                        sync_now = True
+                        barriers.append(item[1])
+                    elif kind == 'stop':
+                        sync_now = True
+                        running = False
+                except Exception as e:
+                    self.errors += 1
+                    out.append(f"⚠️ I/O worker failed on {kind}: {e}\n")
+
+            if out:
+                sys.stdout.write("".join(out))
+                sys.stdout.flush()
+            if sync_now or time.monotonic() - last_sync >= self.flush_interval:
+                for stream in self.streams.values():
+                    if stream['dirty']:
+                        self._sync(stream)
+                last_sync = time.monotonic()
+            for done in barriers:
+                done.set()
+
+        for stream in self.streams.values():
+            self._sync(stream)
+            stream['file'].close()
+        self.streams.clear()
+
+    def _sync(self, stream):
+        try:
+            stream['file'].flush()
+            os.fsync(stream['file'].fileno())
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            sys.stdout.write(f"⚠️ I/O worker could not sync {getattr(stream['file'], 'name', '?')}: {e}\n")
+        stream['dirty'] = False
@@ -0,0 +1,310 @@
+"""Precompiled, frame-locked localizer.
+
+build_trial_list() generates the whole session up front (both 1-back blocks,
+stimulus, match and fixation jitter per trial) into a NumPy structured array,
+with the same stimulus-pool and sequence rules the task has always used.
+
+LocalizerEngine builds every stimulus once (one ImageStim per stimulus file
+at its position, the fixation cross, one TextStim per feedback outcome) and
+runs trials in a per-frame loop: fixation, stimulus with a response window,
+feedback, all counted in frames. The keyboard is polled without blocking on
+every frame of the response window (psychopy.hardware.keyboard when
+available, else event.getKeys), with RTs relative to the stimulus flip.
+Frame counts come from the frame scheduler, so an accelerated task clock
+shortens every phase, and RTs are converted to the clock's nominal seconds.
+warm_up() draws all of them once offscreen so their textures and glyphs are
+on the GPU before the first trial (see warmup.py).
+Fixation, stimulus, response scoring and feedback are profiling spans
+(profiling.py) when profiling is on. Nothing is allocated per trial (with
+profiling off): results go into a LocalizerResults store
+(localizer_results.py) allocated once per session. In timing-critical mode
+(realtime.py) the task runs each block with automatic garbage collection
+off; the young generation is collected right after each fixation onset.
+With TASK_ALLOC=1 the memory allocated per trial is measured (allocations.py).
+"""
+import os
+import random
+
+import numpy as np
+
+from markers import COLORS, POSITIONS, BLOCKS, FEEDBACK_OUTCOMES, stimulus_id
+from localizer_results import LocalizerResults
+from profiling import NullProfiler
+from realtime import TimingCritical
+from allocations import NullAllocations
+
+TRIAL_DTYPE = np.dtype([
+    ('block', np.uint8),      # index into BLOCKS
+    ('stim', np.uint16),      # index into the stimulus list
+    ('color', np.uint8),      # index into COLORS
+    ('position', np.uint8),   # index into POSITIONS
+    ('match', np.bool_),      # same block feature as the previous trial of the block
+    ('fixation_s', np.float32),
+])
+POSITION_OFFSET = 0.3  # slight offset for position
+POSITION_XY = {
+    "up": (0, POSITION_OFFSET),
+    "down": (0, -POSITION_OFFSET),
+    "left": (-POSITION_OFFSET, 0),
+    "right": (POSITION_OFFSET, 0),
+}
+OUTCOME_NONE, OUTCOME_HIT, OUTCOME_MISS, OUTCOME_FALSE_ALARM = range(4)  # index into FEEDBACK_OUTCOMES
+
+def parse_stim(path):
+    """(color, position) from a stimulus filename like yellow_up_square.png"""
+    parts = os.path.basename(path).replace(".png", "").split("_")
+    if len(parts) < 2:
+        raise ValueError(f"Unexpected filename format: {os.path.basename(path)}")
+    return parts[0], parts[1]
+
+# =========================
+#  TRIAL LIST
+# =========================
+def build_trial_list(stim_paths, block_order=("color", "position"), total_trials=240, base_reps=15,
+                     fixation_range=(0.5, 1.5), rng=random, log=print):
+    """Precompute every localizer trial.
+
+    Returns (trials, stim_paths, fallback_count): the TRIAL_DTYPE array with
+    the first block's trials first, the stimulus files that 'stim' indexes,
+    and how often the pool had to fall back to a non-matching stimulus.
+    """
+    # --- build master pool from filenames ---
+    paths = []
+    stim_pool = []
+    for path in stim_paths:
+        color, pos = parse_stim(path)
+        if color not in COLORS or pos not in POSITIONS:
+            log(f"⚠️ Skipping unrecognized stim: {os.path.basename(path)}")
+            continue
+        stim_pool += [(len(paths), COLORS.index(color), POSITIONS.index(pos))] * base_reps
+        paths.append(path)
+    if not stim_pool:
+        raise ValueError("Stimulus pool is empty — check filenames and paths.")
+    rng.shuffle(stim_pool)
+    fallback_count = 0
+
+    def draw_stim_from_pool(feature, value):
+        """Draw and remove one stim from pool matching the feature if possible, else fallback."""
+        nonlocal fallback_count
+        for i, entry in enumerate(stim_pool):
+            if entry[feature] == value:
+                return stim_pool.pop(i)
+        fallback_count += 1
+        return stim_pool.pop(0)
+
+    n_first = total_trials // 2
+    trials = np.zeros(total_trials, dtype=TRIAL_DTYPE)
+    t = 0
+    for block, n_trials in zip(block_order, (n_first, total_trials - n_first)):
+        feature = 1 if block == "color" else 2  # color / position field of a pool entry
+        n_values = len(COLORS) if block == "color" else len(POSITIONS)
+
+        # smart stochastic sequence
+        seq = []
+        for i in range(n_trials):
+            avail = set(entry[feature] for entry in stim_pool)
+            if i > 0 and rng.random() < 0.35 and seq[-1] in avail:
+                seq.append(seq[-1])
+            else:
+                choices = [v for v in range(n_values) if v in avail and (not seq or v != seq[-1])]
+                if not choices:
+                    # if all remaining are same value as last → force repeat
+                    choices = [seq[-1]]
+                seq.append(rng.choice(choices))
+
+        last_value = None
+        for v in seq:
+            stim, color, pos = draw_stim_from_pool(feature, v)
+            value_now = color if block == "color" else pos
+            trials[t] = (BLOCKS.index(block), stim, color, pos,
+                         last_value is not None and value_now == last_value, rng.uniform(*fixation_range))
+            last_value = value_now
+            t += 1
+    return trials, paths, fallback_count
+
+# =========================
+#  ENGINE
+# =========================
+class LocalizerEngine:
+    """Runs a precomputed trial list frame by frame with prebuilt stimuli"""
+
+    def __init__(self, win, stim_paths, load_image, timeline, markers, photodiode, frame_monitor, scheduler,
+                 response_s=1.0, feedback_s=0.6, clock=None, profiler=None, realtime=None,
+                 allocations=None):
+        from psychopy import visual, event, core
+        self.win = win
+        self.event = event
+        self.timeline = timeline
+        self.markers = markers
+        self.photodiode = photodiode
+        self.frame_monitor = frame_monitor
+        self.scheduler = scheduler
+        self.period_s = scheduler.period_s
+        self.frame_scale = scheduler.frame_scale
+        self.nominal = clock.nominal if clock is not None else float
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.realtime = realtime if realtime is not None else TimingCritical(enabled=False)
+        self.allocations = allocations if allocations is not None else NullAllocations()
+        self.response_s = response_s
+        self.feedback_s = feedback_s
+        self.response_frames = scheduler.frames_for(response_s)
+        self.feedback_frames = scheduler.frames_for(feedback_s)
+
+        # --- every stimulus built once ---
+        self.stims = []
+        self.labels = []
+        self.codes = []
+        for path in stim_paths:
+            color, pos = parse_stim(path)
+            stim = load_image(win, path)
+            stim.pos = POSITION_XY[pos]
+            self.stims.append(stim)
+            self.labels.append(os.path.basename(path))
+            self.codes.append(stimulus_id(color, pos))
+        self.fixation = visual.TextStim(win, text="+", color='black', height=0.08)
+        self.feedback = [visual.TextStim(win, text=text, color="black", height=0.05)
+                         for text in FEEDBACK_OUTCOMES]
+        self.feedback_labels = [text or None for text in FEEDBACK_OUTCOMES]
+
+        # --- non-blocking keyboard, RT clock reset on the stimulus flip ---
+        try:
+            from psychopy.hardware import keyboard
+            self.keyboard = keyboard.Keyboard()
+            self.rt_clock = self.keyboard.clock
+        except Exception:
+            self.keyboard = None
+            self.rt_clock = core.Clock()
+        self.reset_rt_clock = self.rt_clock.reset
+        self.results = None
+
+    def warm_up(self):
+        """Draw every prebuilt stimulus, the fixation and each feedback into the back buffer (no flip)"""
+        for stim in self.stims:
+            stim.draw()
+        self.fixation.draw()
+        for text in self.feedback:
+            text.draw()
+
+    def allocate(self, trials):
+        """Result store for the session, allocated once; the columns below are views into it"""
+        self.results = LocalizerResults(trials)
+        data = self.results.data
+        self.pressed = data['pressed']
+        self.rt = data['rt']
+        self.outcome = data['outcome']
+        self.correct = data['correct']
+        self.fixation_onset_ns = data['fixation_onset_ns']
+        self.stim_onset_ns = data['stim_onset_ns']
+        self.feedback_onset_ns = data['feedback_onset_ns']
+        self.dropped_frames = data['dropped_frames']
+        return self.results
+
+    def poll_space(self):
+        """RT (s from stimulus flip) of a space press since the last poll, or None"""
+        if self.keyboard is not None:
+            keys = self.keyboard.getKeys(keyList=['space'], waitRelease=False, clear=True)
+            return keys[0].rt if keys else None
+        keys = self.event.getKeys(keyList=['space'], timeStamped=self.rt_clock)
+        return keys[0][1] if keys else None
+
+    def clear_keys(self):
+        if self.keyboard is not None:
+            self.keyboard.clearEvents()
+        else:
+            self.event.clearEvents('keyboard')
+
+    def run(self, trials, start, stop):
+        """Run trials[start:stop], writing results at the same indices"""
+        win = self.win
+        timeline = self.timeline
+        markers = self.markers
+        frame_monitor = self.frame_monitor
+        profiler = self.profiler
+        fixation_frames = np.maximum(
+            1, np.rint(trials['fixation_s'] * self.frame_scale / self.period_s)).astype(np.int64)
+
+        for i in range(start, stop):
+            self.allocations.mark('localizer_trial')
+            stim_idx = trials['stim'][i]
+            stim = self.stims[stim_idx]
+            timeline.set_trial(i)
+            frame_monitor.set_phase('localizer_trial')
+
+            # --- fixation ---
+            with profiler.span('localizer_fixation'):
+                for frame in range(fixation_frames[i]):
+                    frame_monitor.frame_start()
+                    self.fixation.draw()
+                    if frame == 0:
+                        timeline.on_flip('fixation_onset')
+                        markers.on_flip('fixation_onset')
+                    win.flip()
+                    if frame == 0:
+                        self.fixation_onset_ns[i] = timeline.last('flip')
+                        self.realtime.collect(0)  # young objects of the last trial, inside the fixation frame
+
+            # --- stimulus and response window ---
+            rt = None
+            self.clear_keys()
+            with profiler.span('localizer_stimulus'):
+                for frame in range(self.response_frames):
+                    frame_monitor.frame_start()
+                    stim.draw()
+                    if frame == 0:
+                        timeline.on_flip('stim_onset', label=self.labels[stim_idx])
+                        markers.on_flip('stim_onset', self.codes[stim_idx])
+                        self.photodiode.toggle()
+                        win.callOnFlip(self.reset_rt_clock)  # RT is measured from the flip itself
+                    win.flip()
+                    if frame == 0:
+                        self.stim_onset_ns[i] = timeline.last('stim_onset')
+                    rt = self.poll_space()
+                    if rt is not None:
+                        break
+
+            # --- response ---
+            with profiler.span('localizer_response'):
+                pressed = rt is not None
+                if pressed:
+                    timeline.record('key', label='space', t_ns=self.stim_onset_ns[i] + int(rt * 1e9))
+
+                match = trials['match'][i]
+                if match:
+                    outcome = OUTCOME_HIT if pressed else OUTCOME_MISS
+                else:
+                    outcome = OUTCOME_FALSE_ALARM if pressed else OUTCOME_NONE
+                self.pressed[i] = pressed
+                self.rt[i] = self.nominal(rt) if pressed else np.nan
+                self.outcome[i] = outcome
+                self.correct[i] = outcome == OUTCOME_HIT or outcome == OUTCOME_NONE
+
+            # --- feedback ---
+            with profiler.span('localizer_feedback'):
+                feedback = self.feedback[outcome]
+                for frame in range(self.feedback_frames):
+                    frame_monitor.frame_start()
+                    feedback.draw()
+                    if frame == 0:
+                        timeline.on_flip('feedback_onset', label=self.feedback_labels[outcome])
+                        markers.on_flip('feedback_onset', outcome)
+                    win.flip()
+                    if frame == 0:
+                        self.feedback_onset_ns[i] = timeline.last('flip')
+            self.dropped_frames[i] = frame_monitor.dropped_in_trial('localizer_trial', i)
+            self.results.n_done = i + 1
+        self.allocations.end()
+
+        self._log_durations(trials, start, stop, fixation_frames)
+        frame_monitor.frame_start()
+
+    def _log_durations(self, trials, start, stop, fixation_frames):
+        """Achieved fixation and feedback durations of the block to the presentation log"""
+        for i in range(start, stop):
+            self.scheduler.log('fixation', i, float(trials['fixation_s'][i]), int(fixation_frames[i]),
+                               (self.stim_onset_ns[i] - self.fixation_onset_ns[i]) / 1e9)
+            if i + 1 < stop:
+                self.scheduler.log('feedback', i, self.feedback_s, self.feedback_frames,
+                                   (self.fixation_onset_ns[i + 1] - self.feedback_onset_ns[i]) / 1e9)
+        # the block's last feedback ends with whatever is flipped next
+        self.scheduler.end_on_next_flip('feedback', stop - 1, self.feedback_s, self.feedback_frames,
+                                        int(self.feedback_onset_ns[stop - 1]))
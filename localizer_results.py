@@ -0,0 +1,74 @@
+"""Preallocated structured-array store for localizer results.
+
+One row per trial of the precomputed trial list, created before the first
+trial with the design columns already filled in (block, stimulus, match);
+the engine writes responses and onset times in place. Saved as .npy (the
+array itself, for bulk analysis with localizer_summary.py) and .csv (with
+block, color and position names, for reading).
+"""
+import csv
+
+import numpy as np
+
+from markers import COLORS, POSITIONS, BLOCKS, FEEDBACK_OUTCOMES
+
+RESULT_DTYPE = np.dtype([
+    ('trial', np.int32),
+    ('block', np.uint8),              # index into BLOCKS
+    ('stim', np.uint16),              # index into the session's stimulus list
+    ('color', np.uint8),              # index into COLORS
+    ('position', np.uint8),           # index into POSITIONS
+    ('match', np.bool_),
+    ('pressed', np.bool_),
+    ('rt', np.float64),               # s from the stimulus flip, NaN if no press
+    ('outcome', np.uint8),            # index into FEEDBACK_OUTCOMES
+    ('correct', np.bool_),
+    ('fixation_onset_ns', np.int64),  # flip times on the event timeline
+    ('stim_onset_ns', np.int64),
+    ('feedback_onset_ns', np.int64),
+    ('dropped_frames', np.int16),
+])
+
+
+class LocalizerResults:
+    def __init__(self, trials):
+        self.data = np.zeros(len(trials), dtype=RESULT_DTYPE)
+        self.data['trial'] = np.arange(len(trials))
+        for name in ('block', 'stim', 'color', 'position', 'match'):
+            self.data[name] = trials[name]
+        self.data['rt'] = np.nan
+        self.n_done = 0  # trials run so far (in order)
+
+    def __len__(self):
+        return len(self.data)
+
+    def completed(self):
+        return self.data[:self.n_done]
+
+    def save(self, basename, io_worker=None):
+        """Write <basename>.npy and <basename>.csv (on the I/O worker if given) of the trials run so far"""
+        snapshot = self.completed().copy()
+        if io_worker is not None:
+            io_worker.call(save_results, basename, snapshot)
+        else:
+            save_results(basename, snapshot)
+
+
+def save_results(basename, data):
+    np.save(f"{basename}.npy", data)
+    with open(f"{basename}.csv", 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(RESULT_DTYPE.names)
+        for row in data:
+            writer.writerow([
+                row['trial'], BLOCKS[row['block']], row['stim'], COLORS[row['color']],
+                POSITIONS[row['position']], int(row['match']), int(row['pressed']),
+                '' if np.isnan(row['rt']) else f"{row['rt']:.4f}",
+                FEEDBACK_OUTCOMES[row['outcome']] or 'Correct rejection', int(row['correct']),
+                row['fixation_onset_ns'], row['stim_onset_ns'], row['feedback_onset_ns'],
+                row['dropped_frames'],
+            ])
+
+def load_results(filename):
+    """Results array from a .npy file written by save()"""
+    return np.load(filename)
@@ -0,0 +1,176 @@
+"""Vectorized signal-detection summary of localizer results.
+
+Works on RESULT_DTYPE arrays (localizer_results.py), from one session or
+thousands concatenated. Trials are grouped by any combination of session,
+block, stimulus (color × position) and time bin (equal parts of each
+session's trial order), and every metric is computed for all groups at once
+with bincounts over one group index:
+- hits, misses, false alarms, correct rejections and accuracy
+- hit and false-alarm rates with the log-linear correction
+  ((count + 0.5) / (n + 1)), d' = z(H) - z(F) and criterion c
+- RT quantiles of the presses (hits and false alarms)
+
+Usage:
+    python localizer_summary.py localizer_results_*.npy --by block
+    python localizer_summary.py data/*.npy --by session block time_bin --bins 4 --out summary.csv
+"""
+import argparse
+import csv
+import glob
+import os
+from statistics import NormalDist
+
+import numpy as np
+
+from markers import COLORS, POSITIONS, BLOCKS
+
+GROUPINGS = ['session', 'block', 'stim', 'time_bin']
+RT_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+_z = np.frompyfunc(NormalDist().inv_cdf, 1, 1)
+
+def z_score(p):
+    return _z(p).astype(np.float64)
+
+def concat_sessions(arrays):
+    """One results array plus a session index per trial"""
+    data = np.concatenate(arrays)
+    session = np.repeat(np.arange(len(arrays)), [len(a) for a in arrays])
+    return data, session
+
+def group_codes(data, session, by, n_bins):
+    """Integer code per trial for each grouping, with the number of levels"""
+    codes, sizes = [], []
+    for name in by:
+        if name == 'session':
+            codes.append(session)
+            sizes.append(int(session.max()) + 1 if len(session) else 1)
+        elif name == 'block':
+            codes.append(data['block'].astype(np.int64))
+            sizes.append(len(BLOCKS))
+        elif name == 'stim':
+            codes.append(data['color'].astype(np.int64) * len(POSITIONS) + data['position'])
+            sizes.append(len(COLORS) * len(POSITIONS))
+        elif name == 'time_bin':
+            # position within each session's trial order, in n_bins equal parts
+            n_per_session = np.bincount(session)
+            codes.append(data['trial'].astype(np.int64) * n_bins // n_per_session[session])
+            sizes.append(n_bins)
+        else:
+            raise ValueError(f"Unknown grouping '{name}' (use {', '.join(GROUPINGS)})")
+    return codes, sizes
+
+def summarize(data, session=None, by=('block',), n_bins=4, quantiles=RT_QUANTILES):
+    """Signal-detection metrics per group, as a dict of equal-length columns"""
+    if session is None:
+        session = np.zeros(len(data), dtype=np.int64)
+    codes, sizes = group_codes(data, session, by, n_bins)
+    key = np.ravel_multi_index(codes, sizes) if codes else np.zeros(len(data), dtype=np.int64)
+    keys, group = np.unique(key, return_inverse=True)
+    n_groups = len(keys)
+
+    match = data['match']
+    pressed = data['pressed']
+    count = lambda mask: np.bincount(group, weights=mask, minlength=n_groups)
+    hits = count(match & pressed)
+    misses = count(match & ~pressed)
+    false_alarms = count(~match & pressed)
+    correct_rejections = count(~match & ~pressed)
+    n_signal = hits + misses
+    n_noise = false_alarms + correct_rejections
+
+    hit_rate = (hits + 0.5) / (n_signal + 1)
+    fa_rate = (false_alarms + 0.5) / (n_noise + 1)
+    z_hit, z_fa = z_score(hit_rate), z_score(fa_rate)
+
+    columns = {}
+    levels = np.unravel_index(keys, sizes) if codes else []
+    for name, level in zip(by, levels):
+        if name == 'block':
+            columns[name] = np.array(BLOCKS)[level]
+        elif name == 'stim':
+            columns[name] = np.array([f"{COLORS[s // len(POSITIONS)]}_{POSITIONS[s % len(POSITIONS)]}"
+                                      for s in level])
+        else:
+            columns[name] = level
+    columns.update({
+        'trials': np.bincount(group, minlength=n_groups),
+        'hits': hits.astype(int),
+        'misses': misses.astype(int),
+        'false_alarms': false_alarms.astype(int),
+        'correct_rejections': correct_rejections.astype(int),
+        'accuracy': count(data['correct']) / np.bincount(group, minlength=n_groups),
+        'hit_rate': hit_rate,
+        'fa_rate': fa_rate,
+        'd_prime': z_hit - z_fa,
+        'criterion': -(z_hit + z_fa) / 2,
+    })
+
+    # RT quantiles of the presses: sort by (group, rt) once, then index into each group's run
+    rt = data['rt']
+    has_rt = pressed & ~np.isnan(rt)
+    order = np.lexsort((rt[has_rt], group[has_rt]))
+    sorted_rt = rt[has_rt][order]
+    n_rt = np.bincount(group[has_rt], minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(n_rt)[:-1]])
+    for q in quantiles:
+        pos = starts + np.floor(q * (n_rt - 1)).astype(int).clip(0)
+        nxt = np.minimum(pos + 1, starts + n_rt - 1).clip(0)
+        frac = q * (n_rt - 1) - np.floor(q * (n_rt - 1))
+        value = np.full(n_groups, np.nan)
+        ok = n_rt > 0
+        value[ok] = sorted_rt[pos[ok]] * (1 - frac[ok]) + sorted_rt[nxt[ok]] * frac[ok]
+        columns[f"rt_q{int(q * 100):02d}"] = value
+    return columns
+
+def format_summary(columns):
+    """Fixed-width text table of a summary"""
+    names = list(columns)
+    rows = []
+    for i in range(len(columns['trials'])):
+        cells = []
+        for name in names:
+            v = columns[name][i]
+            cells.append(f"{v:.3f}" if isinstance(v, (float, np.floating)) else str(v))
+        rows.append(cells)
+    widths = [max(len(n), *(len(r[j]) for r in rows)) for j, n in enumerate(names)]
+    lines = ["  ".join(n.rjust(w) for n, w in zip(names, widths))]
+    lines += ["  ".join(c.rjust(w) for c, w in zip(r, widths)) for r in rows]
+    return "\n".join(lines)
+
+def write_summary(filename, columns):
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(list(columns))
+        for i in range(len(columns['trials'])):
+            writer.writerow([columns[name][i] for name in columns])
+
+# =========================
+#  MAIN
+# =========================
+def main():
+    parser = argparse.ArgumentParser(description="Signal-detection summary of localizer results")
+    parser.add_argument('files', nargs='+', help="localizer_results_*.npy files (globs allowed)")
+    parser.add_argument('--by', nargs='*', default=['block'], choices=GROUPINGS)
+    parser.add_argument('--bins', type=int, default=4, help="time bins per session")
+    parser.add_argument('--out', help="write the summary table to this CSV")
+    args = parser.parse_args()
+
+    files = sorted(f for pattern in args.files for f in glob.glob(pattern))
+    if not files:
+        raise SystemExit("No result files found")
+    data, session = concat_sessions([np.load(f) for f in files])
+    columns = summarize(data, session, args.by, args.bins)
+
+    print(f"=== Localizer summary: {len(files)} session(s), {len(data)} trials ===")
+    if 'session' in args.by:
+        for i, f in enumerate(files):
+            print(f"session {i}: {os.path.basename(f)}")
+    print(format_summary(columns))
+    if args.out:
+        write_summary(args.out, columns)
+        print(f"✅ Summary saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""Event markers (TTL codes) for the neural acquisition system.
+
+Onset markers are scheduled with win.callOnFlip, so the code goes out inside
+the flip callback of the frame that shows the stimulus (right after the flip
+stamp of that frame on the event timeline), not after win.flip() returns.
+Input markers (clicks) are sent immediately when the input is detected.
+Every backend write is non-blocking; pulse-based backends (parallel port,
+serial trigger boxes) are reset to 0 by a small background thread after
+`pulse_s` instead of sleeping on the presentation thread.
+
+Each marker sent is also recorded on the event timeline ('marker' events,
+value = code), which is what aligns the timeline with the recording.
+
+Backends: ParallelPortBackend, SerialBackend, SocketBackend (UDP, LSL-style
+"code timestamp" datagrams), LSLBackend (needs pylsl) and LoopbackBackend,
+which only records send timestamps and works on any machine.
+
+Usage (marker-to-flip latency benchmark, no display or hardware needed):
+    python markers.py --n 2000
+    python markers.py --backend socket --n 2000
+"""
+import argparse
+import queue
+import socket
+import threading
+import time
+
+import numpy as np
+
+from event_timeline import EventTimeline, now_ns
+
+# =========================
+#  CODE TABLE
+# =========================
+# 8-bit codes, 0 is the idle level. Kinds follow the event timeline; some
+# kinds are a base code plus a value (see code_for).
+MARKER_CODES = {
+    'session_start': 1,
+    'session_end': 2,
+    'block_start': 10,      # + block index (0 color, 1 position)
+    'block_end': 12,        # + block index
+    'trial_start': 20,
+    'trial_end': 21,
+    'fixation_onset': 30,
+    'feedback_onset': 32,   # + outcome (see FEEDBACK_OUTCOMES)
+    'key': 40,
+    'message_onset': 41,
+    'board_onset': 42,
+    'click': 50,            # + index in CLICK_TARGETS
+    'stim_onset': 100,      # + localizer stimulus id (see stimulus_id)
+    'encoding_onset': 120,  # + number of target cards on screen (1-3)
+}
+BLOCKS = ['color', 'position']
+FEEDBACK_OUTCOMES = ['', 'Correct!', 'Miss!', 'False alarm!']
+CLICK_TARGETS = ['HINT', 'PLAY', 'REPLACE', 'COLOR', 'POSITION'] + \
+    [(row, i) for row in ('ai', 'slot', 'participant') for i in range(3)]
+COLORS = ["yellow", "blue", "cyan", "orange"]
+POSITIONS = ["up", "down", "left", "right"]
+
+def stimulus_id(color, pos):
+    """0-15 id of a localizer stimulus (color-major)"""
+    return COLORS.index(color) * len(POSITIONS) + POSITIONS.index(pos)
+
+def code_for(kind, value=None):
+    """Marker code for a task event, or None if the kind has no code"""
+    base = MARKER_CODES.get(kind)
+    if base is None:
+        return None
+    return base + (value or 0)
+
+# =========================
+#  BACKENDS
+# =========================
+class LoopbackBackend:
+    """Stand-in for real hardware: records every code with the time it was written"""
+    needs_reset = False
+
+    def __init__(self, capacity=100_000):
+        self.codes = np.zeros(capacity, dtype=np.uint8)
+        self.t_ns = np.zeros(capacity, dtype=np.int64)
+        self.n = 0
+
+    def write(self, code):
+        i = self.n
+        if i < len(self.codes):
+            self.t_ns[i] = now_ns()
+            self.codes[i] = code
+            self.n = i + 1
+
+    def close(self):
+        pass
+
+class ParallelPortBackend:
+    """Parallel port data lines (psychopy.parallel), pulsed back to 0"""
+    needs_reset = True
+
+    def __init__(self, address=0x0378):
+        from psychopy import parallel
+        self.port = parallel.ParallelPort(address=address)
+        self.port.setData(0)
+
+    def write(self, code):
+        self.port.setData(code)
+
+    def close(self):
+        self.port.setData(0)
+
+class SerialBackend:
+    """Serial trigger box (pyserial); one byte per code, non-blocking writes"""
+    needs_reset = True
+
+    def __init__(self, port="/dev/ttyUSB0", baudrate=115200, reset=True):
+        import serial
+        self.serial = serial.Serial(port, baudrate=baudrate, write_timeout=0)
+        self.needs_reset = reset  # some boxes reset their outputs by themselves
+
+    def write(self, code):
+        self.serial.write(bytes([code]))
+
+    def close(self):
+        self.serial.close()
+
+class SocketBackend:
+    """UDP datagrams "<code> <t_ns>" to a recorder or LSL relay (never blocks)"""
+    needs_reset = False
+
+    def __init__(self, host="127.0.0.1", port=16571):
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def write(self, code):
+        self.sock.sendto(f"{code} {now_ns()}".encode(), self.address)
+
+    def close(self):
+        self.sock.close()
+
+class LSLBackend:
+    """Lab Streaming Layer marker stream (pylsl), timestamped with the LSL clock"""
+    needs_reset = False
+
+    def __init__(self, name="HanabiMarkers"):
+        import pylsl
+        info = pylsl.StreamInfo(name, 'Markers', 1, 0, 'int32', f"{name}_{socket.gethostname()}")
+        self.outlet = pylsl.StreamOutlet(info)
+
+    def write(self, code):
+        self.outlet.push_sample([code])
+
+    def close(self):
+        pass
+
+BACKENDS = {
+    'loopback': LoopbackBackend,
+    'parallel': ParallelPortBackend,
+    'serial': SerialBackend,
+    'socket': SocketBackend,
+    'lsl': LSLBackend,
+}
+
+def make_backend(name, log=print, **options):
+    """Create a backend by name; falls back to loopback if its hardware/library is missing"""
+    try:
+        return BACKENDS[name](**options)
+    except (ImportError, OSError) as e:
+        log(f"⚠️ Marker backend '{name}' unavailable ({e}), using loopback")
+        return LoopbackBackend()
+
+# =========================
+#  MARKER OUTPUT
+# =========================
+class MarkerOutput:
+    """Sends task event codes through one backend, locked to flips where needed"""
+
+    def __init__(self, backend, timeline=None, pulse_s=0.005):
+        self.backend = backend
+        self.timeline = timeline
+        self.pulse_ns = int(pulse_s * 1e9)
+        self.win = None
+        self.sent = 0
+        self.errors = 0
+        self.last_seq = 0
+        self.lock = threading.Lock()
+        self.resets = None
+        if backend.needs_reset:
+            self.resets = queue.Queue()
+            threading.Thread(target=self._reset_loop, name="marker-reset", daemon=True).start()
+
+    def attach(self, win):
+        self.win = win
+        return self
+
+    def on_flip(self, kind, value=None):
+        """Send the code for kind in the next flip's callbacks (right after its flip stamp)"""
+        code = code_for(kind, value)
+        if code is None:
+            return
+        if self.timeline is not None:
+            self.timeline.stamp_next_flip()
+        self.win.callOnFlip(self._send, code)
+
+    def send(self, kind, value=None):
+        """Send the code for kind now (input events)"""
+        code = code_for(kind, value)
+        if code is not None:
+            self._send(code)
+
+    def _send(self, code):
+        try:
+            with self.lock:
+                self.backend.write(code)
+                self.last_seq += 1
+                seq = self.last_seq
+        except Exception:
+            self.errors += 1
+            return
+        t_ns = now_ns()
+        self.sent += 1
+        if self.timeline is not None:
+            self.timeline.record('marker', value=code, t_ns=t_ns)
+        if self.resets is not None:
+            self.resets.put((t_ns + self.pulse_ns, seq))
+
+    def _reset_loop(self):
+        while True:
+            deadline, seq = self.resets.get()
+            if seq is None:
+                return
+            delay = (deadline - now_ns()) / 1e9
+            if delay > 0:
+                time.sleep(delay)
+            with self.lock:
+                if seq == self.last_seq:  # a newer code is still on the lines, leave it
+                    try:
+                        self.backend.write(0)
+                    except Exception:
+                        self.errors += 1
+
+    def close(self):
+        if self.resets is not None:
+            self.resets.put((0, None))
+        self.backend.close()
+
+# =========================
+#  LATENCY ANALYSIS
+# =========================
+def marker_flip_latency(events):
+    """Latency (ns) of each flip-locked marker from its frame's flip stamp.
+
+    events: timeline events array (see event_timeline.load_timeline). Markers
+    sent outside flip callbacks (clicks) are excluded by matching each marker
+    to the latest flip before it and keeping those sent within 1 ms of it.
+    """
+    from event_timeline import KIND_ID
+    flips = events['t_ns'][events['kind'] == KIND_ID['flip']]
+    markers = events['t_ns'][events['kind'] == KIND_ID['marker']]
+    idx = np.searchsorted(flips, markers, side='right') - 1
+    valid = idx >= 0
+    latency = markers[valid] - flips[idx[valid]]
+    return latency[latency < 1_000_000]
+
+def summarize_latency(latency_ns):
+    if len(latency_ns) == 0:
+        return "no flip-locked markers"
+    us = latency_ns / 1e3
+    return (f"n={len(us)}  median {np.median(us):.1f} µs  p95 {np.percentile(us, 95):.1f} µs  "
+            f"p99 {np.percentile(us, 99):.1f} µs  max {us.max():.1f} µs")
+
+class SimulatedWindow:
+    """Minimal window with PsychoPy's flip semantics (wait for vsync, then run callOnFlip callbacks)"""
+
+    def __init__(self, refresh_hz=60.0):
+        self.period_ns = int(1e9 / refresh_hz)
+        self.next_vsync = now_ns() + self.period_ns
+        self.to_call = []
+
+    def callOnFlip(self, function, *args, **kwargs):
+        self.to_call.append((function, args, kwargs))
+
+    def flip(self, clearBuffer=True):
+        late = now_ns() - self.next_vsync
+        if late > 0:  # missed that vsync: the swap waits for the next one on the grid
+            self.next_vsync += (late // self.period_ns + 1) * self.period_ns
+        while now_ns() < self.next_vsync:
+            pass
+        self.next_vsync += self.period_ns
+        calls, self.to_call = self.to_call, []
+        for function, args, kwargs in calls:
+            function(*args, **kwargs)
+
+def run_benchmark(backend_name, n, real_window=False, **options):
+    """Send n flip-locked markers and return (flip latencies, loopback write log or None)"""
+    if real_window:
+        from psychopy import visual
+        win = visual.Window(size=[400, 300], color='white', units='height')
+    else:
+        win = SimulatedWindow()
+    timeline = EventTimeline().attach(win)
+    backend = make_backend(backend_name, **options)
+    markers = MarkerOutput(backend, timeline=timeline).attach(win)
+    for i in range(n):
+        timeline.on_flip('stim_onset', value=i % 16)
+        markers.on_flip('stim_onset', i % 16)
+        win.flip()
+    markers.close()
+    if real_window:
+        win.close()
+    return marker_flip_latency(timeline.events()), backend if isinstance(backend, LoopbackBackend) else None
+
+# =========================
+#  MAIN
+# =========================
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark marker-to-flip latency")
+    parser.add_argument('--backend', default='loopback', choices=sorted(BACKENDS))
+    parser.add_argument('--n', type=int, default=1000, help="markers (one per flip)")
+    parser.add_argument('--window', action='store_true', help="use a real PsychoPy window instead of a simulated one")
+    args = parser.parse_args()
+
+    latency, loopback = run_benchmark(args.backend, args.n, real_window=args.window)
+    print(f"=== Marker-to-flip latency ({args.backend}) ===")
+    print(summarize_latency(latency))
+    if loopback is not None:
+        print(f"Loopback recorded {loopback.n} codes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import random
+
+# =========================
+#  AI PARAMETERS
+# =========================
+# Tunable heuristics of the OptimalAI. The defaults reproduce the behaviour
+# piloted in task_v0.1.py; sweep_ai_params.py searches over these values.
+DEFAULT_AI_PARAMS = {
+    'stall_rounds': 2,        # rounds without a play before the AI hints back
+    'stall_hints': 2,         # consecutive hints before checking for a stalled sequence
+    'playable_urgency': 3,    # urgency added per participant card that fits an open slot
+    'endgame_urgency': 5,     # urgency added to open slots once few slots remain
+    'endgame_slots': 1,       # "few slots remain" threshold for endgame_urgency
+    'progress_window': 3,     # number of sequence states kept in progress_history
+}
+
+def make_ai_params(params=None, **overrides):
+    """Return a full AI parameter dict, filling unspecified values from the defaults"""
+    merged = dict(DEFAULT_AI_PARAMS)
+    for source in (params or {}, overrides):
+        for key, value in source.items():
+            if key not in DEFAULT_AI_PARAMS:
+                raise ValueError(f"Unknown AI parameter: {key}")
+            merged[key] = value
+    if merged['progress_window'] < 2:
+        raise ValueError("progress_window must keep at least 2 states to detect stalls")
+    return merged
+
+
+# =========================
+#  REALISTIC OPTIMAL AI CLASS
+# =========================
+class OptimalAI:
+    def __init__(self, true_sequence, participant_cards, params=None):
+        # Heuristic parameters (see DEFAULT_AI_PARAMS)
+        self.params = make_ai_params(params)
+        
+        # What the AI knows
+        self.true_sequence = true_sequence
+        self.participant_cards = participant_cards.copy()
+        self.ai_cards = [None, None, None]  # AI doesn't know its own cards initially
+        
+        # AI's memory and planning
+        self.hint_history = []  # All hints given/received
+        self.sequence_knowledge = [None, None, None]  # What AI thinks is in each slot
+        self.ai_card_inferences = {}  # Inferences about AI's own cards from hints
+        self.participant_playable_cards = []  # Cards participant could play correctly
+        self.urgency_scores = [0, 0, 0]  # How urgent each slot is
+        
+        # Progress tracking
+        self.progress_history = []  # Track sequence state each turn
+        self.play_history = []  # Track when cards were actually played
+        self.stall_count = 0  # Count of turns without progress
+        self.consecutive_hints = 0  # Count of consecutive hint exchanges
+        self.rounds_without_play = 0  # Count rounds since last card was played
+        self.last_hint_given = None  # Track last hint to avoid immediate repeats
+        
+    def receive_hint_from_participant(self, hint_type, hint_value, target_card_idx, actual_card):
+        """AI receives a hint about its own card from participant"""
+        self.hint_history.append({
+            'type': 'received',
+            'hint_type': hint_type,
+            'hint_value': hint_value,
+            'target_card': target_card_idx,
+            'turn': len(self.hint_history)
+        })
+        
+        # Update AI's knowledge about its own card
+        if target_card_idx not in self.ai_card_inferences:
+            self.ai_card_inferences[target_card_idx] = {'color': None, 'position': None, 'actual_card': actual_card}
+        
+        self.ai_card_inferences[target_card_idx][hint_type] = hint_value
+        self.ai_card_inferences[target_card_idx]['actual_card'] = actual_card
+        
+        # Check if we now know enough to play this card
+        return self.can_play_card(target_card_idx)
+        
+    def give_hint_to_participant(self):
+        """OPTIMAL: AI gives the best possible hint to participant"""
+        # Update participant playable cards with CURRENT cards
+        self.update_participant_playable_cards()
+        
+        # Calculate urgency for each slot
+        self.calculate_urgency_scores()
+        
+        # Check if we should hint back due to stalling
+        if self.should_hint_back_due_to_stall():
+            return self.give_optimal_hint_to_participant()
+        
+        # Choose best hint strategy
+        hint_strategy = self.give_optimal_hint_to_participant()
+        
+        if hint_strategy:
+            self.hint_history.append({
+                'type': 'given',
+                'hint_type': hint_strategy['hint_type'],
+                'hint_value': hint_strategy['hint_value'],
+                'target_card': hint_strategy['target_card'],
+                'turn': len(self.hint_history)
+            })
+            self.consecutive_hints += 1
+            self.last_hint_given = hint_strategy
+            return hint_strategy
+        
+        return None
+        
+    def should_hint_back_due_to_stall(self):
+        """Determine if AI should hint back due to stalling"""
+        # Check if we haven't played a card in too many rounds
+        if self.rounds_without_play >= self.params['stall_rounds']:
+            return True
+        
+        # Also check if we've been exchanging hints without progress
+        if self.consecutive_hints >= self.params['stall_hints']:
+            # Check if there's been no progress in sequence
+            if len(self.progress_history) >= 2:
+                last_progress = self.progress_history[-1]
+                second_last_progress = self.progress_history[-2]
+                if last_progress == second_last_progress:
+                    return True
+        
+        return False
+        
+    def give_optimal_hint_to_participant(self):
+        """OPTIMAL: Give the best possible hint to participant about their CURRENT cards"""
+        # Find participant cards that could be useful (CURRENT cards)
+        useful_participant_cards = []
+        for i, card in enumerate(self.participant_cards):
+            if card and card in self.true_sequence:
+                slot_idx = self.true_sequence.index(card)
+                if self.sequence_knowledge[slot_idx] is None:
+                    useful_participant_cards.append((i, card, slot_idx))
+        
+        if not useful_participant_cards:
+            return None
+        
+        # OPTIMAL: Choose the most urgent card
+        most_urgent = max(useful_participant_cards, key=lambda x: self.urgency_scores[x[2]])
+        card_idx, card, slot_idx = most_urgent
+        
+        # OPTIMAL: Choose hint type strategically - avoid immediate repeats
+        if self.last_hint_given and self.last_hint_given['target_card'] == card_idx:
+            # Different hint type from last time
+            hint_type = 'position' if self.last_hint_given['hint_type'] == 'color' else 'color'
+        else:
+            # Choose most informative hint type
+            hint_type = random.choice(['color', 'position'])
+        
+        hint_value = card[0] if hint_type == 'color' else card[1]
+        
+        self.consecutive_hints = 0  # Reset counter when giving strategic hint
+        self.rounds_without_play = 0  # Reset stall counter
+        
+        return {
+            'target_card': card_idx,
+            'hint_type': hint_type,
+            'hint_value': hint_value,
+            'strategy': 'optimal'
+        }
+        
+    def update_participant_playable_cards(self):
+        """Update which participant cards can be played correctly (CURRENT cards)"""
+        self.participant_playable_cards = []
+        for i, card in enumerate(self.participant_cards):
+            if card and card in self.true_sequence:
+                slot_idx = self.true_sequence.index(card)
+                if self.sequence_knowledge[slot_idx] is None:
+                    self.participant_playable_cards.append((i, card, slot_idx))
+    
+    def calculate_urgency_scores(self):
+        """Calculate how urgent each slot is based on game state"""
+        self.urgency_scores = [0, 0, 0]
+        
+        # Higher urgency if participant has playable cards for that slot
+        for card_idx, card, slot_idx in self.participant_playable_cards:
+            self.urgency_scores[slot_idx] += self.params['playable_urgency']
+            
+        # Higher urgency if we're running out of turns
+        remaining_slots = sum(1 for x in self.sequence_knowledge if x is None)
+        if remaining_slots <= self.params['endgame_slots']:
+            for i in range(3):
+                if self.sequence_knowledge[i] is None:
+                    self.urgency_scores[i] += self.params['endgame_urgency']
+                    
+        # Lower urgency for slots we already know
+        for i in range(3):
+            if self.sequence_knowledge[i] is not None:
+                self.urgency_scores[i] = 0
+    
+    def can_play_card(self, card_idx):
+        """REALISTIC: Check if AI can play a card based on received hints ONLY"""
+        if card_idx not in self.ai_card_inferences:
+            return False
+            
+        card_info = self.ai_card_inferences[card_idx]
+        if card_info['color'] and card_info['position']:
+            # We know both color and position
+            inferred_card = (card_info['color'], card_info['position'])
+            if inferred_card in self.true_sequence:
+                slot_idx = self.true_sequence.index(inferred_card)
+                # Check if slot is actually empty before playing
+                if self.sequence_knowledge[slot_idx] is None:
+                    return slot_idx
+        return False
+        
+    def play_card(self, card_idx, slot_idx):
+        """AI plays a card and updates its knowledge"""
+        if card_idx in self.ai_card_inferences:
+            card_info = self.ai_card_inferences[card_idx]
+            played_card = (card_info['color'], card_info['position'])
+            self.sequence_knowledge[slot_idx] = played_card
+            del self.ai_card_inferences[card_idx]
+            
+    def update_after_participant_action(self, action_type, card_played=None, card_replaced=None):
+        """Update AI knowledge after participant action"""
+        if action_type == 'play' and card_played:
+            # Only update if the card is actually in the true sequence
+            if card_played in self.true_sequence:
+                slot_idx = self.true_sequence.index(card_played)
+                self.sequence_knowledge[slot_idx] = card_played
+                # Reset stall counter when card is played
+                self.rounds_without_play = 0
+                
+    def update_progress(self):
+        """Track progress in the sequence"""
+        current_state = tuple(self.sequence_knowledge)
+        self.progress_history.append(current_state)
+        
+        # Keep only the last few states to check for stalls
+        window = self.params['progress_window']
+        if len(self.progress_history) > window:
+            self.progress_history = self.progress_history[-window:]
+        
+        # Track rounds without playing cards
+        self.rounds_without_play += 1
+    
+    def choose_card_to_replace(self, computer_cards):
+        """OPTIMAL: Choose which AI card to replace, avoiding hinted cards"""
+        available_indices = [i for i, card in enumerate(computer_cards) if card]
+        
+        if not available_indices:
+            return None
+        
+        # NEVER replace cards we have hints about
+        hinted_indices = set(self.ai_card_inferences.keys())
+        unhinted_indices = [i for i in available_indices if i not in hinted_indices]
+        
+        # If we have unhinted cards, always replace those first
+        if unhinted_indices:
+            return random.choice(unhinted_indices)
+        
+        # If all cards are hinted, replace the one with least information
+        # that we know is NOT in the sequence
+        replaceable = []
+        for idx in available_indices:
+            card_info = self.ai_card_inferences.get(idx)
+            if card_info:
+                # If we know both color and position
+                if card_info['color'] and card_info['position']:
+                    inferred_card = (card_info['color'], card_info['position'])
+                    # Only replace if we KNOW it's not in the sequence
+                    if inferred_card not in self.true_sequence:
+                        replaceable.append(idx)
+        
+        if replaceable:
+            return random.choice(replaceable)
+        
+        # Last resort: don't replace anything (return None)
+        return None
@@ -0,0 +1,248 @@
+"""Photodiode sync patch and offline flip-to-photon latency analysis.
+
+During the task a small square in a screen corner is drawn on every flip and
+toggles between black and white on each stimulus onset (localizer stimulus,
+every render_board). The toggle is drawn in the same flip as the content, and
+the flip of each toggle is recorded on the event timeline ('photodiode' event,
+value = new state). A photodiode taped over the patch then gives the true
+time each onset reached the screen.
+
+The analyzer reads a recorded trace (or a simulated one), detects the patch
+transitions and matches them to the toggle flips on the timeline:
+- if the trace has a marker channel (the TTL codes recorded by the acquisition
+  system on the same clock), the two clocks are aligned through the markers,
+  which the timeline records at the moment they were sent
+- otherwise the trace times must already be on the timeline clock
+  (perf_counter seconds, optionally shifted with --clock-offset)
+
+Trace files: .npy array or .csv with columns time_s, photodiode[, marker].
+
+Usage:
+    python photodiode.py --simulate --timeline event_timeline_<session>.npz
+    python photodiode.py trace.csv --timeline event_timeline_<session>.npz --out latency.csv
+"""
+import argparse
+import csv
+
+import numpy as np
+
+from event_timeline import KIND_ID, load_timeline
+
+# =========================
+#  PATCH (RUN TIME)
+# =========================
+class PhotodiodePatch:
+    """Corner square drawn on every flip, toggled black/white at each onset"""
+
+    def __init__(self, win, timeline=None, size=0.05, corner='bottom_left', enabled=True):
+        self.win = win
+        self.timeline = timeline
+        self.enabled = enabled
+        self.state = 0  # 0 black, 1 white
+        self.toggles = 0
+        if not enabled:
+            return
+        from psychopy import visual
+        half_w = win.size[0] / win.size[1] / 2  # 'height' units
+        x = -half_w + size / 2 if 'left' in corner else half_w - size / 2
+        y = -0.5 + size / 2 if 'bottom' in corner else 0.5 - size / 2
+        self.rect = visual.Rect(win, width=size, height=size, pos=(x, y),
+                                fillColor='black', lineColor=None)
+
+    def attach(self):
+        """Draw the patch as the last thing before every flip of the window"""
+        if not self.enabled:
+            return self
+        original_flip = self.win.flip
+
+        def flip(*args, **kwargs):
+            self.rect.draw()
+            return original_flip(*args, **kwargs)
+        self.win.flip = flip
+        return self
+
+    def toggle(self):
+        """Flip the patch color in the next flip (call once per onset, before win.flip())"""
+        if not self.enabled:
+            return
+        self.state = 1 - self.state
+        self.rect.fillColor = 'white' if self.state else 'black'
+        self.toggles += 1
+        if self.timeline is not None:
+            self.timeline.on_flip('photodiode', value=self.state)
+
+# =========================
+#  TRACES
+# =========================
+def load_trace(filename):
+    """Return (t_s, photodiode, marker or None) from a .npy or .csv trace"""
+    if filename.endswith('.npy'):
+        data = np.load(filename)
+    else:
+        data = np.loadtxt(filename, delimiter=',', skiprows=1)
+    marker = data[:, 2] if data.shape[1] > 2 else None
+    return data[:, 0], data[:, 1], marker
+
+def simulate_trace(toggle_s, states, marker_s=None, fs=10_000, latency_s=0.012, jitter_s=0.002,
+                   rise_s=0.001, noise=0.02, seed=0):
+    """Photodiode trace for patch toggles at toggle_s (flip times, seconds).
+
+    Each toggle reaches the sensor latency_s ± jitter_s later with an
+    exponential rise of time constant rise_s. If marker_s is given a marker
+    channel is added with a 5 ms pulse at each marker time.
+    Returns (t_s, photodiode, marker or None, true photon times).
+    """
+    rng = np.random.default_rng(seed)
+    photon_s = toggle_s + latency_s + rng.normal(0, jitter_s, len(toggle_s)).clip(-latency_s, None)
+    t = np.arange(toggle_s[0] - 0.1, toggle_s[-1] + 0.2, 1 / fs)
+    level = np.zeros_like(t)
+    starts = np.searchsorted(t, photon_s)
+    ends = np.append(starts[1:], len(t))
+    previous = 0.0
+    for start, end, when, state in zip(starts, ends, photon_s, states):
+        # exponential approach to the new level until the next transition starts
+        segment = previous + (state - previous) * (1 - np.exp(-(t[start:end] - when) / rise_s))
+        level[start:end] = segment
+        if end > start:
+            previous = segment[-1]
+    trace = level + rng.normal(0, noise, len(t))
+    marker = None
+    if marker_s is not None:
+        marker = np.zeros_like(t)
+        for when in marker_s:
+            marker[(t >= when) & (t < when + 0.005)] = 1
+    return t, trace, marker, photon_s
+
+# =========================
+#  ANALYSIS
+# =========================
+def detect_transitions(t, trace, threshold=None, refractory_s=0.005):
+    """Times and new states (1 = to white) where the trace crosses threshold.
+
+    threshold defaults to halfway between the 5th and 95th percentiles; a
+    crossing within refractory_s of the previous one is treated as noise.
+    """
+    if threshold is None:
+        low, high = np.percentile(trace, [5, 95])
+        threshold = (low + high) / 2
+    above = trace > threshold
+    idx = np.flatnonzero(above[1:] != above[:-1]) + 1
+    times, states = [], []
+    for i in idx:
+        if times and t[i] - times[-1] < refractory_s:
+            continue
+        times.append(t[i])
+        states.append(int(above[i]))
+    return np.array(times), np.array(states, dtype=int)
+
+def marker_onsets(t, marker):
+    """Times where the marker channel leaves 0"""
+    active = marker > 0.5 * marker.max()
+    return t[np.flatnonzero(active[1:] & ~active[:-1]) + 1]
+
+def toggle_flips(events):
+    """Software flip time (s) and new state of every patch toggle"""
+    kinds = events['kind']
+    toggles = events[kinds == KIND_ID['photodiode']]
+    flips = events['t_ns'][kinds == KIND_ID['flip']]
+    flip_idx = np.searchsorted(flips, toggles['t_ns'], side='right') - 1
+    return flips[flip_idx.clip(0)] / 1e9, toggles['value'].astype(int)
+
+def clock_offset_from_markers(events, t, marker):
+    """Offset (s) from timeline time to trace time, from the markers seen on both clocks.
+
+    Starts from the first marker on each side, then takes the median distance
+    from every timeline marker to its nearest marker onset on the trace.
+    """
+    sent_s = events['t_ns'][events['kind'] == KIND_ID['marker']] / 1e9
+    onsets = marker_onsets(t, marker)
+    if len(sent_s) == 0 or len(onsets) == 0:
+        raise ValueError("No markers to align the trace with the timeline")
+    guess = onsets[0] - sent_s[0]
+    k = np.searchsorted(onsets, sent_s + guess).clip(1, len(onsets) - 1)
+    nearest = np.where(np.abs(onsets[k] - sent_s - guess) < np.abs(onsets[k - 1] - sent_s - guess),
+                       onsets[k], onsets[k - 1])
+    return float(np.median(nearest - sent_s))
+
+def match_transitions(flip_s, states, photon_s, photon_states, max_latency_s=0.1):
+    """Index of the transition matching each toggle flip (-1 if none within max_latency_s)"""
+    matched = np.full(len(flip_s), -1)
+    j = 0
+    for i, (when, state) in enumerate(zip(flip_s, states)):
+        while j < len(photon_s) and photon_s[j] < when:
+            j += 1
+        if j < len(photon_s) and photon_s[j] - when <= max_latency_s and photon_states[j] == state:
+            matched[i] = j
+            j += 1
+    return matched
+
+def analyze(events, t, trace, marker=None, clock_offset_s=0.0, threshold=None):
+    """Per-toggle flip-to-photon latencies (s, NaN where no transition was found)"""
+    flip_s, states = toggle_flips(events)
+    photon_s, photon_states = detect_transitions(t, trace, threshold)
+    if marker is not None:
+        clock_offset_s = clock_offset_from_markers(events, t, marker)
+    flip_on_trace = flip_s + clock_offset_s
+    matched = match_transitions(flip_on_trace, states, photon_s, photon_states)
+    latency = np.full(len(flip_s), np.nan)
+    ok = matched >= 0
+    latency[ok] = photon_s[matched[ok]] - flip_on_trace[ok]
+    return flip_s, latency
+
+def summarize(latency):
+    found = latency[~np.isnan(latency)] * 1e3
+    lines = [f"Toggles: {len(latency)}, detected on the trace: {len(found)}, missing: {len(latency) - len(found)}"]
+    if len(found):
+        lines.append(f"Flip-to-photon latency: median {np.median(found):.2f} ms, "
+                     f"5-95% {np.percentile(found, 5):.2f}-{np.percentile(found, 95):.2f} ms, "
+                     f"range {found.min():.2f}-{found.max():.2f} ms, SD {found.std():.2f} ms")
+        hist, edges = np.histogram(found, bins=10)
+        for count, lo, hi in zip(hist, edges[:-1], edges[1:]):
+            lines.append(f"  {lo:6.2f}-{hi:6.2f} ms {'#' * int(40 * count / hist.max())} {count}")
+    return "\n".join(lines)
+
+# =========================
+#  MAIN
+# =========================
+def main():
+    parser = argparse.ArgumentParser(description="Flip-to-photon latency from a photodiode trace")
+    parser.add_argument('trace', nargs='?', help=".npy or .csv with time_s, photodiode[, marker]")
+    parser.add_argument('--timeline', required=True, help="event_timeline_<session>.npz of the same session")
+    parser.add_argument('--simulate', action='store_true', help="analyze a simulated trace for this timeline")
+    parser.add_argument('--latency-ms', type=float, default=12.0, help="simulated mean latency")
+    parser.add_argument('--clock-offset', type=float, default=0.0,
+                        help="seconds to add to timeline times to get trace times (no marker channel)")
+    parser.add_argument('--threshold', type=float, default=None)
+    parser.add_argument('--out', help="per-toggle CSV (flip time, latency)")
+    args = parser.parse_args()
+
+    events, meta = load_timeline(args.timeline)
+    if args.simulate:
+        flip_s, states = toggle_flips(events)
+        if len(flip_s) == 0:
+            raise SystemExit("The timeline has no photodiode toggles (was the patch enabled?)")
+        sent_s = events['t_ns'][events['kind'] == KIND_ID['marker']] / 1e9
+        # the acquisition clock has its own origin; the analysis has to recover it from the markers
+        t, trace, marker, _ = simulate_trace(flip_s + 1000.0, states, sent_s + 1000.0,
+                                             latency_s=args.latency_ms / 1e3)
+        print(f"Simulated {len(flip_s)} toggles at {args.latency_ms:.1f} ms mean latency")
+    elif args.trace:
+        t, trace, marker = load_trace(args.trace)
+    else:
+        raise SystemExit("Give a trace file or --simulate")
+
+    flip_s, latency = analyze(events, t, trace, marker, args.clock_offset, args.threshold)
+    print(f"=== Photodiode ({args.timeline}) ===")
+    print(summarize(latency))
+
+    if args.out:
+        with open(args.out, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['flip_s', 'latency_ms'])
+            for when, lat in zip(flip_s, latency):
+                writer.writerow([f"{when:.6f}", '' if np.isnan(lat) else f"{lat * 1e3:.3f}"])
+        print(f"✅ Per-toggle latencies saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Opt-in timing spans over the task's phases, with optional per-phase profiling.
+
+Off by default; when off, span() returns one shared no-op context manager
+and wrap() returns the function itself, so the instrumented code costs next
+to nothing. Enable with TASK_PROFILE=1 or `--profile` on the task's command
+line. Spans used by the task (instructions: drawing and flipping an
+instruction screen, not the time it stays up; participant_* and ai_turn:
+each board update of a turn, its state changes, render_board and flip, not
+the clicks and pauses in between):
+    instructions, encoding, participant_hint, participant_play,
+    participant_replace, ai_turn, render_board, draw_card, log,
+    localizer_fixation, localizer_stimulus, localizer_response, localizer_feedback
+
+Spans are timed on the event timeline's clock (perf_counter_ns) and stored in
+preallocated arrays. At session end report() prints per-span statistics and
+writes:
+- profile_spans_<session>.csv: count, total, mean, percentiles and a
+  log-spaced histogram (10 µs to 10 s) per span name
+- trace_<session>.json: Chrome trace format ('X' events), viewable in
+  chrome://tracing or https://ui.perfetto.dev
+
+One phase can also be profiled in depth (TASK_PROFILE_PHASE=render_board or
+`--profile-phase render_board`), every time it runs:
+- cProfile (default): profile_<phase>_<session>.prof, top functions printed
+- sampling (TASK_PROFILER=sampling or `--profiler sampling`): a thread
+  samples the main thread's stack every millisecond while the phase runs;
+  collapsed stacks go to profile_<phase>_<session>.folded (flamegraph.pl,
+  speedscope), top functions printed
+"""
+import argparse
+import cProfile
+import csv
+import inspect
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from event_timeline import now_ns
+
+HISTOGRAM_EDGES_NS = np.logspace(4, 10, 25)  # 10 µs .. 10 s, 4 bins per decade
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+
+class NullProfiler:
+    """Profiling off: spans and wrappers do nothing"""
+    enabled = False
+
+    def span(self, name):
+        return NULL_SPAN
+
+    def wrap(self, name, fn):
+        return fn
+
+    def report(self, session_stamp, io_worker):
+        pass
+
+
+class _Span:
+    __slots__ = ('profiler', 'name_id', 'deep', 'start')
+
+    def __init__(self, profiler, name_id, deep):
+        self.profiler = profiler
+        self.name_id = name_id
+        self.deep = deep
+
+    def __enter__(self):
+        if self.deep:
+            self.profiler._deep_start()
+        self.start = now_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = now_ns()
+        if self.deep:
+            self.profiler._deep_stop()
+        self.profiler._add(self.name_id, self.start, end - self.start)
+        return False
+
+
+class Profiler:
+    enabled = True
+
+    def __init__(self, timeline=None, capacity=100_000, profile_phase=None, mode='cprofile', sample_s=0.001):
+        self.timeline = timeline
+        self.origin_ns = timeline.origin_ns if timeline is not None else now_ns()
+        self.capacity = capacity
+        self.name_col = np.zeros(capacity, dtype=np.int16)
+        self.start_col = np.zeros(capacity, dtype=np.int64)
+        self.dur_col = np.zeros(capacity, dtype=np.int64)
+        self.trial_col = np.zeros(capacity, dtype=np.int32)
+        self.n = 0
+        self.names = []
+        self.name_ids = {}
+        self.profile_phase = profile_phase
+        self.mode = mode
+        self.depth = 0  # nesting of the profiled phase (profile the outermost occurrence)
+        self.cprofile = cProfile.Profile() if profile_phase and mode == 'cprofile' else None
+        self.stacks = Counter()
+        self.sampling = False
+        if profile_phase and mode == 'sampling':
+            self.main_ident = threading.get_ident()
+            self.sample_s = sample_s
+            threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True).start()
+
+    def name_id(self, name):
+        i = self.name_ids.get(name)
+        if i is None:
+            i = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    # =========================
+    #  SPANS
+    # =========================
+    def span(self, name):
+        """Context manager timing one occurrence of a named phase"""
+        return _Span(self, self.name_id(name), name == self.profile_phase)
+
+    def wrap(self, name, fn):
+        """fn with every call timed as a span"""
+        name_id = self.name_id(name)
+        deep = name == self.profile_phase
+
+        if inspect.iscoroutinefunction(fn):  # the span covers the awaited call, time suspended included
+            async def wrapped(*args, **kwargs):
+                with _Span(self, name_id, deep):
+                    return await fn(*args, **kwargs)
+            return wrapped
+
+        def wrapped(*args, **kwargs):
+            with _Span(self, name_id, deep):
+                return fn(*args, **kwargs)
+        return wrapped
+
+    def _add(self, name_id, start, dur):
+        i = self.n
+        if i == self.capacity:
+            for attr in ('name_col', 'start_col', 'dur_col', 'trial_col'):
+                col = getattr(self, attr)
+                setattr(self, attr, np.concatenate([col, np.zeros_like(col)]))
+            self.capacity *= 2
+        self.name_col[i] = name_id
+        self.start_col[i] = start
+        self.dur_col[i] = dur
+        self.trial_col[i] = self.timeline.trial if self.timeline is not None else -1
+        self.n = i + 1
+
+    # =========================
+    #  DEEP PROFILING
+    # =========================
+    def _deep_start(self):
+        self.depth += 1
+        if self.depth > 1:
+            return
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        else:
+            self.sampling = True
+
+    def _deep_stop(self):
+        self.depth -= 1
+        if self.depth > 0:
+            return
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        else:
+            self.sampling = False
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.sample_s)
+            if not self.sampling:
+                continue
+            frame = sys._current_frames().get(self.main_ident)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    # =========================
+    #  REPORT
+    # =========================
+    def spans(self):
+        return (self.name_col[:self.n], self.start_col[:self.n], self.dur_col[:self.n], self.trial_col[:self.n])
+
+    def histogram_rows(self):
+        names, _, durs, _ = self.spans()
+        header = (['Span', 'Count', 'Total_MS', 'Mean_MS', 'P50_MS', 'P95_MS', 'P99_MS', 'Max_MS']
+                  + [f"Le_{edge / 1e6:.3g}ms" for edge in HISTOGRAM_EDGES_NS[1:]])
+        rows = [header]
+        for i, name in enumerate(self.names):
+            d = durs[names == i]
+            if not len(d):
+                continue
+            p50, p95, p99 = np.percentile(d, [50, 95, 99]) / 1e6
+            counts, _ = np.histogram(d.clip(HISTOGRAM_EDGES_NS[0], HISTOGRAM_EDGES_NS[-1]), bins=HISTOGRAM_EDGES_NS)
+            rows.append([name, len(d), round(d.sum() / 1e6, 3), round(d.mean() / 1e6, 4), round(p50, 4),
+                         round(p95, 4), round(p99, 4), round(d.max() / 1e6, 4)] + counts.tolist())
+        return rows
+
+    def trace(self):
+        """Chrome trace-event JSON object (complete events, µs)"""
+        names, starts, durs, trials = self.spans()
+        events = [{'name': self.names[n], 'cat': 'task', 'ph': 'X', 'pid': 1, 'tid': 1,
+                   'ts': (s - self.origin_ns) / 1e3, 'dur': d / 1e3, 'args': {'trial': int(t)}}
+                  for n, s, d, t in zip(names.tolist(), starts.tolist(), durs.tolist(), trials.tolist())]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms',
+                'otherData': {'clock': 'time.perf_counter_ns', 'origin_ns': self.origin_ns}}
+
+    def report(self, session_stamp, io_worker):
+        """Print the span summary and write histograms, trace and deep profile"""
+        rows = self.histogram_rows()
+        io_worker.print("\n=== Profile ===")
+        for row in rows[1:]:
+            io_worker.print(f"{row[0]}: n={row[1]}  total {row[2]:.1f} ms  mean {row[3]:.3f} ms  "
+                            f"p95 {row[5]:.3f} ms  max {row[7]:.3f} ms")
+        io_worker.call(write_csv, f"profile_spans_{session_stamp}.csv", rows)
+        io_worker.call(write_json, f"trace_{session_stamp}.json", self.trace())
+        io_worker.print(f"✅ Spans saved to profile_spans_{session_stamp}.csv, trace to trace_{session_stamp}.json")
+
+        phase = self.profile_phase
+        if self.cprofile is not None:
+            filename = f"profile_{phase}_{session_stamp}.prof"
+            self.cprofile.dump_stats(filename)
+            out = io.StringIO()
+            pstats.Stats(self.cprofile, stream=out).sort_stats('cumulative').print_stats(15)
+            io_worker.print(f"\n=== cProfile: {phase} ===\n{out.getvalue()}✅ Saved to {filename}")
+        elif phase:
+            self.sampling = False
+            stacks = dict(self.stacks)
+            filename = f"profile_{phase}_{session_stamp}.folded"
+            io_worker.call(write_folded, filename, stacks)
+            leaves = Counter()
+            for stack, count in stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            total = sum(leaves.values()) or 1
+            io_worker.print(f"\n=== Sampling profile: {phase} ({total} samples) ===")
+            for leaf, count in leaves.most_common(15):
+                io_worker.print(f"{100 * count / total:5.1f}%  {leaf}")
+            io_worker.print(f"✅ Collapsed stacks saved to {filename}")
+
+
+def write_csv(filename, rows):
+    with open(filename, 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+def write_json(filename, obj):
+    with open(filename, 'w') as f:
+        json.dump(obj, f)
+
+def write_folded(filename, stacks):
+    with open(filename, 'w') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+def profiler_from_env(timeline=None, argv=None):
+    """Profiler if TASK_PROFILE / --profile is set, else a NullProfiler"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--profile', action='store_true')
+    parser.add_argument('--profile-phase', default=None)
+    parser.add_argument('--profiler', choices=['cprofile', 'sampling'], default=None)
+    args, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    enabled = args.profile or os.environ.get("TASK_PROFILE", "").strip() not in ("", "0")
+    if not enabled:
+        return NullProfiler()
+    phase = args.profile_phase or os.environ.get("TASK_PROFILE_PHASE") or None
+    mode = args.profiler or os.environ.get("TASK_PROFILER", "cprofile").strip().lower()
+    if mode not in ('cprofile', 'sampling'):
+        raise ValueError(f"TASK_PROFILER must be 'cprofile' or 'sampling', got {mode!r}")
+    return Profiler(timeline, profile_phase=phase, mode=mode)
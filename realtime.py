@@ -0,0 +1,260 @@
+"""Timing-critical mode: garbage collector control, process priority, CPU pinning and memory locking.
+
+The garbage collector, the OS scheduler and other processes can interrupt
+the presentation loop at any moment. With TIMING_CRITICAL = True the task
+applies, when its display opens (apply()):
+- process priority raised (nice -10 on Linux/macOS, HIGH_PRIORITY_CLASS on
+  Windows); raising it usually needs root / CAP_SYS_NICE
+- optionally, the process pinned to one CPU (CRITICAL_CPU = 3, or
+  "isolated" for the first core in the kernel's isolcpus list), Linux only
+- memory locked with mlockall (current pages, and future ones too when the
+  memlock limit allows it), so no page of the task is swapped out mid-trial
+- the garbage collector frozen once: everything allocated at setup (the
+  window, stimuli, caches) moves to the permanent generation and is never
+  scanned again; objects created later (AIs, prepared trials, coroutine
+  frames) stay collectable
+
+Inside critical() sections (localizer blocks, encoding, every turn of the
+practice game) the collector is disabled; reference counting still frees
+almost everything. collect() runs a young-generation collection at a chosen
+moment (after each fixation onset, at the start of each turn) and gap() a
+full collection in the inter-trial gaps (instruction screens).
+
+Every change is logged, and a change the system does not permit is logged
+and skipped; the task runs as before. restore() undoes them at session end.
+Every collection (automatic or not) is timed; report() records them on the
+event timeline as 'gc' events (value = pause in µs) next to the flips, and
+counts the dropped frames that had one while they were being drawn.
+"""
+import ctypes
+import ctypes.util
+import gc
+import os
+import sys
+
+import numpy as np
+
+from event_timeline import KIND_ID, now_ns
+
+NICE = -10
+EXPLICIT, IN_CRITICAL = 4, 8  # gc_flags bits above the generation
+MCL_CURRENT, MCL_FUTURE = 1, 2  # Linux values
+HIGH_PRIORITY_CLASS = 0x80
+
+
+class _Section:
+    __slots__ = ('owner',)
+
+    def __init__(self, owner):
+        self.owner = owner
+
+    def __enter__(self):
+        owner = self.owner
+        if owner.depth == 0:
+            owner.was_enabled = gc.isenabled()
+            gc.disable()
+        owner.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        owner = self.owner
+        owner.depth -= 1
+        if owner.depth == 0 and owner.was_enabled:
+            gc.enable()
+        return False
+
+
+class _NullSection:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SECTION = _NullSection()
+
+
+def isolated_cpus():
+    """CPUs the kernel keeps free of other tasks (isolcpus=), empty if none or not Linux"""
+    try:
+        with open("/sys/devices/system/cpu/isolated") as f:
+            text = f.read().strip()
+    except OSError:
+        return []
+    cpus = []
+    for part in filter(None, text.split(",")):
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+class TimingCritical:
+    def __init__(self, timeline=None, enabled=True, cpu=None, lock_memory=True, log=print):
+        self.timeline = timeline
+        self.enabled = enabled
+        self.cpu = cpu
+        self.lock_memory = lock_memory
+        self.log = log
+        self.section = _Section(self) if enabled else NULL_SECTION
+        self.depth = 0
+        self.was_enabled = True
+        self.undo = []  # (description, function) of each applied change, undone in reverse
+        # every collection, in preallocated arrays (recording one allocates nothing)
+        self.gc_capacity = 65536
+        self.gc_t = np.zeros(self.gc_capacity, dtype=np.int64)         # start ns
+        self.gc_duration = np.zeros(self.gc_capacity, dtype=np.int64)  # ns
+        self.gc_flags = np.zeros(self.gc_capacity, dtype=np.int8)      # generation | EXPLICIT | IN_CRITICAL
+        self.n_gc = 0
+        self.gc_start = None
+        self.explicit = False
+        self.frozen = 0
+
+    # =========================
+    #  SESSION SETTINGS
+    # =========================
+    def apply(self):
+        """Raise priority, pin the CPU, lock memory and freeze the setup objects (logged, each optional)"""
+        if not self.enabled:
+            return self
+        self.log("⚡ Timing-critical mode")
+        for name, change in (("Priority", self._raise_priority), ("CPU pinning", self._pin_cpu),
+                             ("Memory lock", self._lock_memory)):
+            try:
+                change()
+            except Exception as e:
+                self.log(f"⚠️ {name} not applied, continuing without it: {e}")
+        gc.callbacks.append(self._on_gc)
+        self.collect(2)
+        gc.freeze()
+        self.frozen = gc.get_freeze_count()
+        self.log(f"⚡ GC frozen: {self.frozen} setup objects moved to the permanent generation")
+        return self
+
+    def _raise_priority(self):
+        if sys.platform == "win32":
+            kernel32 = ctypes.windll.kernel32
+            process = kernel32.GetCurrentProcess()
+            before = kernel32.GetPriorityClass(process)
+            if not kernel32.SetPriorityClass(process, HIGH_PRIORITY_CLASS):
+                raise OSError(ctypes.WinError())
+            self.log(f"⚡ Process priority: class {before:#x} → HIGH_PRIORITY_CLASS")
+            self.undo.append((f"priority class {before:#x}", lambda: kernel32.SetPriorityClass(process, before)))
+            return
+        before = os.getpriority(os.PRIO_PROCESS, 0)
+        if before <= NICE:
+            self.log(f"⚡ Process priority: nice {before} already (no change)")
+            return
+        os.setpriority(os.PRIO_PROCESS, 0, NICE)  # PermissionError without root / CAP_SYS_NICE
+        self.log(f"⚡ Process priority: nice {before} → {NICE}")
+        self.undo.append((f"nice {before}", lambda: os.setpriority(os.PRIO_PROCESS, 0, before)))
+
+    def _pin_cpu(self):
+        if self.cpu is None:
+            return
+        if not hasattr(os, "sched_setaffinity"):
+            raise OSError("CPU affinity is not supported on this platform")
+        cpu = self.cpu
+        if cpu == "isolated":
+            isolated = isolated_cpus()
+            if not isolated:
+                raise OSError("no isolated CPU (boot with isolcpus=)")
+            cpu = isolated[0]
+        before = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, {cpu})
+        self.log(f"⚡ Pinned to CPU {cpu} (was {len(before)} CPUs)")
+        self.undo.append((f"affinity {len(before)} CPUs", lambda: os.sched_setaffinity(0, before)))
+
+    def _lock_memory(self):
+        if not self.lock_memory:
+            return
+        if sys.platform == "win32":
+            raise OSError("mlockall is not available on Windows")
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        flags = MCL_CURRENT
+        try:
+            import resource
+            if resource.getrlimit(resource.RLIMIT_MEMLOCK)[0] == resource.RLIM_INFINITY:
+                flags |= MCL_FUTURE  # with a finite limit, later allocations past it would fail
+        except ImportError:
+            pass
+        if libc.mlockall(flags) != 0:
+            raise OSError(os.strerror(ctypes.get_errno()))
+        self.log(f"⚡ Memory locked ({'current and future' if flags & MCL_FUTURE else 'current'} pages)")
+        self.undo.append(("unlocked memory", libc.munlockall))
+
+    def restore(self):
+        """Undo every applied change, latest first"""
+        if not self.enabled:
+            return
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        gc.unfreeze()
+        gc.enable()
+        while self.undo:
+            description, undo = self.undo.pop()
+            try:
+                undo()
+                self.log(f"⚡ Restored {description}")
+            except Exception as e:
+                self.log(f"⚠️ Could not restore {description}: {e}")
+
+    # =========================
+    #  GARBAGE COLLECTION
+    # =========================
+    def critical(self):
+        """Context manager: no automatic garbage collection inside (sections nest)"""
+        return self.section
+
+    def collect(self, generation=0):
+        """Collect up to this generation now (cheap for generation 0 after a freeze)"""
+        if self.enabled:
+            self.explicit = True
+            gc.collect(generation)
+            self.explicit = False
+
+    def gap(self):
+        """Inter-trial gap: full collection (nothing is frozen after setup)"""
+        self.collect(2)
+
+    def _on_gc(self, phase, info):
+        if phase == "start":
+            self.gc_start = now_ns()
+        elif self.gc_start is not None:
+            t = now_ns()
+            i = self.n_gc
+            if i < self.gc_capacity:
+                self.gc_t[i] = self.gc_start
+                self.gc_duration[i] = t - self.gc_start
+                self.gc_flags[i] = (info["generation"] | (EXPLICIT if self.explicit else 0)
+                                    | (IN_CRITICAL if self.depth > 0 else 0))
+                self.n_gc = i + 1
+            self.gc_start = None
+
+    # =========================
+    #  REPORT
+    # =========================
+    def report(self, io_worker, period_ns):
+        """Print the collections and the drops they may explain; record them on the timeline"""
+        if not self.enabled:
+            return
+        n = self.n_gc
+        starts, durations, flags = self.gc_t[:n], self.gc_duration[:n], self.gc_flags[:n]
+        auto = (flags & EXPLICIT) == 0
+        io_worker.print("\n=== Timing-Critical Mode ===")
+        if self.timeline is not None:
+            for start, duration, flag in zip(starts.tolist(), durations.tolist(), flags.tolist()):
+                self.timeline.record('gc', value=min(duration // 1000, 2**31 - 1), t_ns=start,
+                                     label=f"{'automatic' if flag & EXPLICIT == 0 else 'explicit'} gen{flag & 3}")
+        longest = int(durations.max()) if n else 0
+        io_worker.print(f"GC: {n} collections ({n - int(auto.sum())} scheduled, {int(auto.sum())} automatic, "
+                        f"{int((auto & ((flags & IN_CRITICAL) != 0)).sum())} in critical sections), "
+                        f"longest pause {longest / 1e6:.2f} ms, {self.frozen} objects frozen")
+        if self.timeline is not None and n:
+            # a drop of n frames: the frame was due n periods before its flip, drawing began about one before that
+            events = self.timeline.events()
+            drops = events[events['kind'] == KIND_ID['frame_drop']]
+            ends = starts + durations
+            windows = zip(drops['t_ns'] - (drops['value'].astype(np.int64) + 1) * period_ns, drops['t_ns'])
+            after_gc = sum(bool(np.any((ends > a) & (starts < b))) for a, b in windows)
+            io_worker.print(f"Dropped frames during a GC pause: {after_gc} of {len(drops)}")
+        self.restore()
@@ -0,0 +1,102 @@
+"""Single-threaded asyncio runtime for the task.
+
+The phases (run_localizer, run_practice and everything they wait on) are
+coroutines on one event loop on the main thread. Timed pauses
+(TaskClock.wait_async), input (keys(), click polling) and instruction
+screens are awaited instead of blocking, so while the task waits for the
+participant or a timer, other tasks on the loop run: background work is
+started with spawn() and makes progress in those idle periods, with no
+threads and no locking around PsychoPy, which is only ever touched from this
+one thread.
+
+Rendering stays tied to vsync: drawing and win.flip() are ordinary calls,
+so a flip still blocks on the vertical blank, and the frame-locked loops
+(localizer trials, the encoding display) run without yielding, as
+timing-critical sections in which no background step can delay a frame.
+Background work must therefore come in short steps (await between them);
+every pause measures how late it ended, and report() prints how often a
+background step held the loop past a deadline. Work that really blocks (file
+writes and fsync) stays on the I/O worker thread (io_worker.py).
+"""
+import asyncio
+
+import numpy as np
+
+
+class TaskRuntime:
+    def __init__(self, clock, poll_s=0.01, log=print, late_ns=1_000_000):
+        self.clock = clock
+        self.poll_s = poll_s  # input polling period (task clock seconds)
+        self.log = log
+        self.late_ns = late_ns  # a pause ending later than this counts as delayed
+        self.loop = asyncio.new_event_loop()
+        self.tasks = set()
+        self.spawned = 0
+        self.failed = 0
+        self.waits = 0
+        self.late = []  # ns past the deadline of each delayed pause
+
+    # =========================
+    #  RUNNING
+    # =========================
+    def run(self, coro):
+        """Run a phase to completion on the event loop; background tasks keep running in later phases"""
+        return self.loop.run_until_complete(coro)
+
+    def spawn(self, coro, name=None):
+        """Start background work on the loop; it runs whenever the task awaits"""
+        task = self.loop.create_task(coro, name=name)
+        self.tasks.add(task)
+        self.spawned += 1
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+            self.log(f"⚠️ Background task {task.get_name()} failed: {task.exception()!r}")
+
+    # =========================
+    #  WAITING
+    # =========================
+    async def wait(self, secs):
+        """Timed pause of secs task clock seconds (recorded like TaskClock.wait)"""
+        late = await self.clock.wait_async(secs)
+        self.waits += 1
+        if late > self.late_ns:
+            self.late.append(late)
+
+    async def step(self):
+        """Let the loop run anything else that is due (between the steps of background work)"""
+        await asyncio.sleep(0)
+
+    async def poll(self):
+        """Give the loop one polling period (input loops)"""
+        await self.clock.sleep_async(self.poll_s)
+
+    async def keys(self, keyList=None):
+        """Keys pressed (psychopy event.getKeys), waiting until there is at least one"""
+        from psychopy import event
+        while True:
+            keys = event.getKeys(keyList=keyList)
+            if keys:
+                return keys
+            await self.poll()
+
+    # =========================
+    #  REPORT
+    # =========================
+    def close(self):
+        """Cancel background work still running and close the loop"""
+        for task in list(self.tasks):
+            task.cancel()
+        if self.tasks:
+            self.loop.run_until_complete(asyncio.gather(*self.tasks, return_exceptions=True))
+        self.loop.close()
+
+    def summary(self):
+        late = np.array(self.late, dtype=np.int64)
+        return (f"Runtime: {self.spawned} background task(s) ({self.failed} failed), {self.waits} timed pauses, "
+                f"{len(late)} ended more than {self.late_ns / 1e6:g} ms late"
+                + (f" (worst {late.max() / 1e6:.2f} ms)" if len(late) else ""))
@@ -0,0 +1,145 @@
+"""Task startup: stimulus scan, configuration check and launch timing.
+
+The task script imports PsychoPy and opens its window only when the first
+phase needs it (open_display in task_v0.1.py), and phase-specific modules
+(localizer engine, board view and PIL, AI, deal bank) load inside the phase
+that uses them. Before that it only reads its configuration and scans the
+stimulus folder, so
+
+    python task_v0.1.py --check
+
+validates a rig without a display and without importing PsychoPy: shape
+folder and stimulus set, image files, deal bank and counterbalancing
+schedule, marker backend and the TASK_* environment settings (with
+`--stimuli vector` no shape files are needed and none are checked). The
+exit status is 1 if any check failed.
+
+Launch-to-first-frame is measured from the first line of the task script to
+the flip stamp of the first frame on the event timeline, and printed at
+session end. `python task_v0.1.py --first-frame` opens the display, shows
+one frame and exits (the startup benchmark in benchmarks.py times it).
+"""
+import importlib.util
+import os
+
+from event_timeline import KIND_ID
+from markers import BACKENDS, COLORS, POSITIONS
+
+
+def scan_stimuli(save_dir):
+    """Sorted shape images and their rotated versions in save_dir"""
+    if not os.path.exists(save_dir):
+        raise ValueError(f"Shape folder not found: {save_dir}")
+    names = os.listdir(save_dir)
+    stimuli = sorted(os.path.join(save_dir, f) for f in names
+                     if f.endswith(".png") and "_rotated" not in f)
+    rotated = sorted(os.path.join(save_dir, f) for f in names if f.endswith("_rotated.png"))
+    return stimuli, rotated
+
+def first_frame_ms(timeline, launch_ns, ready_ns):
+    """Milliseconds from launch to the first flip after display setup (ready_ns), None if nothing was shown
+
+    Flips before ready_ns are the refresh-rate measurement, not task frames.
+    """
+    ev = timeline.events()
+    flips = ev['t_ns'][(ev['kind'] == KIND_ID['flip']) & (ev['t_ns'] >= ready_ns)]
+    return (int(flips[0]) - launch_ns) / 1e6 if len(flips) else None
+
+# =========================
+#  CHECKS
+# =========================
+def check_stimuli(save_dir):
+    stimuli, rotated = scan_stimuli(save_dir)
+    problems = []
+    found = set()
+    for path in stimuli:
+        parts = os.path.basename(path).replace(".png", "").split("_")
+        if len(parts) < 2 or parts[0] not in COLORS or parts[1] not in POSITIONS:
+            problems.append(f"unexpected file name {os.path.basename(path)}")
+        else:
+            found.add((parts[0], parts[1]))
+    missing = [f"{c}_{p}" for c in COLORS for p in POSITIONS if (c, p) not in found]
+    if missing:
+        problems.append(f"missing {', '.join(missing)}")
+
+    from PIL import Image
+    for path in stimuli + rotated:
+        try:
+            with Image.open(path) as img:
+                img.verify()
+        except Exception as e:
+            problems.append(f"unreadable {os.path.basename(path)} ({e})")
+    if problems:
+        raise ValueError("; ".join(problems))
+    return f"{len(stimuli)} shapes, {len(rotated)} rotated, all readable"
+
+def check_vector_stimuli():
+    from vector_stimuli import stimulus_geometry, stimulus_names
+    names = stimulus_names() + stimulus_names(rotated=True)
+    for name in names:
+        color, pos = name.split("_")[:2]
+        stimulus_geometry(color, pos, rotated=name.endswith("_rotated.png"))
+    return f"{len(names)} shapes drawn as vectors (no files needed)"
+
+def check_deal_bank():
+    from deal_bank import DEAL_BANK_FILE, load_deal_bank
+    if not os.path.exists(DEAL_BANK_FILE):
+        raise ValueError(f"{DEAL_BANK_FILE} missing (run `python deal_bank.py`, or it is generated at the first game)")
+    bank = load_deal_bank()
+    return f"{len(bank.deals)} deals in {DEAL_BANK_FILE}"
+
+def check_schedule():
+    from counterbalance import SCHEDULE_FILE, load_schedule
+    schedule = load_schedule()
+    if schedule is None:
+        return f"no {SCHEDULE_FILE}, deals and turn order will be random"
+    slots = schedule.data['slots']
+    free = sum(slot['player'] is None for slot in slots)
+    return f"{free} of {len(slots)} slots free in {SCHEDULE_FILE}"
+
+def check_markers(backend_name):
+    if backend_name not in BACKENDS:
+        raise ValueError(f"unknown backend '{backend_name}' (use {', '.join(BACKENDS)})")
+    backend = BACKENDS[backend_name]()  # opens the port/socket like the task does
+    backend.close()
+    return f"'{backend_name}' backend opened"
+
+def check_environment():
+    from task_clock import clock_from_env
+    from profiling import profiler_from_env
+    clock = clock_from_env()
+    bot = os.environ.get("TASK_BOT", "").strip()
+    if bot and bot != "random":
+        if not bot.startswith("replay:"):
+            raise ValueError(f"TASK_BOT must be 'random' or 'replay:<turn log>', got {bot!r}")
+        if not os.path.exists(bot[len("replay:"):]):
+            raise ValueError(f"TASK_BOT turn log not found: {bot[len('replay:'):]}")
+    profiler = profiler_from_env()
+    return (f"clock {clock.speed:g}×, bot {bot or 'off'}, "
+            f"profiling {'on' if profiler.enabled else 'off'}")
+
+def check_psychopy():
+    if importlib.util.find_spec("psychopy") is None:
+        raise ValueError("psychopy is not installed")
+    return "psychopy installed (not imported)"
+
+def check_setup(save_dir, marker_backend, log=print, stimulus_renderer="bitmap"):
+    """Run every startup check without a display; True if all passed"""
+    checks = [
+        ("Stimuli", check_vector_stimuli if stimulus_renderer == "vector" else lambda: check_stimuli(save_dir)),
+        ("Deal bank", check_deal_bank),
+        ("Schedule", check_schedule),
+        ("Markers", lambda: check_markers(marker_backend)),
+        ("Environment", check_environment),
+        ("PsychoPy", check_psychopy),
+    ]
+    ok = True
+    log("=== Startup check ===")
+    for name, check in checks:
+        try:
+            log(f"✅ {name}: {check()}")
+        except Exception as e:
+            ok = False
+            log(f"❌ {name}: {e}")
+    log("✅ Ready to run" if ok else "⚠️ Fix the failed checks before running the task")
+    return ok
@@ -0,0 +1,169 @@
+"""Parameter sweep for the OptimalAI stall and urgency heuristics.
+
+Evaluates a grid (or random sample) of AI parameter settings on simulated games
+across all CPU cores and writes a table ranked by mean turns-to-completion with
+95% confidence intervals.
+
+Every parameter setting is played on the same seeded deals (common random
+numbers), so differences between rows come from the parameters, not the deals.
+
+Usage:
+    python sweep_ai_params.py                       # full grid, 500 games per setting
+    python sweep_ai_params.py --mode random --samples 50 --games 2000
+    python sweep_ai_params.py --noise 0.2 --out ai_param_sweep.csv
+"""
+import argparse
+import csv
+import itertools
+import math
+import os
+import random
+import statistics
+import time
+from multiprocessing import Pool
+
+from optimal_ai import DEFAULT_AI_PARAMS, make_ai_params
+from game_sim import simulate_game
+
+# =========================
+#  SEARCH SPACE
+# =========================
+PARAM_GRID = {
+    'stall_rounds': [1, 2, 3, 4],
+    'stall_hints': [1, 2, 3],
+    'playable_urgency': [0, 3, 6],
+    'endgame_urgency': [0, 5, 10],
+    'endgame_slots': [1, 2],
+    'progress_window': [2, 3, 5],
+}
+
+def grid_settings(grid=PARAM_GRID):
+    """Every combination of the grid values"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def random_settings(n, rng, grid=PARAM_GRID):
+    """n distinct settings drawn uniformly from the grid"""
+    all_settings = grid_settings(grid)
+    return rng.sample(all_settings, min(n, len(all_settings)))
+
+# =========================
+#  WORKER
+# =========================
+def run_chunk(job):
+    """Play one chunk of seeded games for one setting (runs in a worker process)"""
+    setting_idx, params, seeds, noise, max_turns = job
+    results = [simulate_game(params, seed=s, noise=noise, max_turns=max_turns) for s in seeds]
+    return setting_idx, [(s, r['turns'], r['completed'], r['score']) for s, r in zip(seeds, results)]
+
+def mean_ci(values):
+    """Mean, standard deviation and normal-approximation 95% CI half-width"""
+    n = len(values)
+    mean = statistics.fmean(values)
+    sd = statistics.stdev(values) if n > 1 else 0.0
+    return mean, sd, 1.96 * sd / math.sqrt(n)
+
+def summarize(params, games, baseline_turns):
+    """Summary row for one setting; games are (seed, turns, completed, score) sorted by seed.
+
+    Unfinished games count as max_turns. The delta columns are a paired
+    comparison against the default parameters on the same deals.
+    """
+    turns = [t for _, t, _, _ in games]
+    mean, sd, half_width = mean_ci(turns)
+    delta, _, delta_half_width = mean_ci([t - b for t, b in zip(turns, baseline_turns)])
+    row = dict(params)
+    row.update({
+        'games': len(turns),
+        'mean_turns': round(mean, 3),
+        'ci_low': round(mean - half_width, 3),
+        'ci_high': round(mean + half_width, 3),
+        'sd_turns': round(sd, 3),
+        'median_turns': statistics.median(turns),
+        'delta_vs_default': round(delta, 3),
+        'delta_ci_low': round(delta - delta_half_width, 3),
+        'delta_ci_high': round(delta + delta_half_width, 3),
+        'completion_rate': round(sum(c for _, _, c, _ in games) / len(games), 4),
+        'mean_score': round(statistics.fmean(s for _, _, _, s in games), 3),
+    })
+    return row
+
+def run_sweep(settings, n_games=500, seed=0, noise=0.0, max_turns=200, workers=None, chunk_size=250):
+    """Evaluate every setting on the same n_games seeded deals and return ranked rows"""
+    settings = [make_ai_params(s) for s in settings]
+    # The defaults are always evaluated so every row can be compared against them
+    if DEFAULT_AI_PARAMS not in settings:
+        settings.append(dict(DEFAULT_AI_PARAMS))
+    seeds = [seed + i for i in range(n_games)]
+    jobs = []
+    for idx, params in enumerate(settings):
+        for start in range(0, n_games, chunk_size):
+            jobs.append((idx, params, seeds[start:start + chunk_size], noise, max_turns))
+
+    games = {idx: [] for idx in range(len(settings))}
+    with Pool(processes=workers or os.cpu_count()) as pool:
+        for idx, chunk in pool.imap_unordered(run_chunk, jobs):
+            games[idx].extend(chunk)
+
+    for chunk in games.values():
+        chunk.sort()
+    baseline = [t for _, t, _, _ in games[settings.index(DEFAULT_AI_PARAMS)]]
+    rows = [summarize(settings[idx], games[idx], baseline) for idx in range(len(settings))]
+    rows.sort(key=lambda r: (-r['completion_rate'], r['mean_turns']))
+    for rank, row in enumerate(rows, start=1):
+        row['rank'] = rank
+    return rows
+
+def save_sweep(rows, filename):
+    """Write ranked rows to CSV"""
+    fields = ['rank'] + list(DEFAULT_AI_PARAMS) + [
+        'games', 'mean_turns', 'ci_low', 'ci_high', 'sd_turns', 'median_turns',
+        'delta_vs_default', 'delta_ci_low', 'delta_ci_high', 'completion_rate', 'mean_score']
+    with open(filename, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: row[k] for k in fields})
+
+# =========================
+#  MAIN
+# =========================
+def main():
+    parser = argparse.ArgumentParser(description="Sweep OptimalAI heuristic parameters on simulated games")
+    parser.add_argument('--mode', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--samples', type=int, default=40, help="settings to draw in random mode")
+    parser.add_argument('--games', type=int, default=500, help="games per setting")
+    parser.add_argument('--noise', type=float, default=0.2, help="probability the simulated participant acts randomly")
+    parser.add_argument('--max-turns', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='ai_param_sweep.csv')
+    args = parser.parse_args()
+
+    if args.mode == 'grid':
+        settings = grid_settings()
+    else:
+        settings = random_settings(args.samples, random.Random(args.seed))
+    if DEFAULT_AI_PARAMS not in settings:
+        settings.append(dict(DEFAULT_AI_PARAMS))
+
+    print(f"🎮 Sweeping {len(settings)} settings × {args.games} games on {args.workers or os.cpu_count()} workers")
+    start = time.time()
+    rows = run_sweep(settings, n_games=args.games, seed=args.seed, noise=args.noise,
+                     max_turns=args.max_turns, workers=args.workers)
+    elapsed = time.time() - start
+    save_sweep(rows, args.out)
+
+    print(f"✅ {len(settings) * args.games} games in {elapsed:.1f}s, results saved to {args.out}")
+    print("\n=== Top settings (mean turns [95% CI], paired delta vs defaults [95% CI]) ===")
+    for row in rows[:5]:
+        params = ", ".join(f"{k}={row[k]}" for k in DEFAULT_AI_PARAMS)
+        print(f"#{row['rank']}: {row['mean_turns']:.2f} [{row['ci_low']:.2f}, {row['ci_high']:.2f}]  "
+              f"Δ {row['delta_vs_default']:+.2f} [{row['delta_ci_low']:+.2f}, {row['delta_ci_high']:+.2f}]  {params}")
+    default_row = next(r for r in rows if all(r[k] == v for k, v in DEFAULT_AI_PARAMS.items()))
+    print(f"Defaults rank #{default_row['rank']}: {default_row['mean_turns']:.2f} "
+          f"[{default_row['ci_low']:.2f}, {default_row['ci_high']:.2f}]")
+
+
+if __name__ == "__main__":
+    main()
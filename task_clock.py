@@ -0,0 +1,120 @@
+"""Clock behind every wait and timer in the task.
+
+TaskClock(speed=1.0) is real time. With speed > 1 it is a virtual clock
+running speed× faster than real time: wait(secs) sleeps secs / speed, now()
+and the timers it hands out read virtual seconds, frame-counted displays
+(frame_scheduler.py, the localizer engine) show secs / speed worth of frames,
+and nominal() converts real durations measured elsewhere (event timeline
+RTs, presentation log) to virtual seconds. Every duration the task logs is
+therefore the nominal one, at any speed, and a scripted session runs in
+1/speed of the time.
+
+wait_async() and sleep_async() are the same pauses as coroutines for the
+task's asyncio runtime (runtime.py): other tasks on the event loop run
+during them.
+
+The mode comes from the TASK_CLOCK environment variable: unset or "real",
+or a speed factor such as "100" for automated end-to-end and soak runs.
+"""
+import asyncio
+import os
+import time
+
+from event_timeline import now_ns
+
+
+class TaskClock:
+    def __init__(self, speed=1.0):
+        if speed <= 0:
+            raise ValueError(f"Clock speed must be positive, got {speed}")
+        self.speed = float(speed)
+        self.accelerated = self.speed != 1.0
+        self.frame_scale = 1.0 / self.speed  # frames shown per nominal frame
+        self.origin_ns = now_ns()
+        self.timeline = None
+        self.waited_s = 0.0  # nominal seconds spent in wait()
+
+    def __repr__(self):
+        return f"TaskClock(speed={self.speed:g})"
+
+    def now(self):
+        """Virtual seconds since the clock was created"""
+        return (now_ns() - self.origin_ns) / 1e9 * self.speed
+
+    def nominal(self, real_s):
+        """Virtual seconds corresponding to a real duration"""
+        return real_s * self.speed
+
+    def wait(self, secs):
+        """Timed pause of secs virtual seconds, recorded on the timeline with its nominal length.
+
+        Sleeps until the last couple of ms and spins the rest, so the pause
+        ends on time without busy-waiting through all of it.
+        """
+        if self.timeline is not None:
+            self.timeline.record('wait', value=int(round(secs * 1000)))
+        self.waited_s += secs
+        end_ns = now_ns() + int(secs / self.speed * 1e9)
+        coarse = (end_ns - now_ns()) / 1e9 - 0.002
+        if coarse > 0:
+            time.sleep(coarse)
+        while now_ns() < end_ns:
+            pass
+
+    def sleep(self, secs):
+        """Unrecorded short sleep of secs virtual seconds (input polling loops)"""
+        time.sleep(secs / self.speed)
+
+    async def wait_async(self, secs):
+        """wait() as a coroutine: the event loop runs other tasks until the last couple of ms.
+
+        Returns how late the pause ended (ns after its end, 0 when on time),
+        i.e. how long a background step held the loop past the deadline.
+        """
+        if self.timeline is not None:
+            self.timeline.record('wait', value=int(round(secs * 1000)))
+        self.waited_s += secs
+        end_ns = now_ns() + int(secs / self.speed * 1e9)
+        coarse = (end_ns - now_ns()) / 1e9 - 0.002
+        if coarse > 0:
+            await asyncio.sleep(coarse)
+        late = now_ns() - end_ns
+        while now_ns() < end_ns:
+            pass
+        return max(late, 0)
+
+    async def sleep_async(self, secs):
+        """sleep() as a coroutine (input polling loops)"""
+        await asyncio.sleep(secs / self.speed)
+
+    def Clock(self):
+        """Timer in virtual seconds with the getTime()/reset() interface of psychopy.core.Clock"""
+        return Timer(self)
+
+    def log_waits(self, timeline):
+        """Record every wait on the timeline ('wait', value = nominal ms)"""
+        self.timeline = timeline
+        return self
+
+
+class Timer:
+    def __init__(self, clock):
+        self.clock = clock
+        self.t0 = clock.now()
+
+    def getTime(self):
+        return self.clock.now() - self.t0
+
+    def reset(self, new_t=0.0):
+        self.t0 = self.clock.now() + new_t
+
+
+def clock_from_env(default="real"):
+    """TaskClock for the TASK_CLOCK environment variable ("real" or a speed factor)"""
+    mode = os.environ.get("TASK_CLOCK", default).strip().lower()
+    if mode in ("", "real"):
+        return TaskClock()
+    try:
+        return TaskClock(float(mode.rstrip("x")))
+    except ValueError:
+        raise ValueError(f"TASK_CLOCK must be 'real' or a speed factor like '100', got {mode!r}")
@@ -0,0 +1,256 @@
+"""Steady-state allocation budgets (allocations.HEADLESS_BUDGETS), checked headless with tracemalloc.
+
+The localizer engine runs its real trial loop on a stub window with stub
+stimuli (no PsychoPy, no display). The practice game's turns run through the
+code a turn of run_single_trial runs: the turn rules of game_sim.py with the
+task's CardPool, OptimalAI and TurnLogger, a BoardView board (layered, as in
+the task) for every prompt and result, and every click of the scripted
+participant resolved against board_view's regions at the bot's aim point and
+recorded on the timeline and marker output.
+"""
+import os
+import random
+import sys
+import tracemalloc
+import types
+
+import pytest
+
+from allocations import AllocationTracker, HEADLESS_BUDGETS
+from card_pool import CardPool
+from event_timeline import EventTimeline
+from frame_monitor import FrameMonitor
+from frame_scheduler import FrameScheduler
+from game_sim import ALL_CARDS, SimulatedParticipant, new_game, simulated_turn
+from io_worker import IOWorker
+from markers import CLICK_TARGETS, MarkerOutput, make_backend
+from optimal_ai import OptimalAI
+from photodiode import PhotodiodePatch
+from turn_logger import TurnLogger
+
+
+# =========================
+#  STUBS
+# =========================
+class StubWindow:
+    """The window calls the task uses: flip() runs the callOnFlip callbacks"""
+    size = (1280, 720)
+
+    def __init__(self):
+        self.callbacks = []
+
+    def callOnFlip(self, fn, *args):
+        self.callbacks.append((fn, args))
+
+    def clearBuffer(self):
+        pass
+
+    def flip(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for fn, args in callbacks:
+            fn(*args)
+
+
+class StubStim:
+    """ImageStim / TextStim / Rect / BufferImageStim stand-in"""
+
+    def __init__(self, *args, text="", height=0.05, **kwargs):
+        self.pos = (0, 0)
+        self.size = (0.15, 0.15)
+        lines = text.split("\n")
+        self.boundingBox = (max(len(line) for line in lines) * height * 360, len(lines) * height * 720)
+
+    def draw(self):
+        pass
+
+
+class StubClock:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.t0 = 0.0
+
+    def getTime(self):
+        return 0.0
+
+
+@pytest.fixture
+def stub_psychopy(monkeypatch):
+    """Just enough of psychopy for the engine's constructor and its key polling (nobody presses)"""
+    psychopy = types.ModuleType("psychopy")
+    psychopy.visual = types.SimpleNamespace(TextStim=StubStim, ImageStim=StubStim, Rect=StubStim,
+                                            BufferImageStim=StubStim)
+    psychopy.event = types.SimpleNamespace(getKeys=lambda *args, **kwargs: [],
+                                           clearEvents=lambda *args, **kwargs: None)
+    psychopy.core = types.SimpleNamespace(Clock=StubClock)
+    monkeypatch.setitem(sys.modules, "psychopy", psychopy)
+    return psychopy
+
+
+@pytest.fixture
+def io_worker(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    worker = IOWorker().start()
+    yield worker
+    worker.close()
+
+
+@pytest.fixture
+def tracker():
+    tracker = AllocationTracker(budgets=HEADLESS_BUDGETS)
+    yield tracker
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def within_budget(tracker, scope):
+    result = tracker.results()[scope]
+    assert result['net_median'] <= result['net_budget'], result
+    assert result['peak_median'] <= result['peak_budget'], result
+
+
+# =========================
+#  LOCALIZER
+# =========================
+def test_localizer_trial_within_budget(stub_psychopy, io_worker, tracker):
+    from localizer_engine import build_trial_list, LocalizerEngine
+
+    win = StubWindow()
+    timeline = EventTimeline()
+    timeline.attach(win)
+    markers = MarkerOutput(make_backend("loopback"), timeline).attach(win)
+    frame_monitor = FrameMonitor(timeline)
+    frame_monitor.attach(win)
+    scheduler = FrameScheduler(win, timeline, frame_monitor, io_worker, "presentation_log.csv")
+    photodiode = PhotodiodePatch(win, timeline=timeline, enabled=False)
+
+    stim_paths = [f"{color}_{pos}_square.png" for color, pos in ALL_CARDS]
+    trials, paths, _ = build_trial_list(stim_paths, total_trials=32, base_reps=2, rng=random.Random(0))
+    engine = LocalizerEngine(win, paths, lambda win, path: StubStim(), timeline, markers, photodiode,
+                             frame_monitor, scheduler, allocations=tracker)
+    engine.allocate(trials)
+    engine.run(trials, 0, len(trials))
+
+    assert tracker.count['localizer_trial'] == len(trials)
+    within_budget(tracker, 'localizer_trial')
+
+
+# =========================
+#  PRACTICE GAME
+# =========================
+def prompts(action):
+    """(prompt, click target) of each screen run_single_trial shows for a participant action"""
+    kind, idx = action[0], action[1]
+    if kind == 'hint':
+        return [("Click on an AI card (top row) to hint about:", ('ai', idx)),
+                (("Hint about AI card", f"{idx+1}:", "Click COLOR or POSITION"), action[2].upper())]
+    if kind == 'play':
+        return [("Click on YOUR card (bottom row) to play:", ('participant', idx)),
+                (("Click a SLOT (middle row) to play card", f"{idx+1}:"), ('slot', action[2]))]
+    return [("Click on YOUR card (bottom row) to replace:", ('participant', idx))]
+
+def result_message(action):
+    """The board message after a turn's action, as run_single_trial words it"""
+    kind = action[0]
+    if kind == 'hint' and isinstance(action[1], dict):  # ai_turn's hint
+        hint = action[1]
+        return ("AI hints: Your card", f"{hint['target_card']+1}", "has", hint['hint_value'].upper(),
+                f"({hint['hint_type']})")
+    if kind == 'hint':
+        return ("You hinted: Card", f"{action[1]+1}", f"({action[2]})")
+    if kind == 'play':
+        return ("You played card", f"{action[1]+1}", "to slot", f"{action[2]+1}!")
+    if kind == 'replace' and len(action) == 3:  # ai_turn's replace
+        return ("AI replaced card", f"{action[1]+1}.")
+    if kind == 'replace':
+        return ("You replaced card", f"{action[1]+1}!")
+    return "AI is waiting for more information."
+
+
+class ClickingParticipant(SimulatedParticipant):
+    """SimulatedParticipant answering the task's screens: a board per prompt, and a click at the
+    bot's aim point (bot_participant.target_region) resolved against the task's regions"""
+
+    def __init__(self, true_sequence, game, board, timeline, markers):
+        from board_view import BUTTON_SETS, get_button_regions, get_row_regions, region_at
+        from bot_participant import target_region
+
+        super().__init__(true_sequence)
+        self.game = game
+        self.board = board
+        self.timeline = timeline
+        self.markers = markers
+        self.region_at = region_at
+        self.target_region = target_region
+        self.row_regions = get_row_regions()
+        self.action_buttons = get_button_regions(BUTTON_SETS['action'])
+        self.hint_buttons = get_button_regions(BUTTON_SETS['hint'])
+
+    def click(self, target, regions):
+        center, _ = self.target_region(target)
+        region_name = self.region_at(regions, center)
+        self.timeline.record('click', label=str(region_name))
+        self.markers.send('click', CLICK_TARGETS.index(region_name))
+        return region_name
+
+    def choose_action(self, computer_cards, participant_hints, played_sequence):
+        action = super().choose_action(computer_cards, participant_hints, played_sequence)
+        participant_cards = self.game['participant_cards']
+        self.board.render_board(computer_cards, participant_cards, played_sequence,
+                                "Your turn! Click an action:", participant_hints, buttons=self.action_buttons)
+        assert self.click(action[0].upper(), self.action_buttons) == action[0].upper()
+        for prompt, target in prompts(action):
+            buttons = self.hint_buttons if isinstance(target, str) else None
+            self.board.render_board(computer_cards, participant_cards, played_sequence, prompt,
+                                    participant_hints, buttons=buttons)
+            assert self.click(target, buttons or self.row_regions[target[0]]) == target
+        return action
+
+
+def test_turn_within_budget(stub_psychopy, io_worker, tracker):
+    from board_view import BUTTON_SETS, BoardView, get_button_regions
+    from deal_bank import load_deal_bank, DEAL_BANK_FILE
+    from text_cache import TextCache
+
+    random.seed(0)
+    win = StubWindow()
+    timeline = EventTimeline()
+    timeline.attach(win)
+    markers = MarkerOutput(make_backend("loopback"), timeline).attach(win)
+    frame_monitor = FrameMonitor(timeline)
+    frame_monitor.attach(win)
+    photodiode = PhotodiodePatch(win, timeline=timeline, enabled=False)
+    stim_paths = [f"{color}_{pos}_square.png" for color, pos in ALL_CARDS]
+    board = BoardView(win, stim_paths, lambda win, path: StubStim(), timeline, markers, photodiode, frame_monitor,
+                      text_cache=TextCache(win), layered=True)
+    board.warm_up([get_button_regions(BUTTON_SETS['action']), get_button_regions(BUTTON_SETS['hint'])])
+
+    deal_bank = load_deal_bank(os.path.join(os.path.dirname(os.path.abspath(__file__)), DEAL_BANK_FILE),
+                               rng=random.Random(0))
+    pool = CardPool(list(ALL_CARDS))
+    logger = TurnLogger(io_worker, filename="turn_log.csv", timeline=timeline)
+    for trial in range(1, 9):
+        # trial setup (prepared ahead by the pipeline in the task) is outside the measured turns
+        deal = deal_bank.draw()
+        logger.start_trial("test", trial)
+        game = new_game(deal, OptimalAI(list(deal['true_sequence']), list(deal['participant_cards'])))
+        participant = ClickingParticipant(game['true_sequence'], game, board, timeline, markers)
+        participant_turn = trial % 2 == 0
+        turn_count = 0
+        while any(card is None for card in game['played_sequence']) and turn_count < 60:
+            turn_count += 1
+            tracker.mark('turn')
+            action = simulated_turn(game, pool, participant, participant_turn)
+            who = 'Participant' if participant_turn else 'AI'
+            logger.log_turn(turn_count, who, action[0].capitalize() if action else 'Retry', "", 1.0)
+            board.render_board(game['computer_cards'], game['participant_cards'], game['played_sequence'],
+                               result_message(action) if action else "That slot is taken! Try again.",
+                               game['participant_hints'])
+            if action:
+                participant_turn = not participant_turn
+        tracker.end()
+    logger.close()
+
+    assert tracker.count['turn'] > tracker.skip
+    within_budget(tracker, 'turn')
@@ -0,0 +1,28 @@
+"""The procedural stimuli match the shipped PNGs pixel for pixel (within antialiasing).
+
+Reads the PNGs straight from Shapes.zip; no display or PsychoPy needed.
+"""
+import zipfile
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from vector_stimuli import (SHAPES_ZIP, TOLERANCE, MAX_MISMATCH, stimulus_names, stimulus_geometry,
+                            parse_name, rasterize, load_png, compare)
+
+NAMES = stimulus_names() + stimulus_names(rotated=True)
+
+
+def test_every_stimulus_is_in_the_archive():
+    with zipfile.ZipFile(SHAPES_ZIP) as archive:
+        assert {f"Shapes/{name}" for name in NAMES} <= set(archive.namelist())
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_geometry_matches_png(name):
+    png = load_png(SHAPES_ZIP, name)
+    geometry = stimulus_geometry(*parse_name(name))
+    assert png.shape[1::-1] == geometry['size_px']
+    fraction, worst = compare(png, rasterize(geometry), TOLERANCE)
+    assert fraction <= MAX_MISMATCH, f"{name}: {fraction:.3%} of pixels differ (max diff {worst})"
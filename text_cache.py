@@ -0,0 +1,98 @@
+"""Laid-out text kept for reuse, with LRU eviction.
+
+A TextStim lays its text out (glyph quads against the font atlas) whenever
+it is created or its text changes; the task used to do that for every
+instruction screen, name prompt, board message, button label and '?'
+placeholder on every frame. TextCache keeps one laid-out TextStim per
+(text, height, color, wrap width, bold) and only moves it when drawing. The
+least recently used entry is dropped when more than `capacity` are held.
+
+Parameterized messages ("AI hints: Your card 2 has BLUE (color)") are drawn
+with draw_parts() from cached fragments ("AI hints: Your card", "2", "has",
+"BLUE", "(color)"), laid out side by side with the measured width of each
+fragment and of a space in that style, so the cache holds the fragments
+instead of every combination. A "\n" part starts a new line.
+
+Sizes are converted from the stimuli's pixel bounding boxes assuming the
+window uses 'height' units, as the task does.
+"""
+from collections import OrderedDict
+
+from psychopy import visual
+
+
+class TextCache:
+    def __init__(self, win, capacity=256):
+        self.win = win
+        self.capacity = capacity
+        self.entries = OrderedDict()  # key -> [stim, width, height] (height units)
+        self.spacing = {}  # (height, bold) -> (space width, line advance)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def entry(self, text, height, color='black', wrap_width=None, bold=False):
+        key = (text, height, color, wrap_width, bold)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        stim = visual.TextStim(self.win, text=text, color=color, height=height, wrapWidth=wrap_width, bold=bold)
+        width, text_height = (v / self.win.size[1] for v in stim.boundingBox)
+        entry = self.entries[key] = [stim, width, text_height]
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def get(self, text, height, color='black', wrap_width=None, bold=False):
+        """Laid-out TextStim for this text and style"""
+        return self.entry(text, height, color, wrap_width, bold)[0]
+
+    def draw(self, text, pos=(0, 0), height=0.05, color='black', wrap_width=None, bold=False):
+        stim = self.get(text, height, color, wrap_width, bold)
+        stim.pos = pos
+        stim.draw()
+
+    def metrics(self, height, bold=False):
+        """(space width, line advance) of a text style, measured once"""
+        spacing = self.spacing.get((height, bold))
+        if spacing is None:
+            measure = lambda text: visual.TextStim(self.win, text=text, height=height, bold=bold).boundingBox
+            space = (measure("x x")[0] - measure("xx")[0]) / self.win.size[1]
+            advance = (measure("x\nx")[1] - measure("x")[1]) / self.win.size[1]
+            spacing = self.spacing[(height, bold)] = (space, advance)
+        return spacing
+
+    def draw_parts(self, parts, pos=(0, 0), height=0.05, color='black', bold=False):
+        """Draw cached fragments joined by spaces, centered on pos like one TextStim of the joined text"""
+        space, advance = self.metrics(height, bold)
+        lines = [[]]
+        for part in parts:
+            if part == "\n":
+                lines.append([])
+            else:
+                lines[-1].append(self.entry(part, height, color, None, bold))
+        y = pos[1] + (len(lines) - 1) * advance / 2
+        for line in lines:
+            x = pos[0] - (sum(e[1] for e in line) + space * (len(line) - 1)) / 2
+            for stim, width, _ in line:
+                stim.pos = (x + width / 2, y)
+                stim.draw()
+                x += width + space
+            y -= advance
+
+    def summary(self):
+        total = self.hits + self.misses
+        return (f"Text cache: {len(self.entries)} entries, {self.hits}/{total} hits"
+                + (f" ({100 * self.hits / total:.1f}%)" if total else "")
+                + f", {self.evictions} evicted")
+
+
+def message_text(message):
+    """Plain text of a message given as a string or as draw_parts() fragments"""
+    if isinstance(message, str):
+        return message
+    return " ".join(message).replace(" \n ", "\n")
@@ -0,0 +1,71 @@
+"""Next-trial preparation while the current trial's closing screens are up.
+
+Without it, everything a trial needs (drawing the deal, building the AI,
+loading the card images, laying out its instruction screens) was done after
+the participant pressed space on "Ready for Trial N?", between that key
+press and the first frame of the trial. The pipeline runs that setup as a
+background task on the runtime (runtime.py) instead: trial 1 is prepared
+during the welcome and instruction screens, trial N+1 as soon as the
+gameplay of trial N ends, while the completion board, the target/played
+comparison, the summary and the "Ready" screens are up. take() then hands
+the prepared trial over without waiting.
+
+Preparation only runs while the task awaits a timer or input, never inside
+the frame-locked loops. A preparation that fails (logged by the runtime) or
+was never started is done on demand at take(), as before. summary() reports
+how many trials were ready in advance, how many were still being prepared
+at take() (late: the trial waited for the rest of its preparation) and the
+setup time left at trial start.
+"""
+import numpy as np
+
+from event_timeline import now_ns
+
+
+class TrialPipeline:
+    def __init__(self, runtime, prepare, n_trials, enabled=True):
+        self.runtime = runtime
+        self.prepare_trial = prepare  # async prepare(trial_number) -> dict with everything the trial needs
+        self.n_trials = n_trials
+        self.enabled = enabled
+        self.pending = {}  # trial number -> background task
+        self.ahead = 0      # done before take(): the trial started without setup
+        self.late = 0       # still running at take() and awaited
+        self.on_demand = 0
+        self.setup_ns = np.zeros(n_trials, dtype=np.int64)  # time spent in take() per trial
+
+    def prepare(self, trial_number):
+        """Start preparing a trial in the background (ignored past the last trial, or when off)"""
+        if not self.enabled or trial_number > self.n_trials or trial_number in self.pending:
+            return
+        self.pending[trial_number] = self.runtime.spawn(self.prepare_trial(trial_number),
+                                                        name=f"prepare_trial_{trial_number}")
+
+    async def take(self, trial_number):
+        """The prepared trial: finished in the background, awaited if still running, or prepared now"""
+        start = now_ns()
+        task = self.pending.pop(trial_number, None)
+        trial = None
+        if task is not None:
+            ready = task.done()  # not done if the participant was faster than the preparation
+            try:
+                trial = await task
+                if ready:
+                    self.ahead += 1
+                else:
+                    self.late += 1
+            except Exception:
+                pass  # logged by the runtime; prepared again below
+        if trial is None:
+            trial = await self.prepare_trial(trial_number)
+            self.on_demand += 1
+        if trial_number <= self.n_trials:
+            self.setup_ns[trial_number - 1] = now_ns() - start
+        return trial
+
+    def summary(self):
+        setup = self.setup_ns[:self.ahead + self.late + self.on_demand] / 1e6
+        return (f"Trial pipeline: {self.ahead} trial(s) prepared in advance, {self.late} late, "
+                f"{self.on_demand} on demand, "
+                f"setup at trial start median {np.median(setup) if len(setup) else 0:.2f} ms "
+                f"(max {setup.max() if len(setup) else 0:.2f} ms)")
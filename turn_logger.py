@@ -0,0 +1,152 @@
+"""Append-only, crash-safe turn logger for the practice game.
+
+Each turn is handed to the background I/O worker (io_worker.py) as soon as it
+happens instead of at the end of the trial, stamped with its own monotonic
+time on the presentation thread. The worker owns the file, flushes and fsyncs
+it at most `flush_interval` seconds after a row is queued, at the end of every
+trial, and at session end or interpreter exit (which covers core.quit() and
+uncaught exceptions).
+
+On open, a partial last line left by a killed process is truncated so the file
+stays valid CSV. Files with a different header (e.g. the pilot log) are never
+modified; the logger streams to a `_v2` file next to them instead.
+"""
+import atexit
+import csv
+import os
+import time
+from datetime import datetime
+
+from event_timeline import now_ns
+
+TURN_LOG_FILE = "turn_by_turn_log.csv"
+TURN_LOG_HEADER = ['Player_Name', 'Trial', 'Turn', 'Player', 'Action', 'Details',
+                   'RT_Seconds', 'Timestamp', 'Monotonic_S']
+
+
+def recover_partial_file(filename, n_columns=len(TURN_LOG_HEADER)):
+    """Repair the tail of a log left by a killed process; returns bytes dropped.
+
+    A last line without a newline is kept (and terminated) if it is a complete
+    row of n_columns fields, otherwise it is truncated.
+    """
+    if not os.path.exists(filename):
+        return 0
+    with open(filename, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return 0
+        # Scan back for the start of the last line
+        chunk = 4096
+        pos = size
+        keep = 0
+        while pos > 0:
+            start = max(0, pos - chunk)
+            f.seek(start)
+            idx = f.read(pos - start).rfind(b'\n')
+            if idx != -1:
+                keep = start + idx + 1
+                break
+            pos = start
+        f.seek(keep)
+        tail = f.read().decode('utf-8', errors='replace')
+        if len(next(csv.reader([tail]), [])) == n_columns:
+            f.write(b'\n')
+            return 0
+        f.truncate(keep)
+        return size - keep
+
+
+def read_header(filename):
+    if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+        return None
+    with open(filename, newline='') as f:
+        return next(csv.reader(f), None)
+
+
+def open_turn_log(filename):
+    """Resolve, repair and open the turn log; returns (file, csv_writer, path)"""
+    header = read_header(filename)
+    if header is not None and header != TURN_LOG_HEADER:
+        # Older logs (e.g. the pilot data) have no monotonic column; leave them untouched
+        root, ext = os.path.splitext(filename)
+        filename = f"{root}_v2{ext}"
+        print(f"⚠️ Existing turn log uses a different column layout, streaming to {filename} instead")
+        header = read_header(filename)
+
+    dropped = recover_partial_file(filename)
+    if dropped:
+        print(f"⚠️ Recovered {filename}: dropped {dropped} bytes of a partially written row")
+
+    f = open(filename, 'a', newline='', buffering=64 * 1024)
+    writer = csv.writer(f)
+    if header is None:
+        writer.writerow(TURN_LOG_HEADER)
+    return f, writer, filename
+
+
+class TurnLogger:
+    """Streams turn records for one session to the turn-by-turn CSV through the I/O worker"""
+
+    def __init__(self, io_worker, filename=TURN_LOG_FILE, timeline=None):
+        self.io_worker = io_worker
+        self.timeline = timeline  # if given, every row is also a 'turn' event at the same timestamp
+        self.filename = filename  # updated by the worker if it switches to a _v2 file
+        self.key = f"turn_log:{filename}"
+
+        def opener():
+            f, writer, self.filename = open_turn_log(filename)
+            return f, writer
+        io_worker.open_stream(self.key, opener)
+
+        # Anchor wall-clock timestamps to the monotonic clock so they never jump
+        self.wall_anchor = time.time()
+        self.mono_anchor = now_ns()
+
+        self.player_name = None
+        self.trial_number = None
+        self.rows_written = 0
+        self.closed = False
+        atexit.register(self.close)
+
+    def start_trial(self, player_name, trial_number):
+        self.player_name = player_name
+        self.trial_number = trial_number
+
+    def log(self, entry):
+        """Queue one turn record (dict with turn, player, action, details, rt) for writing"""
+        self.log_turn(entry['turn'], entry['player'], entry['action'], entry['details'], entry['rt'])
+
+    def log_turn(self, turn, player, action, details, rt=None):
+        """Queue one turn record for writing (log() without the entry dict)"""
+        if self.timeline is not None:
+            mono_ns = self.timeline.record('turn', label=f"{player} {action}")
+        else:
+            mono_ns = now_ns()
+        wall = datetime.fromtimestamp(self.wall_anchor + (mono_ns - self.mono_anchor) / 1e9)
+        self.io_worker.write_row(self.key, [
+            self.player_name,
+            self.trial_number,
+            turn,
+            player,
+            action,
+            details,
+            round(rt, 3) if rt is not None else '',
+            wall.isoformat(' ', 'milliseconds'),  # as strftime(...%f)[:-3], without strftime's 4.6 KB buffer
+            f"{mono_ns / 1e9:.6f}",
+        ])
+        self.rows_written += 1
+
+    def flush(self):
+        """Ask the worker to put every queued row on disk now (does not wait)"""
+        self.io_worker.sync(self.key)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.io_worker.close_stream(self.key)
+        atexit.unregister(self.close)
@@ -0,0 +1,250 @@
+"""Procedural stimuli: the shape images drawn as PsychoPy shapes instead of PNGs.
+
+Every stimulus is a colored square (or, for the _rotated set, a square
+turned 45°) at one edge of a white canvas; generate_stimuli.py draws them
+into 400×400 PNGs. stimulus_geometry() gives the same shape in canvas
+coordinates normalized to the (cropped) image, -0.5..0.5 with y up, from the
+same constants: 81 px squares (PIL rectangles include both corners) at
+get_coords() positions, rotated ones moved 20 px inward, and the rotated
+images cropped on their edge as generate_stimuli.py leaves them.
+
+VectorStimulus draws it as a white Rect (the image background) plus the
+shape, with the pos/size/draw interface of the ImageStim it replaces, so the
+localizer and the board use it unchanged. It needs no file, no decoding and
+no texture upload, and is exact at any display size. The task selects it
+with STIMULUS_RENDERER = "vector" or `--stimuli vector`.
+
+Usage (pixel comparison against the PNGs, read from Shapes.zip by default or
+from a folder; exit status 1 on a mismatch):
+    python vector_stimuli.py
+    python vector_stimuli.py --dir Shapes --window   # also compare both renderers on screen
+The same comparison runs as a test: python -m pytest test_vector_stimuli.py
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import zipfile
+
+import numpy as np
+
+from markers import POSITIONS
+
+# Same values as generate_stimuli.py
+COLOR_RGB = {
+    "yellow": (255, 255, 0),
+    "blue": (0, 0, 255),
+    "cyan": (0, 255, 255),
+    "orange": (255, 165, 0),
+}
+CANVAS = 400
+MARGIN = 40
+SQUARE_PX = 81  # draw.rectangle([x - 40, y - 40, x + 40, y + 40]) covers 81 pixels
+ROTATED_OFFSET = 20
+# PIL's rotate(45, expand=True) of the 160 px patch turns the square about (80, 80), not its
+# center (80.5, 80.5), and the 228 px result is pasted at round(x - 114): the diamond center
+# lands 0.707 px right of the nominal point. Rows/columns generate_stimuli.py's edge crop
+# removes from each rotated image (the bicubic fringe reaches past the geometric corner):
+ROTATED_SHIFT_X = 0.5 * math.sqrt(2)
+ROTATED_CROP = {"up": 1, "down": 1, "left": 3, "right": 2}
+
+# The PNGs as shipped with the repo (a Shapes/ folder inside the zip)
+SHAPES_ZIP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Shapes.zip")
+TOLERANCE = 48  # per-channel difference counted as a mismatch
+MAX_MISMATCH = 0.005  # allowed fraction of mismatched pixels
+
+
+def stimulus_names(rotated=False):
+    """File names of the stimulus set, sorted like the task's scan of the shape folder"""
+    suffix = "_square_rotated.png" if rotated else "_square.png"
+    return sorted(f"{color}_{pos}{suffix}" for color in COLOR_RGB for pos in POSITIONS)
+
+def canvas_point(position):
+    """get_coords() of generate_stimuli.py: the shape center in canvas pixels (y down)"""
+    mid = CANVAS // 2
+    return {"up": (mid, MARGIN), "down": (mid, CANVAS - MARGIN),
+            "left": (MARGIN, mid), "right": (CANVAS - MARGIN, mid)}[position]
+
+def stimulus_geometry(color, position, rotated=False):
+    """Image aspect (w / h), fill color and shape vertices normalized to the image (-0.5..0.5, y up)"""
+    x, y = canvas_point(position)
+    width = height = CANVAS
+    left = top = 0
+    if not rotated:
+        # pixels x - 40 .. x + 40 inclusive, i.e. [x - 40, x + 41) in continuous coordinates
+        cx, cy = x + 0.5, y + 0.5
+        r = SQUARE_PX / 2
+        corners = [(cx - r, cy - r), (cx + r, cy - r), (cx + r, cy + r), (cx - r, cy + r)]
+    else:
+        inward = {"up": (0, 1), "down": (0, -1), "left": (1, 0), "right": (-1, 0)}[position]
+        cx = x + inward[0] * ROTATED_OFFSET + ROTATED_SHIFT_X
+        cy = y + inward[1] * ROTATED_OFFSET
+        r = SQUARE_PX / math.sqrt(2)  # half diagonal
+        corners = [(cx, cy - r), (cx + r, cy), (cx, cy + r), (cx - r, cy)]
+        crop = ROTATED_CROP[position]
+        if position == "up":
+            top, height = crop, CANVAS - crop
+        elif position == "down":
+            height = CANVAS - crop
+        elif position == "left":
+            left, width = crop, CANVAS - crop
+        else:
+            width = CANVAS - crop
+    vertices = [((px - left) / width - 0.5, 0.5 - (py - top) / height) for px, py in corners]
+    return {'aspect': width / height, 'size_px': (width, height), 'rgb': COLOR_RGB[color], 'vertices': vertices}
+
+def parse_name(path):
+    """(color, position, rotated) of a stimulus file name"""
+    parts = os.path.basename(path).replace(".png", "").split("_")
+    return parts[0], parts[1], parts[-1] == "rotated"
+
+# =========================
+#  PSYCHOPY STIMULUS
+# =========================
+class VectorStimulus:
+    """White background and colored shape with the pos/size/draw interface of an ImageStim"""
+
+    def __init__(self, win, color, position, rotated=False, size=(0.35, 0.35), pos=(0, 0)):
+        from psychopy import visual
+        geometry = stimulus_geometry(color, position, rotated)
+        self.background = visual.Rect(win, width=1, height=1, fillColor='white', lineColor=None)
+        self.shape = visual.ShapeStim(win, vertices=geometry['vertices'], fillColor=geometry['rgb'],
+                                      lineColor=None, colorSpace='rgb255')
+        self.size = size
+        self.pos = pos
+
+    @property
+    def size(self):
+        return self._size
+
+    @size.setter
+    def size(self, size):
+        self._size = size
+        self.background.size = size
+        self.shape.size = size
+
+    @property
+    def pos(self):
+        return self._pos
+
+    @pos.setter
+    def pos(self, pos):
+        self._pos = pos
+        self.background.pos = pos
+        self.shape.pos = pos
+
+    def draw(self):
+        self.background.draw()
+        self.shape.draw()
+
+def make_stimulus(win, path, log=print):
+    """VectorStimulus for a stimulus file name (the file itself is not read)"""
+    try:
+        color, position, rotated = parse_name(path)
+        return VectorStimulus(win, color, position, rotated)
+    except Exception as e:
+        log(f"⚠️ Failed to build {os.path.basename(path)}: {e}")
+        return None
+
+# =========================
+#  PIXEL COMPARISON
+# =========================
+def rasterize(geometry, supersample=4):
+    """RGB array of the geometry at the PNG's resolution, with edges antialiased by supersampling"""
+    from PIL import Image, ImageDraw
+    width, height = geometry['size_px']
+    big = Image.new("RGB", (width * supersample, height * supersample), "white")
+    polygon = [((u + 0.5) * width * supersample, (0.5 - v) * height * supersample)
+               for u, v in geometry['vertices']]
+    ImageDraw.Draw(big).polygon(polygon, fill=geometry['rgb'])
+    return np.asarray(big.resize((width, height), Image.BOX)).astype(np.int16)
+
+def load_png(source, name):
+    """RGB array of a stimulus PNG from a folder or from a zip of the Shapes folder"""
+    from PIL import Image
+    if source.endswith(".zip"):
+        with zipfile.ZipFile(source) as archive, archive.open(f"Shapes/{name}") as f:
+            return np.asarray(Image.open(f).convert("RGB")).astype(np.int16)
+    return np.asarray(Image.open(os.path.join(source, name)).convert("RGB")).astype(np.int16)
+
+def png_names(source):
+    """Stimulus file names present in a folder or zip"""
+    if source.endswith(".zip"):
+        with zipfile.ZipFile(source) as archive:
+            return {os.path.basename(n) for n in archive.namelist() if n.startswith("Shapes/")}
+    return set(os.listdir(source)) if os.path.isdir(source) else set()
+
+def compare(reference, candidate, tolerance=TOLERANCE):
+    """(fraction of pixels differing by more than tolerance in any channel, max difference)"""
+    if reference.shape != candidate.shape:
+        return 1.0, 255
+    diff = np.abs(reference.astype(np.int16) - candidate.astype(np.int16)).max(axis=2)
+    return float((diff > tolerance).mean()), int(diff.max())
+
+def screen_pairs(paths, size=0.8):
+    """(bitmap, vector) screenshots of each stimulus drawn by both renderers in a PsychoPy window"""
+    from psychopy import visual
+    from board_view import load_shape_image
+    win = visual.Window(size=[800, 800], color='white', units='height', fullscr=False, waitBlanking=False)
+    pairs = []
+    for path in paths:
+        shots = []
+        for stim in (load_shape_image(win, path), make_stimulus(win, path)):
+            stim.size = (size, size)
+            stim.pos = (0, 0)
+            win.clearBuffer()
+            stim.draw()
+            shots.append(np.asarray(win.getMovieFrame(buffer='back').convert("RGB")).astype(np.int16))
+            win.movieFrames = []
+        pairs.append(shots)
+    win.close()
+    return pairs
+
+# =========================
+#  MAIN
+# =========================
+def main():
+    parser = argparse.ArgumentParser(description="Pixel comparison of the procedural stimuli against the PNGs")
+    parser.add_argument('--dir', default=SHAPES_ZIP, help="folder with the stimulus PNGs, or Shapes.zip")
+    parser.add_argument('--tolerance', type=int, default=TOLERANCE, help="per-channel difference counted as a mismatch")
+    parser.add_argument('--max-mismatch', type=float, default=MAX_MISMATCH, help="allowed fraction of mismatched pixels")
+    parser.add_argument('--window', action='store_true', help="also compare both renderers on screen")
+    args = parser.parse_args()
+
+    names = stimulus_names() + stimulus_names(rotated=True)
+    missing = sorted(set(names) - png_names(args.dir))
+    if missing:
+        raise SystemExit(f"Missing {len(missing)} stimulus file(s) in {args.dir}, e.g. {missing[0]}")
+
+    failed = []
+    print(f"=== Geometry vs PNG (tolerance {args.tolerance}, max {args.max_mismatch:.1%} of pixels) ===")
+    for name in names:
+        fraction, worst = compare(load_png(args.dir, name), rasterize(stimulus_geometry(*parse_name(name))),
+                                  args.tolerance)
+        ok = fraction <= args.max_mismatch
+        failed += [] if ok else [name]
+        print(f"{'✅' if ok else '❌'} {name:32s} {fraction:7.3%} mismatched, max diff {worst}")
+
+    if args.window:
+        print("\n=== Bitmap vs vector on screen ===")
+        folder = args.dir
+        if folder.endswith(".zip"):  # the bitmap renderer loads files
+            folder = os.path.join(tempfile.mkdtemp(prefix="hanabi_shapes_"), "Shapes")
+            with zipfile.ZipFile(args.dir) as archive:
+                archive.extractall(os.path.dirname(folder), [f"Shapes/{name}" for name in names])
+        paths = [os.path.join(folder, name) for name in names]
+        for path, (bitmap, vector) in zip(paths, screen_pairs(paths)):
+            fraction, worst = compare(bitmap, vector, args.tolerance)
+            ok = fraction <= args.max_mismatch
+            failed += [] if ok else [f"{os.path.basename(path)} (screen)"]
+            print(f"{'✅' if ok else '❌'} {os.path.basename(path):32s} {fraction:7.3%} mismatched, max diff {worst}")
+
+    if failed:
+        print(f"⚠️ {len(failed)} stimulus/stimuli differ: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"✅ All {len(names)} stimuli match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""GPU/texture warm-up before the participant sees anything.
+
+The first draw of an image uploads its texture, and the first draw of a
+text style (font size, bold) rasterizes its glyph atlas; both happen on the
+presentation thread and used to make the first frames of each phase late.
+warm_up() draws everything the task will show into the back buffer without
+flipping: every text style with every glyph the task uses (including the
+hint arrows ^ v < >), plus whatever the phase passes in (every localizer
+stimulus, fixation and feedback; every card, hint state, box and button of
+the board). It then waits for the GPU to finish and clears the buffer, so
+nothing of it ever reaches the screen.
+
+Whether it worked is checked by the frame monitor, which counts the first
+frames of every phase separately (FrameMonitor.first_frames, reported at
+session end): those should hit their refresh deadline like any other frame.
+"""
+import string
+import time
+
+# (height, bold) of every text style in the task, board and localizer
+TEXT_STYLES = [
+    (0.03, False),   # hint text, name entry help
+    (0.03, True),    # button labels
+    (0.035, False),  # instructions
+    (0.05, False),   # feedback, name prompt, sequence titles
+    (0.06, False),   # typed name, score
+    (0.07, False),   # empty slot "?"
+    (0.08, False),   # fixation
+    (0.12, True),    # hint arrows
+]
+GLYPHS = "".join(c for c in string.printable if not c.isspace()) + " •—🎉"
+
+
+def warm_text(win, styles=TEXT_STYLES, glyphs=GLYPHS):
+    """Rasterize every glyph in every text style"""
+    from psychopy import visual
+    for height, bold in styles:
+        visual.TextStim(win, text=glyphs, color='black', height=height, bold=bold, wrapWidth=2.0).draw()
+
+def finish(win):
+    """Wait for the GPU to finish the warm-up draws, then clear the back buffer"""
+    try:
+        from pyglet import gl
+        gl.glFinish()
+    except Exception:
+        pass
+    win.clearBuffer()
+
+def warm_up(win, *drawers, log=print, what="display"):
+    """Draw text styles and each drawer's content offscreen; returns the time taken in ms"""
+    t0 = time.perf_counter()
+    warm_text(win)
+    for draw in drawers:
+        draw()
+    finish(win)
+    ms = (time.perf_counter() - t0) * 1000
+    log(f"🔥 Warm-up ({what}): {ms:.0f} ms")
+    return ms